@@ -0,0 +1,48 @@
+"""Throughput benchmark for geohierarchy_from_mask on synthetic layers.
+
+    python benchmarks/bench_geohierarchy_from_mask.py --rows 4000 --cols 4000 --levels 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from geohierarchy import geohierarchy_from_mask
+
+
+def make_inputs(rows, cols, levels, seed=0):
+    rng = np.random.default_rng(seed)
+    mask = rng.integers(0, 4, size=(rows, cols), dtype=np.int32)
+    layers = []
+    for _ in range(levels):
+        layer = rng.random((rows, cols), dtype=np.float32)
+        layer[rng.random((rows, cols)) < 0.5] = np.nan
+        layers.append(layer)
+    return mask, layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--cols', type=int, default=2000)
+    parser.add_argument('--levels', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--block-rows', type=int, default=None)
+    args = parser.parse_args()
+
+    mask, layers = make_inputs(args.rows, args.cols, args.levels)
+    cells = args.rows * args.cols
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        geohierarchy_from_mask(mask, layers, block_rows=args.block_rows)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"{cells:,} cells x {args.levels} levels: best {best:.3f} s "
+          f"({cells / best:,.0f} cells/s, {cells * args.levels / best:,.0f} cell-levels/s)")
+
+
+if __name__ == '__main__':
+    main()
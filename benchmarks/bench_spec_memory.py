@@ -0,0 +1,74 @@
+"""Memory held by parsed UserConfig spec trees for a batch of synthetic model configs.
+
+    python benchmarks/bench_spec_memory.py --configs 200 --leaves 2000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from geoconfig.main_config.UserConfig import UserConfig
+from geoconfig.user_input.filepath.yaml_cache import yaml_document_cache
+
+
+def write_configs(directory, configs, leaves, seed=0):
+    """Writes sibling configs mixing plain values, filepaths, references and expressions."""
+    import random
+
+    rng = random.Random(seed)
+    data_file = os.path.join(directory, 'dem.tif')
+    open(data_file, 'wb').close()
+    kinds = [
+        lambda i: rng.choice(['0.8', '1.5', 'true', 'false', 'mf6', '100']),
+        lambda i: data_file,
+        lambda i: f"$:src{i % 20}",
+        lambda i: f"($:src{i % 20} - {rng.randint(1, 50)})",
+        lambda i: f"value_{rng.randint(0, 50)}",
+    ]
+    paths = []
+    for c in range(configs):
+        lines = ['input_sources:']
+        lines += [f"    src{i}: {data_file}" for i in range(20)]
+        lines += ['parameters:']
+        per_package = 50
+        for i in range(leaves):
+            if i % per_package == 0:
+                lines.append(f"    package_{i // per_package}:")
+            lines.append(f"        key_{i % per_package}: {rng.choice(kinds)(i)}")
+        path = os.path.join(directory, f"model_{c}.yaml")
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--configs', type=int, default=200)
+    parser.add_argument('--leaves', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_configs(directory, args.configs, args.leaves)
+        for path in paths:
+            yaml_document_cache.load(path)  # parsed documents are not part of the measurement
+
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        configs = [UserConfig.from_filepath(path, set_upstream=False) for path in paths]
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    total_leaves = sum(len(config._flatspecs) for config in configs)
+    print(f"configs: {len(configs)}  leaves: {total_leaves}")
+    print(f"retained: {current / 1e6:.1f} MB ({current / total_leaves:.0f} B/leaf)  peak: {peak / 1e6:.1f} MB")
+    print(f"build: {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
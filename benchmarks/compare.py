@@ -0,0 +1,75 @@
+"""Compares two run_suite.py result files and flags regressions.
+
+    python benchmarks/compare.py benchmarks/results/<base>-medium.json benchmarks/results/<head>-medium.json --threshold 0.1
+
+A case regresses when its median time or its peak traced memory grows by more
+than ``--threshold`` (a fraction). Exits with status 1 if any case regressed,
+so it can gate a CI job that runs the suite on both commits.
+"""
+import argparse
+import json
+import sys
+
+
+def _ratio(base, head):
+    if base is None or head is None or base <= 0:
+        return None
+    return head / base
+
+
+def compare(base: dict, head: dict, threshold: float, min_seconds: float = 0.0) -> list:
+    """Rows of (case, metric, base, head, ratio, regressed) for the cases in both results."""
+    rows = []
+    for name, head_case in head['cases'].items():
+        base_case = base['cases'].get(name)
+        if base_case is None or 'error' in base_case or 'error' in head_case:
+            continue
+        for metric in ('median', 'peak_traced'):
+            ratio = _ratio(base_case.get(metric), head_case.get(metric))
+            regressed = ratio is not None and ratio > 1 + threshold
+            if metric == 'median' and max(base_case[metric], head_case[metric]) < min_seconds:
+                regressed = False
+            rows.append((name, metric, base_case.get(metric), head_case.get(metric), ratio, regressed))
+    return rows
+
+
+def _format(metric, value):
+    if value is None:
+        return '-'
+    return f"{value:.3f} s" if metric == 'median' else f"{value / 1e6:.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--min-seconds', type=float, default=0.005)
+    args = parser.parse_args()
+
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.head) as file:
+        head = json.load(file)
+    if base['sizes'] != head['sizes']:
+        sys.exit(f"results were run at different sizes: {base['size']} and {head['size']}")
+
+    print(f"base {base['commit']}  head {head['commit']}  size {head['size']}  threshold {args.threshold:.0%}")
+    rows = compare(base, head, args.threshold, args.min_seconds)
+    for name, metric, base_value, head_value, ratio, regressed in rows:
+        change = f"{ratio - 1:+7.1%}" if ratio is not None else '      -'
+        print(f"{name:<14} {metric:<12} {_format(metric, base_value):>10} -> {_format(metric, head_value):>10}  "
+              f"{change}{'  REGRESSION' if regressed else ''}")
+    for name in sorted(set(base['cases']) ^ set(head['cases'])):
+        print(f"{name:<14} only in {'base' if name in base['cases'] else 'head'}")
+    for name, case in head['cases'].items():
+        if 'error' in case:
+            print(f"{name:<14} failed in head: {case['error']}")
+
+    failed = any('error' in case for case in head['cases'].values())
+    if failed or any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
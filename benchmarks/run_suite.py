@@ -0,0 +1,282 @@
+"""Benchmark suite for config parsing and hierarchy building, recorded per commit.
+
+    python benchmarks/run_suite.py --size medium
+    python benchmarks/run_suite.py --size small --cases config.load classify --repeat 3
+    python benchmarks/compare.py benchmarks/results/<base>-medium.json benchmarks/results/<head>-medium.json
+
+Synthetic inputs are generated locally at the chosen size. Every case runs in a
+fresh process, so peak memory and caches do not leak between cases. An untimed
+warm-up run is followed by the timed repeats and one more run under the
+profiler, which records peak traced memory and the hot-path counters. Results
+are written to ``benchmarks/results/<commit>-<size>.json``.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+
+sizes = {
+    'small': {'models': 5, 'leaves': 200, 'rows': 512, 'cols': 512, 'polygons': 200, 'points': 10_000},
+    'medium': {'models': 20, 'leaves': 1000, 'rows': 2048, 'cols': 2048, 'polygons': 2_000, 'points': 200_000},
+    'large': {'models': 50, 'leaves': 4000, 'rows': 8192, 'cols': 8192, 'polygons': 20_000, 'points': 2_000_000},
+}
+resolution = 10.0
+origin = (500000.0, 5000000.0)
+
+
+def generate(directory, size):
+    """Writes the inputs for one size and returns their paths and counts."""
+    spec = sizes[size]
+    rows, cols = spec['rows'], spec['cols']
+    bounds = (origin[0], origin[1] - rows * resolution, origin[0] + cols * resolution, origin[1])
+    root, model_paths, _ = synthetic.write_config_tree(
+        os.path.join(directory, 'configs'), models=spec['models'], leaves=spec['leaves'])
+    return {
+        'root': root,
+        'schema': synthetic.write_schema(os.path.join(directory, 'configs', 'schema.yaml')),
+        'models': model_paths,
+        'leaves': spec['models'] * spec['leaves'],
+        'cells': rows * cols,
+        'mask': synthetic.write_mask(os.path.join(directory, 'mask.tif'), rows, cols, resolution, origin),
+        'dem': synthetic.write_raster(os.path.join(directory, 'dem.tif'), rows, cols, resolution, origin),
+        'coarse': synthetic.write_raster(
+            os.path.join(directory, 'coarse.tif'), rows // 3 + 1, cols // 3 + 1, resolution * 3, origin, seed=1),
+        'zones': synthetic.write_polygons(os.path.join(directory, 'zones.shp'), spec['polygons'], bounds),
+        'wells': synthetic.write_points(os.path.join(directory, 'wells.csv'), spec['points'], bounds),
+    }
+
+
+def _hierarchy(inputs):
+    return [
+        {'filepath': inputs['dem']},
+        {'filepath': inputs['coarse'], 'resampling': 'bilinear', 'mask': inputs['mask']},
+        {'filepath': inputs['zones'], 'column': 'value', 'z': 'z'},
+        {'filepath': inputs['wells'], 'column': 'value', 'z': 'z'},
+    ]
+
+
+def _leaf_values(paths):
+    from geoconfig.main_config.config_diff import flat_items
+    from geoconfig.user_input.filepath.yaml_cache import yaml_document_cache
+
+    return [value for path in paths for _, value in flat_items(yaml_document_cache.load(path))]
+
+
+# Each case is (setup, run, unit). setup(inputs) returns the state passed to
+# run(inputs, state) and is not timed; run returns the number of units processed.
+
+def _config_setup(inputs, warm):
+    from geoconfig.user_input.filepath.yaml_cache import yaml_document_cache
+    from geoconfig.user_input.user_input_factory import user_input_factory
+
+    def reset():
+        user_input_factory.clear_cache()
+        if not warm:
+            yaml_document_cache.clear()
+        else:
+            for path in [inputs['root'], *inputs['models']]:
+                yaml_document_cache.load(path)
+    return reset
+
+
+def _config_run(inputs, reset):
+    from geoconfig.main_config.UserConfig import UserConfig
+
+    reset()
+    UserConfig.from_filepath(inputs['root'])
+    return inputs['leaves']
+
+
+def _classify_setup(inputs):
+    return _leaf_values(inputs['models'])
+
+
+def _classify_run(inputs, values):
+    from geoconfig.user_input.user_input_factory import user_input_factory
+
+    user_input_factory.clear_cache()
+    user_input_factory.prefetch(values)
+    for value in values:
+        user_input_factory.classify_user_input(value)
+    return len(values)
+
+
+def _validate_setup(inputs):
+    from geoconfig.main_config.schema_validator import compile_schema
+    from geoconfig.user_input.filepath.yaml_cache import yaml_document_cache
+
+    schema = compile_schema(inputs['schema'])
+    _classify_run(inputs, _leaf_values(inputs['models']))  # classifications are measured by 'classify'
+    return schema, [yaml_document_cache.load(path) for path in inputs['models']]
+
+
+def _validate_run(inputs, state):
+    schema, documents = state
+    for document in documents:
+        schema.validate(document)
+    return inputs['leaves']
+
+
+def _open_run(inputs, state):
+    from geohierarchy.io.readparser import ReadParser
+
+    ReadParser(mode='serial').read(_hierarchy(inputs))
+    return inputs['cells']
+
+
+def _combine_run(inputs, state):
+    from geohierarchy.io.readparser import ReadParser
+
+    with tempfile.TemporaryDirectory() as directory:
+        ReadParser(mode='serial').read(_hierarchy(inputs), store=os.path.join(directory, 'store'))
+    return inputs['cells'] * len(_hierarchy(inputs))
+
+
+def _from_mask_run(inputs, state):
+    from geohierarchy import geohierarchy_from_mask
+    from geohierarchy.input import HierInput
+
+    geohierarchy_from_mask(inputs['mask'], [HierInput(**level) for level in _hierarchy(inputs)])
+    return inputs['cells'] * len(_hierarchy(inputs))
+
+
+cases = {
+    'config.load': (lambda inputs: _config_setup(inputs, warm=False), _config_run, 'leaves'),
+    'config.build': (lambda inputs: _config_setup(inputs, warm=True), _config_run, 'leaves'),
+    'classify': (_classify_setup, _classify_run, 'values'),
+    'validate': (_validate_setup, _validate_run, 'leaves'),
+    'open': (lambda inputs: None, _open_run, 'cells'),
+    'combine': (lambda inputs: None, _combine_run, 'cell-levels'),
+    'from_mask': (lambda inputs: None, _from_mask_run, 'cell-levels'),
+}
+
+
+def run_case(name, inputs, repeat):
+    """Times one case and profiles one extra run of it. Meant to run in its own process."""
+    from geoconfig.profiling import peak_rss, profile
+
+    setup, run, unit = cases[name]
+    state = setup(inputs)
+    run(inputs, state)  # warm-up: imports, lazy registries and the OS file cache
+    setup_rss = peak_rss()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        units = run(inputs, state)
+        timings.append(time.perf_counter() - start)
+    with profile(trace_memory=True) as profiler:
+        run(inputs, state)
+    summary = profiler.summary()
+    median = statistics.median(timings)
+    return {
+        'unit': unit,
+        'units': units,
+        'seconds': timings,
+        'median': median,
+        'best': min(timings),
+        'throughput': units / median if median else None,
+        'peak_traced': summary['memory']['peak_traced'],
+        'peak_rss': peak_rss(),
+        'setup_rss': setup_rss,  # peak RSS after setup and the warm-up run
+        'counters': summary['counters'],
+    }
+
+
+def _run_case_in_child(name, inputs, repeat, queue):
+    try:
+        queue.put(run_case(name, inputs, repeat))
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(name, inputs, repeat):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_case_in_child, args=(name, inputs, repeat, queue))
+    process.start()
+    while True:
+        alive = process.is_alive()
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            if not alive:  # crashed, or killed for running out of memory
+                result = {'error': f"worker exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def revision():
+    """(commit, dirty) of the working tree, ('unknown', None) outside a git checkout."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return git('rev-parse', '--short', 'HEAD'), bool(git('status', '--porcelain', '--untracked-files=no'))
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=list(sizes), default='small')
+    parser.add_argument('--cases', nargs='+', choices=list(cases), default=list(cases))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None,
+                        help="result file, defaults to benchmarks/results/<commit>-<size>.json")
+    parser.add_argument('--data-dir', default=None, help="keep the generated inputs here instead of a temp dir")
+    args = parser.parse_args()
+
+    commit, dirty = revision()
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"{commit}{'-dirty' if dirty else ''}-{args.size}.json")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.data_dir or tmp
+        start = time.perf_counter()
+        inputs = generate(directory, args.size)
+        print(f"generated {args.size} inputs in {time.perf_counter() - start:.1f} s")
+
+        results = {}
+        for name in args.cases:
+            result = results[name] = run_isolated(name, inputs, args.repeat)
+            if 'error' in result:
+                print(f"{name:<14} failed: {result['error']}")
+                continue
+            traced = result['peak_traced'] / 1e6 if result['peak_traced'] is not None else float('nan')
+            print(f"{name:<14} median {result['median']:8.3f} s  {result['throughput']:>14,.0f} "
+                  f"{result['unit']}/s  peak {traced:8.1f} MB")
+
+    record = {
+        'commit': commit,
+        'dirty': dirty,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'size': args.size,
+        'sizes': sizes[args.size],
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'cases': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(record, file, indent=1)
+    print(f"results written to {output}")
+    if any('error' in result for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
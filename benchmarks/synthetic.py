@@ -0,0 +1,150 @@
+"""Synthetic inputs for the benchmarks: config trees, rasters, polygons and point tables.
+
+Everything is generated from a seed, so two runs at the same size read the
+same data.
+"""
+import os
+import random
+
+import numpy as np
+
+
+def write_config_tree(directory, models=20, leaves=500, sources=20, seed=0):
+    """
+    Writes a root config listing ``models`` upstream configs under
+    ``input_hierarchy.models``, each with ``leaves`` parameters that mix plain
+    values, filepaths, references and expressions.
+
+    Returns:
+        tuple: (root filepath, model filepaths, leaf values of one model)
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    data_files = []
+    for i in range(sources):
+        path = os.path.join(directory, f"source_{i}.tif")
+        open(path, 'wb').close()
+        data_files.append(path)
+
+    kinds = [
+        lambda i: rng.choice(['0.8', '1.5', 'true', 'false', 'mf6', '100']),
+        lambda i: data_files[i % sources],
+        lambda i: f"$:src{i % sources}",
+        lambda i: f"($:src{i % sources} - {rng.randint(1, 50)})",
+        lambda i: f"value_{rng.randint(0, 50)}",
+    ]
+    model_paths = []
+    for m in range(models):
+        lines = ['model_config:', f"    model_type: model_{m}", 'input_sources:']
+        lines += [f"    src{i}: {path}" for i, path in enumerate(data_files)]
+        lines += ['parameters:']
+        per_package = 50
+        for i in range(leaves):
+            if i % per_package == 0:
+                lines.append(f"    package_{i // per_package}:")
+            lines.append(f"        key_{i % per_package}: {rng.choice(kinds)(i)}")
+        path = os.path.join(directory, f"model_{m}.yaml")
+        _write_lines(path, lines)
+        model_paths.append(path)
+
+    lines = ['model_config:', '    model_type: root', 'input_hierarchy:', '    models:']
+    lines += [f"        {m}: {path}" for m, path in enumerate(model_paths)]
+    lines += ['input_sources:', f"    dem: {data_files[0]}"]
+    root = os.path.join(directory, 'root.yaml')
+    _write_lines(root, lines)
+
+    with open(model_paths[0]) as file:
+        values = [line.split(': ', 1)[1] for line in file.read().splitlines() if ': ' in line]
+    return root, model_paths, values
+
+
+def write_schema(path):
+    """
+    Writes a schema for the configs of ``write_config_tree`` that checks every
+    parameter, classifying the ones that are not plain numbers or booleans.
+    """
+    lines = [
+        'model_config:', '  type: dict', '  required: true', '  schema:',
+        '    model_type:', '      type: value', '      required: true',
+        'input_sources:', '  type: dict', '  required: true', '  schema:',
+        '    user_key:', '      user_key: true', '      value_type: [filepath, value]',
+        'parameters:', '  type: dict', '  required: true', '  schema:',
+        '    user_key:', '      user_key: true', '      type: dict', '      schema:',
+        '        user_key:', '          user_key: true',
+        '          value_type: [float, bool, value, filepath, cache, math]',
+    ]
+    _write_lines(path, lines)
+    return path
+
+
+def write_raster(path, rows, cols, resolution=10.0, origin=(500000.0, 5000000.0), crs='EPSG:32633',
+                 dtype='float32', nodata=-9999.0, nodata_fraction=0.1, blocksize=256, seed=0):
+    """Writes a tiled GeoTIFF of smooth noise with scattered nodata cells."""
+    import rasterio
+    from rasterio.transform import from_origin
+
+    rng = np.random.default_rng(seed)
+    transform = from_origin(origin[0], origin[1], resolution, resolution)
+    profile = {
+        'driver': 'GTiff', 'height': rows, 'width': cols, 'count': 1, 'dtype': dtype, 'crs': crs,
+        'transform': transform, 'nodata': nodata, 'tiled': True, 'blockxsize': blocksize, 'blockysize': blocksize,
+    }
+    with rasterio.open(path, 'w', **profile) as dataset:
+        for row in range(0, rows, blocksize):
+            height = min(blocksize, rows - row)
+            block = (np.add.outer(np.sin(np.arange(row, row + height) / 50), np.cos(np.arange(cols) / 50))
+                     + rng.random((height, cols)) * 0.1).astype(dtype)
+            block[rng.random(block.shape) < nodata_fraction] = nodata
+            dataset.write(block, 1, window=((row, row + height), (0, cols)))
+    return path
+
+
+def write_polygons(path, count, bounds, crs='EPSG:32633', seed=0):
+    """Writes ``count`` random convex polygons within ``bounds`` with 'value' and 'z' attributes."""
+    import shapely
+    from pyogrio.raw import write
+
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = bounds
+    size = min(xmax - xmin, ymax - ymin) / max(np.sqrt(count), 1)
+    centres = np.column_stack([rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count)])
+    geometries = shapely.buffer(shapely.points(centres), rng.uniform(0.2, 1.0, count) * size, quad_segs=4)
+    write(
+        path,
+        shapely.to_wkb(geometries),
+        [rng.random(count), rng.uniform(0, 100, count)],
+        ['value', 'z'],
+        geometry_type='Polygon',
+        crs=crs,
+        driver='ESRI Shapefile')
+    return path
+
+
+def write_points(path, count, bounds, seed=0):
+    """Writes ``count`` random points within ``bounds`` to a CSV with x, y, value and z columns."""
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = bounds
+    table = np.column_stack([
+        rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count),
+        rng.random(count), rng.uniform(0, 100, count)])
+    np.savetxt(path, table, delimiter=',', header='x,y,value,z', comments='', fmt='%.6f')
+    return path
+
+
+def write_mask(path, rows, cols, resolution=10.0, origin=(500000.0, 5000000.0), crs='EPSG:32633', seed=0):
+    """Writes a labelled mask raster: a disc of active cells split into four labels."""
+    import rasterio
+    from rasterio.transform import from_origin
+
+    r, c = np.ogrid[:rows, :cols]
+    inside = (r - rows / 2) ** 2 + (c - cols / 2) ** 2 < (min(rows, cols) * 0.45) ** 2
+    labels = np.where(inside, 1 + (r >= rows // 2) * 2 + (c >= cols // 2), 0).astype('int32')
+    with rasterio.open(path, 'w', driver='GTiff', height=rows, width=cols, count=1, dtype='int32', crs=crs,
+                       transform=from_origin(origin[0], origin[1], resolution, resolution)) as dataset:
+        dataset.write(labels, 1)
+    return path
+
+
+def _write_lines(path, lines):
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
@@ -0,0 +1,10 @@
+from geoconfig.main_config.batch import BatchProcessor
+
+
+# every model yaml in a sweep directory, parsed and validated in a process pool
+sweep_directory = 'examples'
+
+if __name__ == '__main__':
+    for result in BatchProcessor(mode='process').iter(sweep_directory):
+        if not result.ok:
+            print(result.filepath, result.exception or [str(e) for e in result.errors])
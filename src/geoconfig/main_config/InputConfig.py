@@ -1,5 +1,4 @@
 from abc import ABC, abstractmethod
-from os.path import isfile
 
 from ..settings.config import (
     upstream_model_keys,
@@ -8,6 +7,7 @@ from ..settings.config import (
 
 from ..user_input.user_input_factory import UserInputFactory, user_input_factory
 from ..user_input.input_types import FilepathInput
+from ..user_input.filepath.remote import path_exists
 
 
 class InputConfig(ABC):
@@ -20,9 +20,9 @@ class InputConfig(ABC):
             self.filespec = filespec
             self.filepath = self.filespec.filepath
         elif filepath:
+            if not path_exists(filepath):
+                raise FileNotFoundError(f"File not found: {filepath}")
             self.filespec = self._user_input_factory.classify_user_input(filepath)
-            if not isfile(self.filespec.value):
-                raise FileNotFoundError(f"File not found: {self.filespec.value}")
             self.filepath = filepath
         else:
             raise ValueError("Must provide either a filepath or a filespec.")
@@ -31,6 +31,16 @@ class InputConfig(ABC):
 
     def __repr__(self):
         return f"{__class__.__name__}({self.filepath})"
+
+    def __getstate__(self):
+        # the factory is a process-wide singleton with its own caches; it is not sent along
+        state = self.__dict__.copy()
+        state.pop('_user_input_factory', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._user_input_factory = user_input_factory
     
     @abstractmethod
     def from_filepath(cls, filepath:str):
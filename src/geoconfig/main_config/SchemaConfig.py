@@ -1,17 +1,9 @@
 from abc import ABC
 from .InputConfig import InputConfig
+from .schema_validator import CompiledSchema, type_map
 from ..user_input.user_input_factory import UserInputFactory
 from ..user_input.input_types import FilepathInput
 
-type_map = {
-        'int': int,
-        'float': float,
-        'str': str,
-        'list': list,
-        'dict': dict,
-        'bool': bool,
-    }
-
 
 class SchemaConfig(InputConfig):
 
@@ -19,41 +11,51 @@ class SchemaConfig(InputConfig):
             self,
             filepath: str,
             filespec: FilepathInput,
-            input_factory: UserInputFactory):
-        super().__init__(filepath=filepath, filespec=filespec, input_factory=input_factory)
-       
+            input_factory: UserInputFactory = None):
+        super().__init__(filepath=filepath, filespec=filespec)
+        if input_factory is not None:
+            self._user_input_factory = input_factory
+
         self._schema = self.input_dict
         self._type_map = type_map
-    
+        self._compiled = None
+
     @property
     def schema(self):
         return self._schema
-    
-    def validate(self, config_to_validate: InputConfig):
-        # Validate the config against the schema
-        return self._validate_schema_level(config_to_validate, self.schema)
-    
-    def _validate_schema_level(self, config_to_validate: InputConfig, schema_level, path_prefix=None):
-        # if not isinstance(config, dict):
-        #     raise ValueError(f"Expected a dictionary, got {config}")
-        
-        # for key, rules in schema_level.items():
-        #     current_path = f'{path_prefix}.{key}' if path_prefix else key
-
-        #     if 'required' in rules and rules['required']=='true' and key not in config:
-        #         raise ValueError(f"Missing required key {current_path}")
-            
-        #     if key in config:
-        #         config_value = config[key]
-        #         if 'value_type' in rules:
-        #             expected_type = rules['value_type']
-        #             pass
-        
-        #         if 'schema' in rules:
-        #             if not isinstance(config_value, dict):
-        #                 raise ValueError(f"Expected a dictionary, got {config_value}")
-                    
-        #             self._validate_schema_level(config_value, rules['schema'], current_path)
-
-        return print('validation successful - haha nope - not implemented yet')
 
+    @property
+    def compiled(self) -> CompiledSchema:
+        """The schema compiled once into checker closures."""
+        if self._compiled is None:
+            self._compiled = CompiledSchema(self._schema, classify=self._user_input_factory.classify_user_input)
+        return self._compiled
+
+    @classmethod
+    def from_filepath(cls, filepath: str):
+        return cls(filepath=filepath, filespec=None)
+
+    @classmethod
+    def from_filespec(cls, filespec: FilepathInput):
+        return cls(filespec=filespec, filepath=None)
+
+    def validate(self, config_to_validate: InputConfig, raise_errors: bool = True) -> list:
+        """
+        Validates a config against the schema.
+
+        Args:
+            config_to_validate: ``InputConfig`` or nested mapping.
+            raise_errors (bool): Raise a ``SchemaValidationError`` listing every
+                error instead of returning them.
+
+        Returns:
+            list: ``SchemaError``s with dotted paths, empty if the config is valid.
+        """
+        if raise_errors:
+            self.compiled.check(config_to_validate)
+            return []
+        return self.compiled.validate(config_to_validate)
+
+    def validate_many(self, configs) -> dict:
+        """Validates many configs (filepaths, mappings or ``InputConfig``s); returns errors per failing config."""
+        return self.compiled.validate_many(configs)
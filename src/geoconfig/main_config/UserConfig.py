@@ -1,7 +1,20 @@
+import asyncio
+import sys
+import warnings
 from abc import ABC
+from collections.abc import Mapping
+from functools import partial
+
 from .InputConfig import InputConfig
+from .config_diff import ConfigDiff, diff_flat, flat_items, is_under
+from .lazy_specs import LazyFlatSpecs, LazyUpstream
 
+from ..profiling import span
+from ..settings.config import upstream_model_keys
 from ..user_input.input_types import FilepathInput
+from ..user_input.user_input_factory import user_input_factory
+from ..user_input.filepath.io_pool import io_pool
+from ..user_input.filepath.yaml_cache import yaml_document_cache
 
 
 class UserConfig(InputConfig):
@@ -9,16 +22,27 @@ class UserConfig(InputConfig):
             self,
             filepath: str,
             filespec: FilepathInput,
-            set_upstream: bool = True):
-        super().__init__(filepath=filepath, filespec=filespec)
+            set_upstream: bool = True,
+            lazy: bool = False):
+        with span('config.build', filepath=filepath or getattr(filespec, 'filepath', None)):
+            super().__init__(filepath=filepath, filespec=filespec)
+            self._lazy = lazy
+
+            if lazy:
+                # leaves are classified, and upstream configs built, on first access
+                self._flatspecs = LazyFlatSpecs(self.input_dict, self._user_input_factory.classify_user_input)
+                self._specs = self._flatspecs.nested
+            else:
+                self._user_input_factory.prefetch(self._iter_leaf_values(self.input_dict))
+                self._flatspecs = self._classify_user_inputs(self.input_dict)
+                self._specs = self._flat_to_nested(self._flatspecs)
 
-        self._flatspecs = self._classify_user_inputs(self.input_dict)
-        self._specs = self._flat_to_nested(self._flatspecs)
+            if set_upstream:
+                self._upstream_specs = self._set_upstream_specs(keys = self._upstream_model_keys)
+            else:
+                self._upstream_specs = None
 
-        if set_upstream:
-            self._upstream_specs = self._set_upstream_specs(keys = self._upstream_model_keys)
-        else:
-            self._upstream_specs = None
+            self._resolver = None
 
     @property
     def specs(self):
@@ -27,16 +51,79 @@ class UserConfig(InputConfig):
     @property
     def upstream_specs(self):
         if self._upstream_specs is None:
-            print('Upstream specs not set.')
+            warnings.warn("Upstream specs not set; build the config with set_upstream=True.", stacklevel=2)
         return self._upstream_specs
     
+    @property
+    def resolver(self):
+        """Shared resolver for ``CachedInput`` references in this config and its upstream configs."""
+        if self._resolver is None:
+            from .resolver import CachedInputResolver
+            self._resolver = CachedInputResolver(self, self._upstream_specs or [])
+        return self._resolver
+
+    def resolve(self, key: str):
+        """Returns the object referenced by the ``CachedInput`` at flat ``key``."""
+        return self.resolver.resolve(self, self._flatspecs[key])
+
+    def refresh(self) -> ConfigDiff:
+        """
+        Re-reads this config and its built upstream configs, rebuilding only what changed.
+
+        The raw flat values of each YAML are diffed against the previous load, and
+        only changed leaves are classified again. Unchanged upstream configs are kept
+        as they are. Resolved ``input_sources``/``input_cache`` entries are kept
+        unless their definition, a file they read, or anything they depend on
+        changed; those are recomputed.
+
+        Returns:
+            ConfigDiff: The changed keys per file and the recomputed entries.
+        """
+        diff = ConfigDiff()
+        self._reload(diff)
+
+        root_changed = diff.changed_keys.get(self.filepath, ())
+        if self._upstream_specs is not None and any(is_under(k, self._upstream_model_keys) for k in root_changed):
+            self._upstream_specs = self._set_upstream_specs(
+                keys=self._upstream_model_keys, previous=self._built_upstream())
+            diff.upstream_changed = True
+
+        for config in self._built_upstream():
+            config._reload(diff)
+
+        if self._resolver is not None:
+            self._resolver = self._resolver.rebuild(self, self._upstream_specs or [], diff)
+        return diff
+
     @classmethod
-    def from_filepath(cls, filepath: str, set_upstream: bool=True):
-        return cls(filepath=filepath, filespec=None, set_upstream=set_upstream)
+    def from_filepath(cls, filepath: str, set_upstream: bool=True, lazy: bool=False):
+        return cls(filepath=filepath, filespec=None, set_upstream=set_upstream, lazy=lazy)
     
     @classmethod
-    def from_filespec(cls, filespec: FilepathInput, set_upstream: bool=True):
-        return cls(filespec=filespec, filepath=None, set_upstream=set_upstream)
+    def from_filespec(cls, filespec: FilepathInput, set_upstream: bool=True, lazy: bool=False):
+        return cls(filespec=filespec, filepath=None, set_upstream=set_upstream, lazy=lazy)
+
+    @classmethod
+    async def from_filepath_async(cls, filepath: str, set_upstream: bool=True):
+        """
+        Loads a config and its upstream configs with concurrent I/O.
+
+        Once the root YAML is fetched, the existence checks of its leaves and
+        the fetches of every upstream YAML (with their own checks) are issued
+        together on the shared ``io_pool``. A hierarchy on an object store
+        then costs a few round trips in total rather than a few per file.
+        """
+        document = await io_pool.run(yaml_document_cache.load, filepath)
+        upstream_paths = _raw_upstream_paths(document, upstream_model_keys) if set_upstream else []
+        _, *upstream = await asyncio.gather(
+            user_input_factory.prefetch_async([filepath, *(value for _, value in flat_items(document))]),
+            *(cls.from_filepath_async(path, set_upstream=False) for path in upstream_paths))
+
+        config = await io_pool.run(partial(cls, filepath=filepath, filespec=None, set_upstream=False))
+        if set_upstream:
+            # the configs fetched above are picked up by filepath
+            config._upstream_specs = config._set_upstream_specs(keys=config._upstream_model_keys, previous=upstream)
+        return config
     
     #move to helper
     def _get_nested_value_iterative(self, nested_dict, keys) -> dict:
@@ -50,31 +137,74 @@ class UserConfig(InputConfig):
         Returns:
             The value at the nested path, or None if any key is not found.
         """
-        current_level = nested_dict.copy()
+        current_level = nested_dict
         for key in keys:
-            if isinstance(current_level, dict) and key in current_level:
+            if isinstance(current_level, Mapping) and key in current_level:
                 current_level = current_level[key]  # Move to the next level
             else:
                 return None  # Key not found at this level, or current_level is not a dict
         return current_level # Return the value at the final level (or None if we returned early)
 
     
-    def _set_upstream_specs(self, keys:list):
-        other_yamls = self._get_nested_value_iterative(self.specs, keys)
+    def _set_upstream_specs(self, keys:list, previous: list = None):
+        with span('config.upstream', filepath=self.filepath):
+            other_yamls = self._get_nested_value_iterative(self.specs, keys)
+            if other_yamls is None:
+                return []
 
-        self._validate_hierarchy(other_yamls)
-        
-        hier_inputs = []
-        for i, filespec in other_yamls.items():
-            new_input = self.from_filespec(filespec=filespec, set_upstream=False)
-            hier_inputs.append(new_input)
+            self._validate_hierarchy(other_yamls)
+
+            # configs from a previous load are reused when the same file is still listed
+            reuse = {config.filepath: config for config in previous or []}
 
-        return hier_inputs
+            if self._lazy:
+                return LazyUpstream(
+                    other_yamls, lambda filespec: reuse.get(filespec.filepath) or self.from_filespec(
+                        filespec=filespec, set_upstream=False, lazy=True))
+        
+            hier_inputs = []
+            for i, filespec in other_yamls.items():
+                new_input = reuse.get(filespec.filepath) or self.from_filespec(filespec=filespec, set_upstream=False)
+                hier_inputs.append(new_input)
+
+            return hier_inputs
+
+    def _built_upstream(self) -> list:
+        if isinstance(self._upstream_specs, LazyUpstream):
+            return self._upstream_specs.built()
+        return list(self._upstream_specs or [])
+
+    def _reload(self, diff: ConfigDiff):
+        """Re-reads the YAML and reclassifies the leaves whose raw value changed."""
+        input_dict = self.filespec.open()
+        if input_dict is self.input_dict:
+            return  # parsed documents are cached by mtime and size, so this file is unchanged
+
+        new_flat = dict(flat_items(input_dict))
+        changed = diff_flat(dict(flat_items(self.input_dict)), new_flat)
+        self.input_dict = input_dict
+        if not changed:
+            return
+
+        if self._lazy:
+            classified = {k: v for k, v in self._flatspecs.classified.items() if k not in changed}
+            self._flatspecs = LazyFlatSpecs(input_dict, self._user_input_factory.classify_user_input, classified)
+            self._specs = self._flatspecs.nested
+        else:
+            classify = self._user_input_factory.classify_user_input
+            self._user_input_factory.prefetch(new_flat[k] for k in changed if k in new_flat)
+            # rebuilt in file order so the nested specs keep the YAML key order
+            self._flatspecs = {
+                sys.intern(key): classify(value) if key in changed else self._flatspecs[key]
+                for key, value in new_flat.items()}
+            self._specs = self._flat_to_nested(self._flatspecs)
+        diff.changed_keys.setdefault(self.filepath, set()).update(changed)
    
     def _classify_user_inputs(self, yaml_config: dict, parent_key_prefix: str = ""):
         yaml_specs = {}
         for key, value in yaml_config.items():
-            raw_yaml_key = key if not parent_key_prefix else f"{parent_key_prefix}.{key}"
+            # dotted keys repeat across sibling configs, so one copy of each is kept
+            raw_yaml_key = sys.intern(key if not parent_key_prefix else f"{parent_key_prefix}.{key}")
 
             # Recursive call for nested structures
             if isinstance(value, dict):
@@ -84,20 +214,27 @@ class UserConfig(InputConfig):
                 yaml_specs[raw_yaml_key] = self._user_input_factory.classify_user_input(value)
         return yaml_specs
 
+    def _iter_leaf_values(self, yaml_config: dict):
+        for value in yaml_config.values():
+            if isinstance(value, dict):
+                yield from self._iter_leaf_values(value)
+            else:
+                yield value
+
     def _flat_to_nested(self, flat_dict):
         nested_dict = {}
         for key, value in flat_dict.items():
             keys = key.split('.')
             current_dict = nested_dict
             for k in keys[:-1]:
-                current_dict = current_dict.setdefault(k, {})
-            current_dict[keys[-1]] = value
+                current_dict = current_dict.setdefault(sys.intern(k), {})
+            current_dict[sys.intern(keys[-1])] = value
         return nested_dict
 
     def _validate_hierarchy(self, other_yamls:dict):
         h_counter = 0
 
-        for key, model_yamlinput in other_yamls.items():
+        for key in other_yamls:
             hlevel = int(key)
 
             # Check if the key is a valid hierarchy level
@@ -105,4 +242,10 @@ class UserConfig(InputConfig):
                 raise ValueError(f"Invalid hierarchy level: {hlevel}. Expected: {h_counter}")
             h_counter += 1 
 
-    
\ No newline at end of file
+    
+
+
+def _raw_upstream_paths(document: dict, keys: list) -> list:
+    for key in keys:
+        document = document.get(key) if isinstance(document, Mapping) else None
+    return [str(path) for path in document.values()] if isinstance(document, Mapping) else []
@@ -0,0 +1,180 @@
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from ..settings.config import batch_chunksize, batch_upstream_cache_size, upstream_model_keys
+
+batch_modes = ('serial', 'thread', 'process')
+default_schema = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'settings', 'input_schema.yaml')
+
+
+@dataclass
+class BatchResult:
+    """Outcome of parsing and validating one config in a batch."""
+
+    filepath: str
+    errors: list = field(default_factory=list)  # SchemaError per schema violation
+    exception: str = None  # set when the config could not be parsed at all
+    upstream: list = field(default_factory=list)  # upstream model filepaths
+    elapsed: float = 0.0
+    config: object = None  # the UserConfig, when the batch keeps configs
+
+    @property
+    def ok(self) -> bool:
+        return self.exception is None and not self.errors
+
+
+class BatchProcessor:
+    def __init__(
+            self,
+            schema: str = default_schema,
+            mode: str = 'process',
+            max_workers: int = None,
+            chunksize: int = None,
+            keep_configs: bool = False):
+        """
+        Args:
+            schema (str): Schema YAML every config is validated against, None to skip validation.
+            mode (str): 'serial', 'thread' or 'process'.
+            max_workers (int): Upper bound on workers.
+            chunksize (int): Configs per task. Configs are sorted by their upstream
+                models first, so siblings that share upstreams land in the same
+                worker and are built there once.
+            keep_configs (bool): Send each parsed ``UserConfig`` back with its result.
+        """
+        if mode not in batch_modes:
+            raise ValueError(f"Invalid batch mode: {mode}. Expected one of {batch_modes}")
+        self.schema = schema
+        self.mode = mode
+        self.max_workers = max_workers
+        self.chunksize = chunksize or batch_chunksize
+        self.keep_configs = keep_configs
+
+    def iter(self, paths):
+        """
+        Parses and validates configs, yielding a ``BatchResult`` as each task completes.
+
+        Args:
+            paths: A directory (all ``.yaml``/``.yml`` files in it), a glob pattern,
+                or a list of filepaths.
+        """
+        filepaths = self._group_by_upstream(expand_paths(paths))
+        chunks = [filepaths[i:i + self.chunksize] for i in range(0, len(filepaths), self.chunksize)]
+        options = {'schema': self.schema, 'keep_configs': self.keep_configs}
+
+        if self.mode == 'serial' or len(chunks) < 2:
+            for chunk in chunks:
+                yield from _process_chunk(chunk, options)
+            return
+
+        executor_class = ProcessPoolExecutor if self.mode == 'process' else ThreadPoolExecutor
+        max_workers = min(len(chunks), self.max_workers or os.cpu_count() or 1)
+        with executor_class(max_workers=max_workers) as executor:
+            futures = [executor.submit(_process_chunk, chunk, options) for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run(self, paths) -> list:
+        """Processes the whole batch; results follow the order of the expanded paths."""
+        order = {path: i for i, path in enumerate(expand_paths(paths))}
+        return sorted(self.iter(paths), key=lambda result: order[result.filepath])
+
+    @staticmethod
+    def _group_by_upstream(filepaths: list) -> list:
+        # a cheap raw read of each root keeps configs with the same upstreams together
+        return sorted(filepaths, key=lambda path: (_upstream_paths(path), path))
+
+
+def expand_paths(paths) -> list:
+    """Filepaths of a directory, a glob pattern or a list of paths, without duplicates."""
+    if isinstance(paths, str):
+        if os.path.isdir(paths):
+            found = glob.glob(os.path.join(paths, '*.yaml')) + glob.glob(os.path.join(paths, '*.yml'))
+        elif os.path.isfile(paths):
+            found = [paths]
+        else:
+            found = glob.glob(paths, recursive=True)
+        paths = sorted(found)
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+
+def _upstream_paths(filepath: str) -> tuple:
+    from ..user_input.filepath.yaml_cache import yaml_document_cache
+
+    try:
+        raw = yaml_document_cache.load(filepath)
+    except Exception:
+        return ()
+    for key in upstream_model_keys:
+        raw = raw.get(key) if isinstance(raw, dict) else None
+    return tuple(str(path) for path in raw.values()) if isinstance(raw, dict) else ()
+
+
+# per-process state, so each worker builds a shared upstream model or compiles a schema once
+_upstream_configs = OrderedDict()  # abspath -> (mtime_ns, size, UserConfig), least recently used first
+_upstream_lock = threading.Lock()  # thread workers share the LRU
+_schemas = {}
+
+
+def _process_chunk(filepaths: list, options: dict) -> list:
+    # module level so it can be sent to worker processes
+    return [_process_one(filepath, options) for filepath in filepaths]
+
+
+def _process_one(filepath: str, options: dict) -> BatchResult:
+    from .UserConfig import UserConfig
+
+    start = time.perf_counter()
+    result = BatchResult(filepath=filepath)
+    try:
+        config = UserConfig.from_filepath(filepath, set_upstream=False)
+        if options['schema']:
+            result.errors = _schema(options['schema']).validate(config)
+
+        previous = [cfg for cfg in (_cached_upstream(p) for p in _upstream_paths(filepath)) if cfg is not None]
+        config._upstream_specs = config._set_upstream_specs(keys=config._upstream_model_keys, previous=previous)
+        for upstream in config._upstream_specs:
+            _remember_upstream(upstream)
+        result.upstream = [upstream.filepath for upstream in config._upstream_specs]
+        if options['keep_configs']:
+            result.config = config
+    except Exception as error:
+        result.exception = f"{type(error).__name__}: {error}"
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _schema(filepath: str):
+    if filepath not in _schemas:
+        from .schema_validator import compile_schema
+        _schemas[filepath] = compile_schema(filepath)
+    return _schemas[filepath]
+
+
+def _cached_upstream(filepath: str):
+    key = os.path.abspath(filepath)
+    with _upstream_lock:
+        cached = _upstream_configs.get(key)
+        if cached is None:
+            return None
+        _upstream_configs.move_to_end(key)
+    stat = os.stat(cached[2].filepath)
+    return cached[2] if (stat.st_mtime_ns, stat.st_size) == cached[:2] else None
+
+
+def _remember_upstream(config):
+    stat = os.stat(config.filepath)
+    key = os.path.abspath(config.filepath)
+    with _upstream_lock:
+        _upstream_configs[key] = (stat.st_mtime_ns, stat.st_size, config)
+        _upstream_configs.move_to_end(key)
+        while len(_upstream_configs) > batch_upstream_cache_size:
+            _upstream_configs.popitem(last=False)
@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+
+_missing = object()
+
+
+@dataclass
+class ConfigDiff:
+    """What changed between two loads of a config tree, and what had to be recomputed."""
+
+    changed_keys: dict = field(default_factory=dict)  # filepath -> set of changed flat keys
+    affected_nodes: set = field(default_factory=set)  # (filepath, name) of recomputed resolver nodes
+    affected_keys: set = field(default_factory=set)  # (filepath, flat key) whose resolved value changed
+    upstream_changed: bool = False  # the list of upstream models was edited
+
+    def __bool__(self):
+        return bool(self.changed_keys or self.affected_nodes)
+
+
+def flat_items(raw: dict, prefix: str = ""):
+    """Yields (dotted key, raw leaf value) pairs of a nested config dict."""
+    for key, value in raw.items():
+        flat_key = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flat_items(value, flat_key)
+        else:
+            yield flat_key, value
+
+
+def diff_flat(old: dict, new: dict) -> set:
+    """Flat keys that were added, removed or whose raw value differs."""
+    changed = {key for key in old.keys() ^ new.keys()}
+    changed.update(key for key, value in new.items() if old.get(key, _missing) != value)
+    return changed
+
+
+def is_under(flat_key: str, keys: list) -> bool:
+    """True if ``flat_key`` is, or sits below, the nested path ``keys``."""
+    prefix = '.'.join(keys)
+    return flat_key == prefix or flat_key.startswith(prefix + '.')
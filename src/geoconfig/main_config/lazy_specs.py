@@ -0,0 +1,117 @@
+from collections.abc import Mapping, Sequence
+
+
+class LazySpecs(Mapping):
+    """Nested view of a raw config dict whose leaves are classified on first access."""
+
+    def __init__(self, raw: dict, classified: dict, classify, prefix: str = ""):
+        self._raw = raw
+        self._classified = classified  # flat key -> spec, shared by the whole tree
+        self._classify = classify
+        self._prefix = prefix
+        self._children = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self._raw)})"
+
+    def __getitem__(self, key):
+        value = self._raw[key]
+        flat_key = f"{self._prefix}.{key}" if self._prefix else key
+
+        if isinstance(value, dict):
+            if key not in self._children:
+                self._children[key] = LazySpecs(value, self._classified, self._classify, flat_key)
+            return self._children[key]
+
+        if flat_key not in self._classified:
+            self._classified[flat_key] = self._classify(value)
+        return self._classified[flat_key]
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+
+class LazyFlatSpecs(Mapping):
+    """Dotted-key view over the same lazily classified leaves as ``LazySpecs``."""
+
+    def __init__(self, raw: dict, classify, classified: dict = None):
+        self._raw = raw
+        self._classified = dict(classified or {})  # seeded with leaves already classified
+        self._nested = LazySpecs(raw, self._classified, classify)
+        self._keys = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self._classified)}/{len(self)} classified)"
+
+    @property
+    def nested(self) -> LazySpecs:
+        return self._nested
+
+    def __getitem__(self, flat_key: str):
+        if flat_key in self._classified:
+            return self._classified[flat_key]
+
+        node = self._nested
+        for key in flat_key.split('.'):
+            if not isinstance(node, LazySpecs):
+                raise KeyError(flat_key)
+            node = node[key]
+        if isinstance(node, LazySpecs):
+            raise KeyError(flat_key)
+        return node
+
+    def __iter__(self):
+        if self._keys is None:
+            self._keys = list(_flat_keys(self._raw))
+        return iter(self._keys)
+
+    def __len__(self):
+        if self._keys is None:
+            self._keys = list(_flat_keys(self._raw))
+        return len(self._keys)
+
+    @property
+    def classified(self) -> dict:
+        """Leaves classified so far, by flat key."""
+        return self._classified
+
+
+class LazyUpstream(Sequence):
+    """Upstream configs built the first time they are indexed."""
+
+    def __init__(self, filespecs: Mapping, build):
+        self._filespecs = filespecs
+        self._keys = list(filespecs)
+        self._build = build
+        self._configs = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self._configs)}/{len(self)} built)"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        key = self._keys[index]
+        if key not in self._configs:
+            self._configs[key] = self._build(self._filespecs[key])
+        return self._configs[key]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def built(self) -> list:
+        """Configs built so far."""
+        return list(self._configs.values())
+
+
+def _flat_keys(raw: dict, prefix: str = ""):
+    for key, value in raw.items():
+        flat_key = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flat_keys(value, flat_key)
+        else:
+            yield flat_key
@@ -0,0 +1,300 @@
+import json
+import os
+from collections.abc import Mapping
+
+from ..settings.config import input_sources_keys, input_cache_keys
+from ..user_input.filepath.remote import file_stamp, is_remote
+from ..user_input.input_types import (
+    InputValueSpec,
+    ValueInput,
+    FilepathInput,
+    CachedInput,
+    RecursiveType,
+    MathInput,
+    PythonModuleInput,
+)
+
+
+class CachedInputResolver:
+    """Resolves ``$:source.field`` references across a root config and its upstream configs.
+
+    Every name defined under ``input_sources`` or ``input_cache`` becomes a node of
+    a dependency graph, with an edge for each ``CachedInput`` inside its
+    definition. A reference is looked up in its own config first and then in the
+    root config. Nodes are materialized at most once, and files are opened at most
+    once per path and opener kwargs, so every consumer shares the same object.
+    """
+
+    def __init__(self, root, upstream: list = None):
+        self.configs = [root] + list(upstream or [])
+        self._definitions = {}  # (scope, name) -> spec or dict of specs
+        self._graph = {}  # (scope, name) -> set of (scope, name) it references
+        self._consumers = {}  # (scope, name) -> set of (scope, flat key)
+        self._unresolved = []  # (scope, flat key, source) without a definition
+        self._values = {}
+        self._opened = {}
+        self._stamps = {}  # abspath or URL -> stamp of every file opened
+
+        for scope, config in enumerate(self.configs):
+            self._add_definitions(scope, config)
+        for scope, config in enumerate(self.configs):
+            self._add_references(scope, config)
+        self.order = self._toposort()
+
+    @property
+    def graph(self) -> dict:
+        return self._graph
+
+    @property
+    def consumers(self) -> dict:
+        return self._consumers
+
+    @property
+    def unresolved(self) -> list:
+        return self._unresolved
+
+    def lookup(self, scope: int, source: str):
+        """Returns the node defining ``source`` as seen from ``scope``, or None."""
+        for candidate in ((scope, source), (0, source)):
+            if candidate in self._definitions:
+                return candidate
+        return None
+
+    def get(self, node: tuple):
+        """Materializes a node once and returns the shared object."""
+        if node not in self._values:
+            for dependency in self._dependencies_of(node):
+                self.get(dependency)
+            self._values[node] = self._materialize(node)
+        return self._values[node]
+
+    def resolve(self, config, spec: CachedInput):
+        """Returns the object a ``CachedInput`` in ``config`` refers to."""
+        scope = self._scope_of(config)
+        return self._evaluate(scope, spec)
+
+    def resolve_all(self) -> dict:
+        """Materializes every referenced node in dependency order."""
+        referenced = set(self._consumers)
+        for node in self.order:
+            if node in referenced:
+                self.get(node)
+        return {node: self._values[node] for node in self.order if node in self._values}
+
+    def invalidate(self, nodes):
+        """Drops materialized values so the next ``get`` recomputes them."""
+        for node in nodes:
+            self._values.pop(node, None)
+
+    def dependents(self, nodes) -> set:
+        """``nodes`` plus every node that references them, directly or indirectly."""
+        referenced_by = {}
+        for node, targets in self._graph.items():
+            for target in targets:
+                referenced_by.setdefault(target, set()).add(node)
+
+        found = set(nodes)
+        stack = list(found)
+        while stack:
+            for parent in referenced_by.get(stack.pop(), ()):
+                if parent not in found:
+                    found.add(parent)
+                    stack.append(parent)
+        return found
+
+    def rebuild(self, root, upstream: list, diff) -> 'CachedInputResolver':
+        """
+        Builds the resolver for a refreshed config tree, keeping unaffected values.
+
+        A node is recomputed when a key under its definition changed, a file it
+        reads changed on disk, its references now resolve elsewhere, or any node it
+        depends on is recomputed. Nodes that had been materialized are materialized
+        again straight away; all others keep their value and their opened files.
+
+        Args:
+            root (UserConfig): Refreshed root config.
+            upstream (list): Its upstream configs.
+            diff (ConfigDiff): Changed keys per file; the affected nodes and
+                consumer keys are added to it.
+
+        Returns:
+            CachedInputResolver
+        """
+        new = CachedInputResolver(root, upstream)
+        old_scope = {id(config): scope for scope, config in enumerate(self.configs)}
+        previous = {  # new node -> node of the same config and name in this resolver
+            (scope, name): (old_scope[id(new.configs[scope])], name)
+            for scope, name in new._definitions if id(new.configs[scope]) in old_scope}
+
+        stale_files = {path for path, stamp in self._stamps.items() if _file_stamp(path) != stamp}
+        definition_prefixes = ['.'.join(keys) + '.' for keys in (input_sources_keys, input_cache_keys)]
+
+        changed = set()
+        for node, definition in new._definitions.items():
+            scope, name = node
+            old_node = previous.get(node)
+            keys = diff.changed_keys.get(new.configs[scope].filepath, ())
+            if (old_node is None
+                    or any(key.startswith(prefix + name + '.') or key == prefix + name
+                           for key in keys for prefix in definition_prefixes)
+                    or any(_source_key(spec.filepath) in stale_files
+                           for spec in _iter_filepath_inputs(definition))
+                    or {previous.get(t) for t in new._graph.get(node, ())} != self._graph.get(old_node, set())):
+                changed.add(node)
+        affected = new.dependents(changed)
+
+        for node, old_node in previous.items():
+            if node not in affected and old_node in self._values:
+                new._values[node] = self._values[old_node]
+        new._opened = {key: value for key, value in self._opened.items() if key[0] not in stale_files}
+        new._stamps = {path: stamp for path, stamp in self._stamps.items() if path not in stale_files}
+
+        for node in new.order:
+            if node in affected and previous.get(node) in self._values:
+                new.get(node)
+
+        for scope, name in affected:
+            diff.affected_nodes.add((new.configs[scope].filepath, name))
+            for consumer_scope, flat_key in new._consumers.get((scope, name), ()):
+                diff.affected_keys.add((new.configs[consumer_scope].filepath, flat_key))
+        return new
+
+    def _scope_of(self, config) -> int:
+        for scope, candidate in enumerate(self.configs):
+            if candidate is config:
+                return scope
+        raise ValueError(f"{config} is not part of this resolver.")
+
+    def _add_definitions(self, scope, config):
+        for keys in (input_sources_keys, input_cache_keys):
+            section = config._get_nested_value_iterative(config.specs, keys)
+            if not isinstance(section, Mapping):
+                continue
+            for name, spec in section.items():
+                self._definitions[(scope, name)] = spec
+
+    def _add_references(self, scope, config):
+        for node, definition in self._definitions.items():
+            if node[0] == scope:
+                self._graph[node] = {
+                    target for target in (self.lookup(scope, ref.source) for ref in _iter_cached_inputs(definition))
+                    if target is not None}
+
+        for flat_key, spec in config._flatspecs.items():
+            for ref in _iter_cached_inputs(spec):
+                target = self.lookup(scope, ref.source)
+                if target is None:
+                    self._unresolved.append((scope, flat_key, ref.source))
+                else:
+                    self._consumers.setdefault(target, set()).add((scope, flat_key))
+
+    def _dependencies_of(self, node):
+        return self._graph.get(node, ())
+
+    def _toposort(self) -> list:
+        order = []
+        state = {}  # node -> 1 while on the stack, 2 when done
+        for start in self._graph:
+            if start in state:
+                continue
+            stack = [(start, iter(self._graph[start]))]
+            state[start] = 1
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    if state.get(child) == 1:
+                        path = [n for n, _ in stack]
+                        cycle = path[path.index(child):] + [child]
+                        raise ValueError(
+                            "Circular reference: " + " -> ".join(self._node_name(n) for n in cycle))
+                    if child not in state:
+                        state[child] = 1
+                        stack.append((child, iter(self._graph.get(child, ()))))
+                        break
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+        return order
+
+    def _node_name(self, node) -> str:
+        scope, name = node
+        return f"{self.configs[scope].filepath}:{name}"
+
+    def _materialize(self, node):
+        scope, _ = node
+        definition = self._definitions[node]
+        if isinstance(definition, Mapping):
+            source = definition.get('source')
+            opener_kwargs = _raw_values(definition.get('fileread_kwargs'))
+            value = definition if source is None else self._evaluate(scope, source, opener_kwargs=opener_kwargs)
+            transforms = definition.get('transform') or {}
+            for key in sorted(transforms, key=int):
+                value = self._evaluate(scope, transforms[key])
+            return value
+        return self._evaluate(scope, definition)
+
+    def _evaluate(self, scope, spec, opener_kwargs=None):
+        if isinstance(spec, CachedInput):
+            target = self.lookup(scope, spec.source)
+            if target is None:
+                raise KeyError(f"Undefined reference {spec.value} in {self.configs[scope].filepath}")
+            value = self.get(target)
+            return value[spec.field_key] if spec.field_key else value
+        if isinstance(spec, FilepathInput):
+            return self._open(spec, opener_kwargs)
+        if isinstance(spec, ValueInput):
+            return spec.value
+        if isinstance(spec, Mapping):
+            return {key: self._evaluate(scope, value) for key, value in spec.items()}
+        if isinstance(spec, (MathInput, PythonModuleInput)):
+            return spec.evaluate({arg.value: self._evaluate(scope, arg) for arg in spec.args})
+        return spec
+
+    def _open(self, spec: FilepathInput, opener_kwargs=None):
+        key = (_source_key(spec.filepath), json.dumps(opener_kwargs, sort_keys=True, default=repr))
+        if key not in self._opened:
+            self._stamps[key[0]] = _file_stamp(key[0])
+            self._opened[key] = spec.open(opener_kwargs) if opener_kwargs else spec.open()
+        return self._opened[key]
+
+
+def _iter_cached_inputs(spec):
+    if isinstance(spec, CachedInput):
+        yield spec
+    elif isinstance(spec, RecursiveType):
+        for arg in spec.args:
+            yield from _iter_cached_inputs(arg)
+    elif isinstance(spec, Mapping):
+        for value in spec.values():
+            yield from _iter_cached_inputs(value)
+
+
+def _iter_filepath_inputs(spec):
+    if isinstance(spec, FilepathInput):
+        yield spec
+    elif isinstance(spec, RecursiveType):
+        for arg in spec.args:
+            yield from _iter_filepath_inputs(arg)
+    elif isinstance(spec, Mapping):
+        for value in spec.values():
+            yield from _iter_filepath_inputs(value)
+
+
+def _source_key(path: str) -> str:
+    return path if is_remote(path) else os.path.abspath(path)
+
+
+def _file_stamp(path: str):
+    try:
+        return file_stamp(path)
+    except FileNotFoundError:
+        return None
+
+
+def _raw_values(specs):
+    if specs is None:
+        return None
+    if isinstance(specs, InputValueSpec):
+        return specs.value
+    return {key: _raw_values(value) for key, value in specs.items()}
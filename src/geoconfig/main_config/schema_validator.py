@@ -0,0 +1,244 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+type_map = {
+        'int': int,
+        'float': float,
+        'str': str,
+        'list': list,
+        'dict': dict,
+        'bool': bool,
+    }
+
+# schema names for input types that differ from their registered names
+input_type_aliases = {
+    'cache': 'cached',
+}
+
+_true_strings = ('true', 'yes', 'on', '1')
+_bool_strings = _true_strings + ('false', 'no', 'off', '0')
+
+
+@dataclass(frozen=True)
+class SchemaError:
+    """One validation failure at a dotted config path."""
+
+    path: str
+    message: str
+
+    def __str__(self):
+        return f"{self.path}: {self.message}"
+
+
+class SchemaValidationError(ValueError):
+    """Raised with every ``SchemaError`` found in a config."""
+
+    def __init__(self, errors: list, source: str = None):
+        self.errors = list(errors)
+        self.source = source
+        header = f"{len(self.errors)} schema error(s)" + (f" in {source}" if source else "")
+        super().__init__("\n  ".join([header] + [str(e) for e in self.errors]))
+
+
+class CompiledSchema:
+    """A schema compiled once into checker closures.
+
+    Each schema level becomes a closure holding its required keys, a table of
+    per-key checkers and an optional ``user_key`` checker for free-form keys.
+    Validation walks the config only, looking each key up in those tables, so
+    its cost follows the size of the config and the schema is never walked again.
+
+    Rules understood per key: ``required``, ``type`` (``dict``, ``value`` or a
+    ``type_map`` name), ``value_type`` (``type_map`` names and/or input type
+    names such as ``filepath`` or ``cache``), a nested ``schema``, and
+    ``user_key: true`` for a rule that applies to any key not named explicitly.
+    """
+
+    def __init__(self, schema: Mapping, classify=None):
+        """
+        Args:
+            schema (Mapping): Parsed schema YAML.
+            classify: Callable mapping a raw value to an ``InputValueSpec``, used
+                for input type names in ``value_type``. Defaults to the shared
+                ``user_input_factory``.
+        """
+        if classify is None:
+            from ..user_input.user_input_factory import user_input_factory
+            classify = user_input_factory.classify_user_input
+        self._classify = classify
+        self._check = self._compile_level(schema)
+
+    def validate(self, config) -> list:
+        """
+        Checks one config.
+
+        Args:
+            config: Nested mapping, or an ``InputConfig`` whose raw ``input_dict`` is checked.
+
+        Returns:
+            list: Every ``SchemaError`` found, empty if the config is valid.
+        """
+        errors = []
+        self._check(getattr(config, 'input_dict', config), '', errors)
+        return errors
+
+    def validate_many(self, configs) -> dict:
+        """
+        Checks many configs against the same compiled schema.
+
+        Args:
+            configs: Iterable of filepaths, mappings or ``InputConfig``s. Filepaths
+                are parsed through the shared YAML document cache.
+
+        Returns:
+            dict: Position (or filepath) -> errors, for the configs with errors.
+        """
+        from ..user_input.filepath.yaml_cache import yaml_document_cache
+
+        failed = {}
+        for i, config in enumerate(configs):
+            key = config if isinstance(config, str) else getattr(config, 'filepath', i)
+            if isinstance(config, str):
+                config = yaml_document_cache.load(config)
+            errors = self.validate(config)
+            if errors:
+                failed[key] = errors
+        return failed
+
+    def check(self, config, source: str = None):
+        """Raises ``SchemaValidationError`` listing every error in ``config``."""
+        errors = self.validate(config)
+        if errors:
+            raise SchemaValidationError(errors, source=source or getattr(config, 'filepath', None))
+
+    def _compile_level(self, schema: Mapping):
+        required = []
+        checkers = {}
+        wildcard = None
+        for key, rules in schema.items():
+            rules = rules if isinstance(rules, Mapping) else {}
+            checker = self._compile_rules(rules)
+            if _is_true(rules.get('user_key')):
+                wildcard = checker
+                continue
+            checkers[key] = checker
+            if _is_true(rules.get('required')):
+                required.append(key)
+        required = tuple(required)
+
+        def check_level(config, path, errors):
+            if not isinstance(config, Mapping):
+                errors.append(SchemaError(path or '<root>', f"expected a mapping, got {_describe(config)}"))
+                return
+            for key in required:
+                if key not in config:
+                    errors.append(SchemaError(_join(path, key), "missing required key"))
+            for key, value in config.items():
+                checker = checkers.get(key, wildcard)
+                if checker is not None:
+                    checker(value, _join(path, key), errors)
+
+        return check_level
+
+    def _compile_rules(self, rules: Mapping):
+        checks = []
+        if 'type' in rules:
+            checks.append(self._compile_type(rules['type']))
+        if 'value_type' in rules:
+            checks.append(self._compile_value_type(rules['value_type']))
+        nested = self._compile_level(rules['schema']) if isinstance(rules.get('schema'), Mapping) else None
+        checks = tuple(checks)
+
+        def check_value(value, path, errors):
+            for check in checks:
+                message = check(value)
+                if message:
+                    errors.append(SchemaError(path, message))
+                    return
+            if nested is not None:
+                nested(value, path, errors)
+
+        return check_value
+
+    @staticmethod
+    def _compile_type(name: str):
+        if name == 'dict':
+            return lambda value: None if isinstance(value, Mapping) else f"expected a mapping, got {_describe(value)}"
+        if name == 'value':
+            return lambda value: (
+                None if not isinstance(value, (Mapping, list)) else f"expected a single value, got {_describe(value)}")
+        if name not in type_map:
+            raise ValueError(f"Unknown schema type: {name}. Expected dict, value or one of {list(type_map)}")
+        matches = _python_type_check(type_map[name])
+        return lambda value: None if matches(value) else f"expected {name}, got {_describe(value)}"
+
+    def _compile_value_type(self, names):
+        names = [names] if isinstance(names, str) else list(names)
+        python_checks = tuple(_python_type_check(type_map[n]) for n in names if n in type_map)
+        input_types = frozenset(input_type_aliases.get(n, n) for n in names if n not in type_map)
+        classify = self._classify
+        expected = ", ".join(names)
+
+        def check_value_type(value):
+            if any(matches(value) for matches in python_checks):
+                return None
+            if input_types:
+                if isinstance(value, Mapping):
+                    return f"expected one of [{expected}], got a mapping"
+                spec = classify(value)
+                if getattr(spec, 'type', None) in input_types:
+                    return None
+                return f"expected one of [{expected}], got {getattr(spec, 'type', _describe(value))} ({value!r})"
+            return f"expected one of [{expected}], got {_describe(value)}"
+
+        return check_value_type
+
+
+def compile_schema(schema, classify=None) -> CompiledSchema:
+    """Compiles a parsed schema, or the schema YAML at a filepath."""
+    if isinstance(schema, str):
+        from ..user_input.filepath.yaml_cache import yaml_document_cache
+        schema = yaml_document_cache.load(schema)
+    return CompiledSchema(schema, classify=classify)
+
+
+def _python_type_check(expected: type):
+    # configs are parsed as strings, so scalar types also accept their string form
+    if expected is bool:
+        return lambda value: isinstance(value, bool) or (
+            isinstance(value, str) and value.strip().lower() in _bool_strings)
+    if expected in (int, float):
+        def matches(value):
+            if isinstance(value, bool):
+                return False
+            if isinstance(value, (int, float)):
+                return expected is float or isinstance(value, int)
+            if isinstance(value, str):
+                try:
+                    expected(value)
+                except ValueError:
+                    return False
+                return True
+            return False
+        return matches
+    if expected is dict:
+        return lambda value: isinstance(value, Mapping)
+    return lambda value: isinstance(value, expected)
+
+
+def _is_true(flag) -> bool:
+    if isinstance(flag, str):
+        return flag.strip().lower() in _true_strings
+    return bool(flag)
+
+
+def _join(path: str, key) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _describe(value) -> str:
+    if isinstance(value, Mapping):
+        return "a mapping"
+    if isinstance(value, list):
+        return "a list"
+    return f"{type(value).__name__} {value!r}"
@@ -0,0 +1,225 @@
+"""Timed spans and counters for the hot paths of a run.
+
+Instrumented code calls ``span`` and ``count`` unconditionally. Until a
+``Profiler`` is active both return at once, ``span`` handing back a shared
+no-op context manager, so leaving the calls in costs a global lookup.
+
+    with profile('run.json', trace='run.trace.json') as profiler:
+        config = UserConfig.from_filepath('model.yaml')
+    print(profiler.summary())
+
+The trace file loads in chrome://tracing or https://ui.perfetto.dev. Spans run
+in worker processes are not collected.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_active = None  # the Profiler collecting, None when profiling is off
+
+
+class Profiler:
+    """Collects spans, counters and peak memory for one run."""
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        Args:
+            trace_memory (bool): Track the peak of Python allocations with
+                ``tracemalloc``. This slows the run down noticeably; peak RSS is
+                always reported where the platform provides it.
+        """
+        self.trace_memory = trace_memory
+        self.spans = []  # (name, start_ns, duration_ns, thread id, args)
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._start_ns = None
+        self._stop_ns = None
+        self._peak_traced = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(spans={len(self.spans)}, counters={len(self.counters)})"
+
+    def start(self):
+        global _active
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        self._start_ns = time.perf_counter_ns()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        self._stop_ns = time.perf_counter_ns()
+        if self.trace_memory:
+            import tracemalloc
+            self._peak_traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return self
+
+    def add_span(self, name: str, start_ns: int, duration_ns: int, args: dict = None):
+        with self._lock:
+            self.spans.append((name, start_ns, duration_ns, threading.get_ident(), args))
+
+    def count(self, name: str, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> dict:
+        """
+        Per-stage totals.
+
+        Returns:
+            dict: 'elapsed' seconds, 'spans' (name -> calls, total, max and self
+            seconds), 'counters' and 'memory' (peak RSS and traced bytes).
+        """
+        stages = {}
+        for name, _, duration, _, _ in self.spans:
+            stage = stages.setdefault(name, {'calls': 0, 'total': 0.0, 'max': 0.0})
+            stage['calls'] += 1
+            stage['total'] += duration / 1e9
+            stage['max'] = max(stage['max'], duration / 1e9)
+        for name, self_time in self._self_times().items():
+            stages[name]['self'] = self_time / 1e9
+        end = self._stop_ns or time.perf_counter_ns()
+        return {
+            'elapsed': (end - self._start_ns) / 1e9 if self._start_ns else 0.0,
+            'spans': dict(sorted(stages.items(), key=lambda item: -item[1]['total'])),
+            'counters': dict(sorted(self.counters.items())),
+            'memory': {'peak_rss': peak_rss(), 'peak_traced': self._peak_traced},
+        }
+
+    def chrome_trace(self) -> dict:
+        """The run in Chrome trace event format, with counters as a final counter event."""
+        pid = os.getpid()
+        origin = self._start_ns or min((s[1] for s in self.spans), default=0)
+        events = [{
+            'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+            'ts': (start - origin) / 1e3, 'dur': duration / 1e3, 'args': args or {},
+        } for name, start, duration, tid, args in self.spans]
+        end = ((self._stop_ns or time.perf_counter_ns()) - origin) / 1e3
+        for name, value in sorted(self.counters.items()):
+            events.append({'name': name, 'ph': 'C', 'pid': pid, 'ts': end, 'args': {'value': value}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_json(self, path: str):
+        _write(path, self.summary())
+
+    def write_trace(self, path: str):
+        _write(path, self.chrome_trace())
+
+    def _self_times(self) -> dict:
+        # time in a span minus the time of the spans nested directly inside it, per thread
+        totals = {}
+        by_thread = {}
+        for span in self.spans:
+            by_thread.setdefault(span[3], []).append(span)
+        for spans in by_thread.values():
+            spans.sort(key=lambda s: (s[1], -s[2]))
+            stack = []  # [name, end_ns, child_ns]
+            for name, start, duration, _, _ in spans:
+                while stack and stack[-1][1] <= start:
+                    done = stack.pop()
+                    totals[done[0]] = totals.get(done[0], 0) + done[3] - done[2]
+                if stack:
+                    stack[-1][2] += duration
+                stack.append([name, start + duration, 0, duration])
+            for done in stack:
+                totals[done[0]] = totals.get(done[0], 0) + done[3] - done[2]
+        return totals
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'start')
+
+    def __init__(self, profiler: Profiler, name: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_span(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str, **args):
+    """Context manager timing a stage; ``args`` are attached to the trace event."""
+    profiler = _active
+    if profiler is None:
+        return _null_span
+    return _Span(profiler, name, args or None)
+
+
+def count(name: str, n=1):
+    """Adds ``n`` to a counter such as bytes read, cells processed or cache hits."""
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+@contextmanager
+def profile(path: str = None, trace: str = None, trace_memory: bool = False):
+    """
+    Profiles the enclosed block.
+
+    Args:
+        path (str): Writes the per-stage summary as JSON here on exit.
+        trace (str): Writes a Chrome trace here on exit.
+        trace_memory (bool): See ``Profiler``.
+
+    Yields:
+        Profiler
+    """
+    profiler = Profiler(trace_memory=trace_memory).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        if path:
+            profiler.write_json(path)
+        if trace:
+            profiler.write_trace(trace)
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _write(path: str, obj):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(obj, file, indent=1, default=str)
@@ -8,6 +8,62 @@ upstream_model_keys = ['input_hierarchy', 'models']
 input_sources_keys = ['input_sources']
 input_cache_keys = ['input_cache']
 
+# on-disk cache of opened inputs
+input_cache_enabled = False
+input_cache_dir = None  # None uses ~/.cache/geoconfig/inputs
+input_cache_max_bytes = 20 * 1024**3
+input_cache_hash_content = False  # hash file contents instead of path, mtime and size
+
+# classification settings
+classify_cache_size = 1 << 16  # distinct leaf values whose input type is memoized
+classify_stat_workers = 16  # threads used to stat candidate filepaths in a batch
+
+# raster reading settings
+raster_chunk_size = 1024  # target chunk edge in cells, rounded up to the native block size
+raster_memory_limit = 512 * 1024**2  # bytes of decoded raster held in memory per opened raster
+
+# vector reading settings
+vector_batch_size = 65536  # features per record batch
+
+# csv point reading settings
+csv_chunksize = 1_000_000  # rows parsed per chunk
+
+# netcdf reading settings
+netcdf_chunks = 'auto'  # dask chunks for opened datasets, {} keeps the file's own chunking
+
+# combine settings
+combine_chunk_size = 1024  # chunk edge in cells of the stores written by the combine stage
+
+# input reading settings
+read_max_workers = None  # workers per read pool, None picks a default from the CPU count
+
+# yaml parsing settings
+yaml_cache_size = 4096  # parsed documents kept in memory per process
+yaml_disk_cache_dir = None  # directory for pickled parsed documents, None disables it
+yaml_remote_ttl = 5.0  # seconds a remote document is trusted before its stamp is checked again
+
+# async pipeline settings
+async_max_concurrency = 32  # blocking stat/read/fetch calls in flight at once
+
+# expression settings
+expression_chunk_cells = 1 << 16  # cells evaluated per block, small enough to stay in cache
+expression_cache_size = 1024  # compiled expressions kept, keyed by source string
+
+# reprojection settings
+reproject_tile_size = 512  # target tile edge in cells, one tile per thread task
+reproject_cache_bytes = 512 * 1024**2  # transformed cell centres kept per process
+reproject_control_step = 16  # positions between exactly transformed points, the rest are interpolated
+reproject_max_error = 0.05  # interpolation error allowed, in target cells, before falling back to exact
+
+# mask and clip index settings
+mask_tile_size = 256  # tile edge in cells of the inside/outside/boundary index
+mask_tile_cache_size = 1024  # boundary tile masks kept per index
+mask_index_cache_size = 16  # compiled indexes shared per process
+
+# batch settings
+batch_chunksize = 8  # configs per batch task
+batch_upstream_cache_size = 256  # parsed upstream models kept per worker
+
 # model parameters
 
 
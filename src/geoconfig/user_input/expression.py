@@ -0,0 +1,220 @@
+import ast
+import importlib
+import math
+import re
+from functools import lru_cache
+
+from ..settings.config import expression_chunk_cells, expression_cache_size
+
+# `$py:module.function(` calls and `$:source.field` references
+_token_pattern = re.compile(r"\$py:([A-Za-z_][\w.]*)(?=\s*\()|\$:([A-Za-z_][\w.]*)")
+
+_binary_ops = {
+    ast.Add: ('+', 'add'),
+    ast.Sub: ('-', 'subtract'),
+    ast.Mult: ('*', 'multiply'),
+    ast.Div: ('/', 'true_divide'),
+    ast.FloorDiv: ('//', 'floor_divide'),
+    ast.Mod: ('%', 'remainder'),
+    ast.Pow: ('**', 'power'),
+}
+_unary_ops = {
+    ast.USub: 'negative',
+    ast.UAdd: 'positive',
+}
+
+
+class CompiledExpression:
+    """An arithmetic expression over ``$:`` references and ``$py:`` calls, parsed once.
+
+    Evaluation runs over blocks of the leading axis so every intermediate result
+    is block sized rather than a full-size temporary per operator.
+    """
+
+    def __init__(self, source: str, tree: ast.expr, references: dict, functions: dict):
+        self.source = source
+        self.tree = tree
+        self.references = references  # placeholder name -> '$:source.field'
+        self.functions = functions  # placeholder name -> 'module.function'
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.source!r})"
+
+    @property
+    def operation(self):
+        """Symbol of the outermost operator, None if the expression is not a binary operation."""
+        if isinstance(self.tree, ast.BinOp):
+            return _binary_ops[type(self.tree.op)][0]
+        return None
+
+    @property
+    def call(self):
+        """Dotted name of the outermost ``$py:`` call, None if the expression is not a call."""
+        if isinstance(self.tree, ast.Call):
+            return self.functions[self.tree.func.id]
+        return None
+
+    def evaluate(self, values: dict, chunk_cells: int = None):
+        """
+        Evaluates the expression.
+
+        Args:
+            values (dict): Value for every reference, keyed by the reference
+                string (e.g. ``'$:dem'``). Values can be scalars, arrays or lazy
+                array-likes that support row slicing.
+            chunk_cells (int): Approximate number of cells evaluated per block.
+
+        Returns:
+            The result as a scalar or array.
+        """
+        import numpy as np
+
+        env = {}
+        for name, reference in self.references.items():
+            if reference not in values:
+                raise KeyError(f"No value given for {reference} in {self.source!r}")
+            env[name] = values[reference]
+
+        # calls run once on whole arrays, the arithmetic around them is chunked
+        tree = self._hoist_calls(self.tree, env)
+
+        operands = [env[node.id] for node in ast.walk(tree) if isinstance(node, ast.Name)]
+        shape = np.broadcast_shapes(*(tuple(np.shape(v)) if not hasattr(v, 'shape') else tuple(v.shape)
+                                      for v in operands)) if operands else ()
+        if not shape:
+            return _eval_node(tree, env)[0]
+
+        chunk_cells = chunk_cells or expression_chunk_cells
+        block_rows = max(1, chunk_cells // max(1, math.prod(shape[1:])))
+        out = None
+        for r0 in range(0, shape[0], block_rows):
+            r1 = min(r0 + block_rows, shape[0])
+            block_env = {name: _block(value, shape, r0, r1) for name, value in env.items()}
+            block = np.broadcast_to(_eval_node(tree, block_env)[0], (r1 - r0,) + shape[1:])
+            if out is None:
+                out = np.empty(shape, dtype=block.dtype)
+            out[r0:r1] = block
+        return out
+
+    def _hoist_calls(self, node, env):
+        if isinstance(node, ast.Call):
+            args = [self._evaluate_full(self._hoist_calls(arg, env), env) for arg in node.args]
+            name = f"_c{len(env)}"
+            env[name] = _import_function(self.functions[node.func.id])(*args)
+            return ast.Name(id=name, ctx=ast.Load())
+        if isinstance(node, ast.BinOp):
+            return ast.BinOp(
+                left=self._hoist_calls(node.left, env), op=node.op, right=self._hoist_calls(node.right, env))
+        if isinstance(node, ast.UnaryOp):
+            return ast.UnaryOp(op=node.op, operand=self._hoist_calls(node.operand, env))
+        return node
+
+    def _evaluate_full(self, node, env):
+        if isinstance(node, ast.Name):
+            return env[node.id]
+        return _eval_node(node, env)[0]
+
+
+@lru_cache(maxsize=expression_cache_size)
+def compile_expression(source: str) -> CompiledExpression:
+    """Parses ``source`` into a ``CompiledExpression``; results are cached by source string."""
+    references = {}
+    functions = {}
+
+    def substitute(match):
+        function, reference = match.groups()
+        if function:
+            name = f"_f{len(functions)}"
+            functions[name] = function
+            return name
+        token = match.group(0)
+        for name, existing in references.items():
+            if existing == token:
+                return name
+        name = f"_r{len(references)}"
+        references[name] = token
+        return name
+
+    try:
+        tree = ast.parse(_token_pattern.sub(substitute, source).strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {source!r}: {e.msg}") from None
+
+    for node in ast.walk(tree):
+        _check_node(node, source, references, functions)
+    return CompiledExpression(source, tree, references, functions)
+
+
+def _check_node(node, source, references, functions):
+    if isinstance(node, ast.BinOp) and type(node.op) not in _binary_ops:
+        raise ValueError(f"Unsupported operator in {source!r}")
+    if isinstance(node, ast.UnaryOp) and type(node.op) not in _unary_ops:
+        raise ValueError(f"Unsupported operator in {source!r}")
+    if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+        raise ValueError(f"Unsupported constant {node.value!r} in {source!r}")
+    if isinstance(node, ast.Name) and node.id not in references and node.id not in functions:
+        raise ValueError(f"Unknown name {node.id!r} in {source!r}; use $: or $py: prefixes")
+    if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name)
+                                       or node.func.id not in functions):
+        raise ValueError(f"Only positional $py: calls are supported in {source!r}")
+    allowed = (ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Call, ast.operator, ast.unaryop, ast.Load)
+    if not isinstance(node, allowed):
+        raise ValueError(f"Unsupported syntax {type(node).__name__} in {source!r}")
+
+
+def _eval_node(node, env):
+    """Returns (value, owned) where owned marks a temporary that can be written in place."""
+    import numpy as np
+
+    if isinstance(node, ast.Constant):
+        return node.value, False
+    if isinstance(node, ast.Name):
+        return env[node.id], False
+    if isinstance(node, ast.UnaryOp):
+        operand, owned = _eval_node(node.operand, env)
+        ufunc = getattr(np, _unary_ops[type(node.op)])
+        if owned:
+            return ufunc(operand, out=operand), True
+        return ufunc(operand), isinstance(operand, np.ndarray) or np.ndim(operand) > 0
+
+    left, left_owned = _eval_node(node.left, env)
+    right, right_owned = _eval_node(node.right, env)
+    ufunc = getattr(np, _binary_ops[type(node.op)][1])
+    if left_owned or right_owned:
+        result_dtype = _result_dtype(ufunc, left, right)
+        for candidate, owned in ((left, left_owned), (right, right_owned)):
+            if owned and candidate.dtype == result_dtype and candidate.shape == np.broadcast_shapes(
+                    np.shape(left), np.shape(right)):
+                return ufunc(left, right, out=candidate), True
+    result = ufunc(left, right)
+    return result, np.ndim(result) > 0
+
+
+def _result_dtype(ufunc, left, right):
+    """Output dtype of the loop ``ufunc`` picks for the operands, None when it cannot be told in advance."""
+    import numpy as np
+
+    def operand(value):
+        return value.dtype if isinstance(value, (np.ndarray, np.generic)) else type(value)
+    try:
+        return ufunc.resolve_dtypes((operand(left), operand(right), None))[-1]
+    except TypeError:  # python scalars need numpy 2; no loop is left for the ufunc call to report
+        return None
+
+
+def _block(value, shape, r0, r1):
+    import numpy as np
+
+    if not hasattr(value, 'shape') or len(value.shape) == 0:
+        return value
+    if tuple(value.shape) == shape:
+        return np.asarray(value[r0:r1])
+    return np.broadcast_to(np.asarray(value), shape)[r0:r1]
+
+
+@lru_cache(maxsize=None)
+def _import_function(dotted_name: str):
+    module, _, function = dotted_name.rpartition('.')
+    if not module:
+        raise ValueError(f"Expected module.function, got {dotted_name!r}")
+    return getattr(importlib.import_module(module), function)
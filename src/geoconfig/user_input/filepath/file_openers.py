@@ -3,36 +3,78 @@ from abc import ABC, abstractmethod
 
 @dataclass
 class FileOpener(ABC):
+    """Opens one kind of file; heavy readers are imported inside ``open``.
+
+    The flags tell the hierarchy stage how to treat what ``open`` returns.
+    Openers are registered by name in ``opener_registry``.
+    """
+    # openers dominated by decoding rather than I/O wait are read in a process pool;
+    # only set it for openers that return materialized data, lazy views pickle without it
+    cpu_bound = False
+    # openers that accept a `columns` kwarg
+    selects_columns = False
+    # openers that yield features which must be rasterized onto the hierarchy grid
+    vector = False
+    # openers that yield point tables which must be snapped onto the hierarchy grid
+    points = False
+    # used by entry-point openers, built-ins are registered with theirs
+    extensions = ()
+    magic = ()
+
     @abstractmethod
-    def open(filepath, opener_kwargs):
+    def open(self, filepath, **kwargs):
         pass
 
 
 @dataclass
 class YamlOpener(FileOpener):
+    type = 'yaml'
 
-    def open(filepath, opener_kwargs=None):
-        from yaml import load, BaseLoader
+    def open(self, filepath, **kwargs):
+        from .yaml_cache import yaml_document_cache
 
-        with open(filepath, "r") as file:
-            return load(file, Loader=BaseLoader)
+        return yaml_document_cache.load(filepath)
 
 @dataclass
 class RasterOpener(FileOpener):
-    def open(self, opener_kwargs=None):
-        pass
+    type = 'geotiff'
+
+    def open(self, filepath, **kwargs):
+        from .raster import ChunkedRaster
+
+        return ChunkedRaster(filepath, **kwargs)
 
 @dataclass
 class ShapefileOpener(FileOpener):
-    def open(self, opener_kwargs=None):
-        pass
+    type = 'shapefile'
+    # HierInput passes its column names so only those attributes are read
+    selects_columns = True
+    vector = True
+
+    def open(self, filepath, **kwargs):
+        from .vector import VectorBatchReader
+
+        return VectorBatchReader(filepath, **kwargs)
 
 @dataclass
 class NetCDFOpener(FileOpener):
-    def open(self, opener_kwargs=None):
-        pass
+    type = 'netcdf'
+
+    def open(self, filepath, **kwargs):
+        from .netcdf import open_netcdf
+
+        return open_netcdf(filepath, **kwargs)
 
 @dataclass
 class CSVOpener(FileOpener):
-    def open(self, opener_kwargs=None):
-        pass
\ No newline at end of file
+    type = 'csv'
+    # parsing text dominates, and only the HierInput columns are parsed
+    cpu_bound = True
+    selects_columns = True
+    # point tables are snapped onto the hierarchy grid
+    points = True
+
+    def open(self, filepath, **kwargs):
+        from .points import read_points
+
+        return read_points(filepath, **kwargs)
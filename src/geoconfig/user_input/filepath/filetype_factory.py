@@ -1,42 +1,25 @@
-from typing import Dict, Union
-from .file_openers import (
-    FileOpener,
-    YamlOpener,
-    RasterOpener,
-    ShapefileOpener,
-    NetCDFOpener,
-    CSVOpener
-)
+from typing import Dict
+from .file_openers import FileOpener
+from .opener_registry import OpenerRegistry, opener_registry
 
 class FileTypeFactory:
-    def __init__(self):
-        self._registery: Dict[str, FileOpener] = {}
-    
+    """Extension view of the shared ``opener_registry``."""
+
+    def __init__(self, registry: OpenerRegistry = None):
+        self._registry = registry or opener_registry
+
     def register(self, ext: str, definition: FileOpener):
-        # TODO: error checking
-        self._registery[ext] = definition
-    
-    def get(self, ext: str) -> Union[FileOpener, None]:
-        try :
-            return self._registery[ext]
-        except KeyError:
-            return ValueError(f"Extension {ext} not found in registry.")
+        # an extension registered here is an opener named after it
+        self._registry.register(ext, definition, extensions=(ext,))
+
+    def get(self, ext: str) -> FileOpener:
+        return self._registry.get_extension(ext)
+
+    def list_types(self) -> Dict[str, str]:
+        return self._registry.extensions()
 
-    def list_types(self) -> Dict[str, FileOpener]:
-        return self._registery
-    
     def open(self, filepath, opener_kwargs=None):
-        ext = filepath.split(".")[-1]
-        opener = self.get(ext)
-        return opener.open(filepath, opener_kwargs)
+        return self._registry.open(filepath, opener_kwargs)
     
 
-filetype_factory = FileTypeFactory()  
-
-# Register valid types of inputs in the yaml file
-filetype_factory.register("yaml", YamlOpener)
-filetype_factory.register("tif", RasterOpener)
-filetype_factory.register("asc", RasterOpener)
-filetype_factory.register("shp", ShapefileOpener)
-filetype_factory.register("cdf", NetCDFOpener)
-filetype_factory.register("csv", CSVOpener)
+filetype_factory = FileTypeFactory()
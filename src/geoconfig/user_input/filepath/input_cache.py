@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from ...settings.config import (
+    input_cache_enabled,
+    input_cache_dir,
+    input_cache_max_bytes,
+    input_cache_hash_content,
+)
+from ...profiling import count
+from .remote import file_stamp, is_remote
+
+
+class InputCache:
+    """Content-addressed on-disk cache of opened input arrays.
+
+    Entries are ``.npy`` files named by a hash of the source file identity and
+    the opener kwargs, so they can be memory-mapped back on a hit. Rasters keep
+    their transform, CRS, nodata and fill value in a ``.json`` next to the entry
+    and come back as a ``CachedRaster``. Arrays with other metadata, such as
+    the coordinates of a netCDF variable, are not cached. The total size is kept
+    under ``max_bytes`` by evicting the least recently used entries.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str = None,
+            max_bytes: int = None,
+            hash_content: bool = None,
+            enabled: bool = None):
+        self.cache_dir = cache_dir or input_cache_dir or os.path.join(
+            os.path.expanduser('~'), '.cache', 'geoconfig', 'inputs')
+        self.max_bytes = input_cache_max_bytes if max_bytes is None else max_bytes
+        self.hash_content = input_cache_hash_content if hash_content is None else hash_content
+        self.enabled = input_cache_enabled if enabled is None else enabled
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.cache_dir})"
+
+    def key(self, filepath: str, opener_kwargs: dict = None) -> str:
+        token = {
+            'file': self._file_identity(filepath),
+            'opener_kwargs': self._fingerprint(opener_kwargs or {}),
+        }
+        return hashlib.sha256(json.dumps(token, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str, filepath: str = None):
+        entry = self._entry_path(key)
+        try:
+            os.utime(entry)  # mark as recently used
+        except FileNotFoundError:
+            return None
+
+        import numpy as np
+        data = np.load(entry, mmap_mode='r')
+        try:
+            with open(self._metadata_path(key)) as file:
+                metadata = json.load(file)
+        except FileNotFoundError:
+            return data
+        from .raster import CachedRaster
+        return CachedRaster.from_metadata(data, metadata, filepath=filepath)
+
+    def put(self, key: str, data, filepath: str = None):
+        """
+        Writes ``data`` to the cache and returns it memory-mapped from disk.
+
+        Returns None if ``data`` is neither a raster view nor a plain array, or
+        cannot be materialized.
+        """
+        import numpy as np
+        from numpy.lib.format import open_memmap
+
+        raster = hasattr(data, 'iter_chunks') and hasattr(data, 'transform')
+        if not (raster or isinstance(data, np.ndarray)):
+            return None  # lazy or labelled arrays would lose their chunks or coordinates
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            if raster:
+                # stream lazy rasters chunk by chunk instead of materializing them
+                out = open_memmap(tmp_path, mode='w+', dtype=data.dtype, shape=data.shape)
+                for rows, cols, chunk in data.iter_chunks():
+                    out[rows, cols] = chunk
+                out.flush()
+                del out
+                from .raster import raster_metadata
+                # the metadata lands first so an entry is never seen without it
+                self._write_metadata(key, raster_metadata(data))
+            else:
+                with open(tmp_path, 'wb') as file:
+                    np.save(file, data, allow_pickle=False)
+            os.replace(tmp_path, self._entry_path(key))
+        except (MemoryError, ValueError, TypeError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        self.evict()
+        return self.get(key, filepath=filepath)
+
+    def open(self, filepath: str, opener, opener_kwargs: dict = None):
+        """
+        Opens ``filepath`` through the cache.
+
+        Args:
+            filepath (str): Source file, used for the cache key.
+            opener: Zero-argument callable that opens and processes the input.
+            opener_kwargs (dict): Opener kwargs, used for the cache key.
+
+        Returns:
+            The cached array on a hit, otherwise the opener result (memory-mapped
+            from the cache when it is a raster or a plain array).
+        """
+        if not self.enabled:
+            return opener()
+
+        key = self.key(filepath, opener_kwargs=opener_kwargs)
+        cached = self.get(key, filepath=filepath)
+        if cached is not None:
+            count('input_cache.hits')
+            return cached
+
+        count('input_cache.misses')
+        data = opener()
+        stored = self.put(key, data, filepath=filepath)
+        return data if stored is None else stored
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npy'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (entry_path, entry_path[:-len('.npy')] + '.json'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(('.npy', '.json')):
+                os.remove(entry.path)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _metadata_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _write_metadata(self, key: str, metadata: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(metadata, file)
+        os.replace(tmp_path, self._metadata_path(key))
+
+    def _file_identity(self, filepath: str):
+        if is_remote(filepath):
+            return [filepath, *file_stamp(filepath)]  # object contents are not downloaded to hash them
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        if self.hash_content:
+            digest = hashlib.sha256()
+            with open(filepath, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(block)
+            return digest.hexdigest()
+        return [filepath, stat.st_mtime_ns, stat.st_size]
+
+    def _fingerprint(self, obj):
+        # input_types imports this module, so the spec class is looked up here
+        from ..input_types import FilepathInput
+
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj  # strings are hashed as written, a lookup must not stat every one
+        if isinstance(obj, FilepathInput):
+            return self._file_identity(obj.filepath)
+        if isinstance(obj, dict):
+            return {str(k): self._fingerprint(v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._fingerprint(v) for v in obj]
+        if hasattr(obj, 'tobytes') and hasattr(obj, 'dtype'):
+            return [str(obj.dtype), list(obj.shape), hashlib.sha256(obj.tobytes()).hexdigest()]
+        return repr(obj)
+
+
+input_cache = InputCache()
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from ...settings.config import async_max_concurrency
+
+
+class IOPool:
+    """Runs the blocking calls of the async pipeline with bounded concurrency.
+
+    The executor threads act as the connection pool: stat, range read and fetch
+    calls from every coroutine share them, so at most ``max_concurrency``
+    requests are in flight. A semaphore per event loop keeps the coroutines
+    beyond that waiting in the loop rather than queued in the executor.
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        self.max_concurrency = max_concurrency or async_max_concurrency
+        self._executor = None
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(max_concurrency={self.max_concurrency})"
+
+    async def run(self, fn, *args, **kwargs):
+        """Awaits ``fn(*args, **kwargs)`` run on the pool."""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(self._get_executor(), partial(fn, *args, **kwargs))
+
+    async def map(self, fn, items) -> list:
+        """Awaits ``fn(item)`` for every item concurrently; results keep the order of ``items``."""
+        return list(await asyncio.gather(*(self.run(fn, item) for item in items)))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='geoconfig-io')
+            return self._executor
+
+    def _semaphore(self, loop) -> asyncio.Semaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+
+io_pool = IOPool()
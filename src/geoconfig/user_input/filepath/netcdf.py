@@ -0,0 +1,84 @@
+from ...settings.config import netcdf_chunks
+
+x_names = ('x', 'lon', 'longitude', 'easting')
+y_names = ('y', 'lat', 'latitude', 'northing')
+time_names = ('time', 't')
+
+
+def open_netcdf(
+        filepath: str,
+        variables=None,
+        time=None,
+        bounds: tuple = None,
+        chunks=None,
+        x_dim: str = None,
+        y_dim: str = None,
+        time_dim: str = None,
+        engine: str = None):
+    """
+    Opens a NetCDF file as a lazy, dask-chunked xarray object.
+
+    Only coordinates are read here. Variable, time and bounds selections are
+    applied as lazy indexing, so later reads touch only the chunks of the slices
+    that are used.
+
+    Args:
+        filepath (str): NetCDF file.
+        variables: Variable name or list of names. A single name returns a
+            ``DataArray``, otherwise a ``Dataset`` is returned.
+        time: A time label, a list of labels or a (start, stop) pair selecting an
+            inclusive range.
+        bounds (tuple): (xmin, ymin, xmax, ymax) in the file's coordinates.
+        chunks: Dask chunks, defaults to ``netcdf_chunks``.
+        x_dim (str): Name of the x dimension, detected from common names and CF
+            ``axis`` attributes when not given. Likewise ``y_dim`` and ``time_dim``.
+        engine (str): xarray backend engine.
+
+    Returns:
+        xarray.Dataset or xarray.DataArray
+    """
+    import xarray as xr
+
+    dataset = xr.open_dataset(
+        filepath,
+        chunks=netcdf_chunks if chunks is None else chunks,
+        engine=engine)
+
+    if variables is not None:
+        dataset = dataset[variables if isinstance(variables, str) else list(variables)]
+
+    if time is not None:
+        time_dim = time_dim or _find_dim(dataset, time_names, 'T')
+        if time_dim is None:
+            raise ValueError(f"No time dimension found in {filepath}.")
+        if isinstance(time, tuple):
+            time = slice(*time)
+        dataset = dataset.sel({time_dim: time})
+
+    if bounds is not None:
+        x_dim = x_dim or _find_dim(dataset, x_names, 'X')
+        y_dim = y_dim or _find_dim(dataset, y_names, 'Y')
+        if x_dim is None or y_dim is None:
+            raise ValueError(f"No x/y dimensions found in {filepath} to subset by bounds.")
+        xmin, ymin, xmax, ymax = bounds
+        dataset = dataset.sel({
+            x_dim: _coord_slice(dataset[x_dim], xmin, xmax),
+            y_dim: _coord_slice(dataset[y_dim], ymin, ymax),
+        })
+    return dataset
+
+
+def _find_dim(dataset, names: tuple, axis: str):
+    for dim in dataset.dims:
+        if dim.lower() in names:
+            return dim
+        if dim in dataset.coords and dataset.coords[dim].attrs.get('axis') == axis:
+            return dim
+    return None
+
+
+def _coord_slice(coord, low, high) -> slice:
+    # label slices follow the coordinate order, and y often runs north to south
+    if coord.size > 1 and coord[0] > coord[-1]:
+        return slice(high, low)
+    return slice(low, high)
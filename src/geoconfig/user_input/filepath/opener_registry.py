@@ -0,0 +1,194 @@
+import os
+import threading
+import warnings
+from dataclasses import dataclass, field
+from importlib import import_module
+
+entry_point_group = 'geoconfig.openers'
+sniff_bytes = 512  # bytes read from a file to match magic numbers
+
+
+@dataclass
+class OpenerEntry:
+    """A registered opener, held as a 'module:Class' string until it is first used."""
+
+    name: str
+    target: object  # 'module:Class' or the class itself
+    extensions: tuple = ()
+    magic: tuple = ()  # byte prefixes that identify the format when the extension does not
+    opener: type = field(default=None, repr=False)
+
+    def load(self) -> type:
+        if self.opener is None:
+            if isinstance(self.target, str):
+                module, _, attr = self.target.partition(':')
+                self.opener = getattr(import_module(module), attr)
+            else:
+                self.opener = self.target
+        return self.opener
+
+
+class OpenerRegistry:
+    """Single registry of file openers for geoconfig and geohierarchy.
+
+    Openers are registered by name with their extensions and magic bytes and
+    imported only when a file first needs them. A file is matched by extension
+    first and by its leading bytes when the extension is missing or unknown.
+    Third-party openers are discovered from the ``geoconfig.openers`` entry
+    point group the first time the built-in openers cannot match a file; the
+    entry point name is the opener name and the class declares ``extensions``
+    and ``magic``.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._extensions = {}
+        self._lock = threading.Lock()
+        # held for the whole discovery, so other threads wait for a full registry
+        self._discovery_lock = threading.Lock()
+        self._entry_points_loaded = False
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self._entries)})"
+
+    def register(self, name: str, target, extensions=(), magic=(), replace: bool = True):
+        """
+        Registers an opener.
+
+        Args:
+            name (str): Opener name.
+            target: The opener class, or 'module:Class' to import it on first use.
+            extensions: File extensions (without the dot) the opener handles.
+            magic: Byte prefixes identifying the format from the file content.
+            replace (bool): Replace an opener already registered under ``name``
+                or one of ``extensions``; if False those are kept.
+        """
+        extensions = tuple(ext.lower().lstrip('.') for ext in extensions)
+        with self._lock:
+            if name in self._entries and not replace:
+                return self._entries[name]
+            entry = OpenerEntry(name=name, target=target, extensions=extensions, magic=tuple(magic))
+            self._entries[name] = entry
+            for ext in extensions:
+                if replace or ext not in self._extensions:
+                    self._extensions[ext] = name
+        return entry
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._entries.pop(name, None)
+            self._extensions = {ext: n for ext, n in self._extensions.items() if n != name}
+
+    def names(self) -> list:
+        return list(self._entries)
+
+    def extensions(self) -> dict:
+        """Extension -> opener name."""
+        return dict(self._extensions)
+
+    def resolve(self, name: str) -> type:
+        """The opener class registered under ``name``, imported on first use."""
+        entry = self._entries.get(name)
+        if entry is None:
+            self.load_entry_points()
+            entry = self._entries.get(name)
+        if entry is None:
+            raise ValueError(f"No opener registered under {name!r}.")
+        return entry.load()
+
+    def name_for(self, filepath: str):
+        """Name of the opener for a file: by extension, then by content. None if nothing matches."""
+        name = self._match(filepath)
+        if name is None and not self._entry_points_loaded:
+            self.load_entry_points()
+            name = self._match(filepath)
+        return name
+
+    def get(self, filepath: str):
+        """The opener class for a file, or None."""
+        name = self.name_for(filepath)
+        return self.resolve(name) if name is not None else None
+
+    def get_extension(self, ext: str) -> type:
+        """The opener class registered for an extension; raises ValueError if there is none."""
+        name = self._extensions.get(ext.lower().lstrip('.'))
+        if name is None and not self._entry_points_loaded:
+            self.load_entry_points()
+            name = self._extensions.get(ext.lower().lstrip('.'))
+        if name is None:
+            raise ValueError(f"Extension {ext} not found in registry.")
+        return self.resolve(name)
+
+    def open(self, filepath: str, opener_kwargs: dict = None):
+        """Opens a file with its registered opener."""
+        opener = self.get(filepath)
+        if opener is None:
+            raise ValueError(f"No opener registered for {filepath}")
+        return opener().open(filepath, **(opener_kwargs or {}))
+
+    def load_entry_points(self):
+        """
+        Registers the openers advertised by installed packages, once per process.
+
+        A plugin that fails to import is skipped with a warning, so it does not
+        keep the plugins after it from loading.
+        """
+        with self._discovery_lock:
+            if self._entry_points_loaded:
+                return
+            from importlib.metadata import entry_points
+
+            for entry_point in entry_points(group=entry_point_group):
+                try:
+                    opener = entry_point.load()
+                except Exception as error:
+                    warnings.warn(f"Skipping opener plugin {entry_point.name!r}: {type(error).__name__}: {error}")
+                    continue
+                self.register(
+                    entry_point.name,
+                    opener,
+                    extensions=getattr(opener, 'extensions', ()),
+                    magic=getattr(opener, 'magic', ()),
+                    replace=False)
+            with self._lock:
+                self._entry_points_loaded = True
+
+    def _match(self, filepath: str):
+        ext = os.path.splitext(str(filepath))[1].lower().lstrip('.')
+        name = self._extensions.get(ext)
+        if name is not None:
+            return name
+        return self._sniff(filepath)
+
+    def _sniff(self, filepath: str):
+        candidates = [entry for entry in self._entries.values() if entry.magic]
+        if not candidates or not os.path.isfile(filepath):
+            return None
+        try:
+            with open(filepath, 'rb') as file:
+                head = file.read(sniff_bytes)
+        except OSError:
+            return None
+        for entry in candidates:
+            if any(head.startswith(prefix) for prefix in entry.magic):
+                return entry.name
+        return None
+
+
+opener_registry = OpenerRegistry()
+
+_openers = 'geoconfig.user_input.filepath.file_openers'
+opener_registry.register('yaml', f'{_openers}:YamlOpener', extensions=('yaml', 'yml'))
+opener_registry.register(
+    'raster', f'{_openers}:RasterOpener',
+    extensions=('tif', 'tiff', 'asc', 'vrt'),
+    magic=(b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+', b'ncols', b'NCOLS', b'<VRTDataset'))
+opener_registry.register(
+    'vector', f'{_openers}:ShapefileOpener',
+    extensions=('shp', 'gpkg', 'geojson', 'fgb'),
+    magic=(b'\x00\x00\x27\x0a', b'SQLite format 3\x00', b'fgb\x03'))
+opener_registry.register(
+    'netcdf', f'{_openers}:NetCDFOpener',
+    extensions=('nc', 'cdf', 'nc4'),
+    magic=(b'CDF\x01', b'CDF\x02', b'CDF\x05', b'\x89HDF\r\n\x1a\n'))
+opener_registry.register('csv', f'{_openers}:CSVOpener', extensions=('csv',))
@@ -0,0 +1,197 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ...settings.config import csv_chunksize
+
+
+@dataclass
+class PointTable:
+    """Columnar point data: x and y coordinates plus named attribute arrays."""
+
+    x: np.ndarray
+    y: np.ndarray
+    columns: dict = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == 'x':
+            return self.x
+        if name == 'y':
+            return self.y
+        return self.columns[name]
+
+    def take(self, indices) -> 'PointTable':
+        return PointTable(
+            x=self.x[indices],
+            y=self.y[indices],
+            columns={name: values[indices] for name, values in self.columns.items()})
+
+    @property
+    def bounds(self):
+        if not len(self):
+            return None
+        return self.x.min(), self.y.min(), self.x.max(), self.y.max()
+
+
+def read_points(
+        filepath: str,
+        x: str = 'x',
+        y: str = 'y',
+        columns: list = None,
+        dtypes: dict = None,
+        chunksize: int = None,
+        bounds: tuple = None,
+        **read_csv_kwargs) -> PointTable:
+    """
+    Reads points from a CSV in chunks, keeping only the needed columns.
+
+    Args:
+        filepath (str): CSV file.
+        x (str): Name of the x column.
+        y (str): Name of the y column.
+        columns (list): Attribute columns to keep besides x and y.
+        dtypes (dict): Column name -> dtype. Columns not listed are read as float64.
+        chunksize (int): Rows parsed per chunk.
+        bounds (tuple): (xmin, ymin, xmax, ymax); points outside are dropped as
+            each chunk is read, so memory follows the points kept.
+        **read_csv_kwargs: Passed on to ``pandas.read_csv`` (e.g. ``sep``).
+
+    Returns:
+        PointTable: The points with one array per column.
+    """
+    import pandas as pd
+
+    columns = [c for c in (columns or []) if c not in (x, y)]
+    usecols = [x, y] + columns
+    dtype = {name: np.float64 for name in usecols}
+    dtype.update(dtypes or {})
+
+    parts = {name: [] for name in usecols}
+    reader = pd.read_csv(
+        filepath,
+        usecols=usecols,
+        dtype=dtype,
+        chunksize=chunksize or csv_chunksize,
+        **read_csv_kwargs)
+    with reader:
+        for chunk in reader:
+            keep = None
+            if bounds is not None:
+                xmin, ymin, xmax, ymax = bounds
+                xs, ys = chunk[x].to_numpy(), chunk[y].to_numpy()
+                keep = (xs >= xmin) & (xs <= xmax) & (ys >= ymin) & (ys <= ymax)
+            for name in usecols:
+                values = chunk[name].to_numpy()
+                parts[name].append(values if keep is None else values[keep])
+
+    arrays = {
+        name: np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype[name])
+        for name, chunks in parts.items()}
+    return PointTable(x=arrays.pop(x), y=arrays.pop(y), columns=arrays)
+
+
+class GridBucketIndex:
+    """Spatial index that buckets points by the grid cell they fall in.
+
+    Building it is one vectorized cell lookup and a sort (O(n log n)). After
+    that, the points in any set of cells are found through offsets into the
+    sorted order, without scanning the table again.
+    """
+
+    def __init__(self, points: PointTable, grid):
+        """
+        Args:
+            points (PointTable): Points to index.
+            grid: Target grid with ``shape`` and ``rowcol(x, y)`` (e.g. ``geohierarchy.grid.Grid``).
+        """
+        self.points = points
+        self.grid = grid
+        nrows, ncols = grid.shape
+
+        rows, cols = grid.rowcol(points.x, points.y)
+        inside = (rows >= 0) & (rows < nrows) & (cols >= 0) & (cols < ncols)
+        self.rows = rows
+        self.cols = cols
+        self.inside = inside
+
+        cell = np.where(inside, rows * ncols + cols, -1)
+        self.order = np.argsort(cell, kind='stable')
+        sorted_cells = cell[self.order]
+        first_inside = np.searchsorted(sorted_cells, 0)
+        self.order = self.order[first_inside:]
+        sorted_cells = sorted_cells[first_inside:]
+
+        # CSR layout: the points of cells[i] are order[offsets[i]:offsets[i + 1]]
+        self.cells, starts = np.unique(sorted_cells, return_index=True)
+        self.offsets = np.append(starts, len(sorted_cells)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.order)
+
+    def points_in_cells(self, cells) -> np.ndarray:
+        """Indices of the points that fall in the given flat cell ids."""
+        cells = np.asarray(cells, dtype=np.int64).ravel()
+        pos = np.searchsorted(self.cells, cells)
+        pos = pos[(pos < len(self.cells)) & (self.cells[np.minimum(pos, len(self.cells) - 1)] == cells)]
+        starts, stops = self.offsets[pos], self.offsets[pos + 1]
+        lengths = stops - starts
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int64)
+        bucket = np.repeat(np.arange(len(pos)), lengths)
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self.order[starts[bucket] + within]
+
+    def within_mask(self, mask: np.ndarray) -> np.ndarray:
+        """Indices of the points whose cell is True in ``mask``."""
+        occupied = np.asarray(mask, dtype=bool).reshape(-1)[self.cells]
+        return self.points_in_cells(self.cells[occupied])
+
+    def within_bounds(self, bounds: tuple) -> np.ndarray:
+        """Indices of the points in the cells overlapping ``bounds``."""
+        xmin, ymin, xmax, ymax = bounds
+        nrows, ncols = self.grid.shape
+        rows, cols = self.grid.rowcol(np.array([xmin, xmax]), np.array([ymin, ymax]))
+        r0, r1 = np.clip([rows.min(), rows.max() + 1], 0, nrows)
+        c0, c1 = np.clip([cols.min(), cols.max() + 1], 0, ncols)
+        cell_rows, cell_cols = self.cells // ncols, self.cells % ncols
+        selected = (cell_rows >= r0) & (cell_rows < r1) & (cell_cols >= c0) & (cell_cols < c1)
+        return self.points_in_cells(self.cells[selected])
+
+    def aggregate(self, values, how: str = 'mean', fill=np.nan) -> np.ndarray:
+        """
+        Snaps points to their cells and reduces the values per cell.
+
+        Args:
+            values: Array with one value per point, a column name, or a scalar.
+            how (str): 'mean', 'min', 'max', 'sum', 'count' or 'last' (the last
+                point in file order wins).
+            fill: Value for cells without points.
+
+        Returns:
+            np.ndarray: Grid of reduced values.
+        """
+        if isinstance(values, str):
+            values = self.points[values]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), (len(self.points),))[self.order]
+        nrows, ncols = self.grid.shape
+        out = np.full(nrows * ncols, fill, dtype=np.float64)
+
+        if how in ('mean', 'sum', 'count'):
+            counts = np.diff(self.offsets)
+            if how == 'count':
+                out[self.cells] = counts
+            else:
+                sums = np.add.reduceat(values, self.offsets[:-1]) if len(values) else np.empty(0)
+                out[self.cells] = sums / counts if how == 'mean' else sums
+        elif how in ('min', 'max'):
+            reduce = np.minimum if how == 'min' else np.maximum
+            out[self.cells] = reduce.reduceat(values, self.offsets[:-1]) if len(values) else []
+        elif how == 'last':
+            # stable sort keeps file order within a cell, so the last entry per bucket wins
+            out[self.cells] = values[self.offsets[1:] - 1] if len(values) else []
+        else:
+            raise ValueError(f"Invalid aggregation: {how}")
+        return out.reshape(nrows, ncols)
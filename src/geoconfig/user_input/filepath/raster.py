@@ -0,0 +1,339 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from ...profiling import count
+from ...settings.config import raster_chunk_size, raster_memory_limit
+
+
+class ChunkedRaster:
+    """Lazily evaluated, block-aligned view of a single raster band.
+
+    Nothing is decoded until the view is indexed. Reads are split into chunks
+    aligned to the file's native blocks, only the chunks touched by a request
+    are read, and decoded chunks are kept in an LRU cache bounded by
+    ``memory_limit`` bytes.
+    """
+
+    def __init__(
+            self,
+            filepath: str,
+            band: int = 1,
+            chunk_size: int = None,
+            memory_limit: int = None,
+            window: tuple = None,
+            bounds: tuple = None,
+            mask: np.ndarray = None):
+        """
+        Args:
+            filepath (str): Path to a GDAL readable raster.
+            band (int): 1-based band index.
+            chunk_size (int): Target chunk edge in cells, rounded up to a multiple
+                of the native block size.
+            memory_limit (int): Ceiling in bytes for cached chunks and for any
+                single array returned by the view.
+            window (tuple): (row_off, col_off, height, width) in file cells.
+            bounds (tuple): (xmin, ymin, xmax, ymax) clip in the raster CRS.
+            mask (np.ndarray): Boolean array shaped like the view; chunks with no
+                True cells are never read.
+        """
+        self.filepath = filepath
+        self.band = band
+        self.memory_limit = raster_memory_limit if memory_limit is None else memory_limit
+        self._dataset = None
+        self._chunks = OrderedDict()
+        self._cached_bytes = 0
+
+        ds = self.dataset
+        self.dtype = np.dtype(ds.dtypes[band - 1])
+        self.nodata = ds.nodata
+        self.crs = ds.crs
+        self.fill_value = self._fill_value(self.dtype, self.nodata)
+        self.chunk_shape = self._aligned_chunk_shape(
+            ds.block_shapes[band - 1], chunk_size or raster_chunk_size)
+
+        self._row_off, self._col_off, height, width = self._resolve_window(ds, window, bounds)
+        self.shape = (height, width)
+        self.transform = ds.window_transform(self._window(self._row_off, self._col_off, height, width))
+
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.shape != self.shape:
+                raise ValueError(f"Mask shape {mask.shape} does not match raster window {self.shape}.")
+        self.mask = mask
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.filepath}, shape={self.shape}, chunks={self.chunk_shape})"
+
+    def __getstate__(self):
+        # dataset handles and decoded chunks are process local
+        state = self.__dict__.copy()
+        state['_dataset'] = None
+        state['_chunks'] = OrderedDict()
+        state['_cached_bytes'] = 0
+        return state
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            import rasterio
+            self._dataset = rasterio.open(self.filepath)
+        return self._dataset
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return self.shape[0] * self.shape[1] * self.dtype.itemsize
+
+    @property
+    def _pad_value(self):
+        # cells outside the window or the mask; 0 when the raster has no nodata to mark them with
+        return 0 if self.fill_value is None else self.fill_value
+
+    def close(self):
+        if self._dataset is not None:
+            self._dataset.close()
+            self._dataset = None
+        self._chunks.clear()
+        self._cached_bytes = 0
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
+    def __getitem__(self, key):
+        rows, cols = self._normalize_key(key)
+        out_shape = (rows.stop - rows.start, cols.stop - cols.start)
+        self._check_budget(out_shape[0] * out_shape[1] * self.dtype.itemsize)
+
+        out = np.full(out_shape, self._pad_value, dtype=self.dtype)
+        if 0 in out_shape:
+            return out
+
+        # work in file coordinates so chunks stay aligned to the native blocks
+        r0, r1 = rows.start + self._row_off, rows.stop + self._row_off
+        c0, c1 = cols.start + self._col_off, cols.stop + self._col_off
+        ch, cw = self.chunk_shape
+        for ci in range(r0 // ch, (r1 - 1) // ch + 1):
+            for cj in range(c0 // cw, (c1 - 1) // cw + 1):
+                cr0, cc0 = ci * ch, cj * cw
+                sr0, sr1 = max(r0, cr0), min(r1, cr0 + ch)
+                sc0, sc1 = max(c0, cc0), min(c1, cc0 + cw)
+                if not self._chunk_is_active(sr0, sr1, sc0, sc1):
+                    continue
+                chunk = self._get_chunk(ci, cj)
+                out[sr0 - r0:sr1 - r0, sc0 - c0:sc1 - c0] = chunk[sr0 - cr0:sr1 - cr0, sc0 - cc0:sc1 - cc0]
+
+        if self.mask is not None:
+            out[~self.mask[rows, cols]] = self._pad_value
+        return out
+
+    def iter_chunks(self):
+        """Yield ``(row_slice, col_slice, data)`` for every active chunk of the view."""
+        ch, cw = self.chunk_shape
+        height, width = self.shape
+        row_edges = self._chunk_edges(self._row_off, height, ch)
+        col_edges = self._chunk_edges(self._col_off, width, cw)
+        for r0, r1 in row_edges:
+            for c0, c1 in col_edges:
+                if self.mask is not None and not self.mask[r0:r1, c0:c1].any():
+                    continue
+                yield slice(r0, r1), slice(c0, c1), self[r0:r1, c0:c1]
+
+    def _get_chunk(self, ci: int, cj: int) -> np.ndarray:
+        key = (ci, cj)
+        if key in self._chunks:
+            self._chunks.move_to_end(key)
+            count('raster.chunk_hits')
+            return self._chunks[key]
+
+        ds = self.dataset
+        ch, cw = self.chunk_shape
+        row_off, col_off = ci * ch, cj * cw
+        height = min(ch, ds.height - row_off)
+        width = min(cw, ds.width - col_off)
+        data = ds.read(self.band, window=self._window(row_off, col_off, height, width))
+        count('raster.chunk_misses')
+        count('raster.bytes_read', data.nbytes)
+        if self.nodata is not None and self.dtype.kind == 'f':
+            data[data == self.nodata] = np.nan
+
+        self._chunks[key] = data
+        self._cached_bytes += data.nbytes
+        while self._cached_bytes > self.memory_limit and len(self._chunks) > 1:
+            _, evicted = self._chunks.popitem(last=False)
+            self._cached_bytes -= evicted.nbytes
+        return data
+
+    def _chunk_is_active(self, r0, r1, c0, c1) -> bool:
+        if self.mask is None:
+            return True
+        return bool(self.mask[r0 - self._row_off:r1 - self._row_off, c0 - self._col_off:c1 - self._col_off].any())
+
+    def _check_budget(self, nbytes: int):
+        if nbytes > self.memory_limit:
+            raise MemoryError(
+                f"Reading {nbytes} bytes from {self.filepath} exceeds the memory limit of "
+                f"{self.memory_limit} bytes; index a smaller window or use iter_chunks().")
+
+    def _normalize_key(self, key):
+        return _normalize_key(key, self.shape, self.__class__.__name__)
+
+    def _resolve_window(self, ds, window, bounds):
+        row_off, col_off, height, width = window if window else (0, 0, ds.height, ds.width)
+
+        if bounds is not None:
+            xmin, ymin, xmax, ymax = bounds
+            inverse = ~ds.transform
+            cols, rows = zip(*(inverse * (x, y) for x in (xmin, xmax) for y in (ymin, ymax)))
+            b_row0, b_row1 = math.floor(min(rows)), math.ceil(max(rows))
+            b_col0, b_col1 = math.floor(min(cols)), math.ceil(max(cols))
+            row0, row1 = max(row_off, b_row0), min(row_off + height, b_row1)
+            col0, col1 = max(col_off, b_col0), min(col_off + width, b_col1)
+            row_off, col_off = row0, col0
+            height, width = max(0, row1 - row0), max(0, col1 - col0)
+
+        if row_off < 0 or col_off < 0 or row_off + height > ds.height or col_off + width > ds.width:
+            raise ValueError(f"Window {(row_off, col_off, height, width)} is outside {self.filepath}.")
+        return row_off, col_off, height, width
+
+    @staticmethod
+    def _window(row_off, col_off, height, width):
+        from rasterio.windows import Window
+        return Window(col_off, row_off, width, height)
+
+    @staticmethod
+    def _aligned_chunk_shape(block_shape, chunk_size):
+        return tuple(max(1, math.ceil(chunk_size / b)) * b for b in block_shape)
+
+    @staticmethod
+    def _chunk_edges(offset, size, chunk):
+        # view-relative edges of the file aligned chunks covering [offset, offset + size)
+        edges = []
+        start = offset
+        while start < offset + size:
+            stop = min((start // chunk + 1) * chunk, offset + size)
+            edges.append((start - offset, stop - offset))
+            start = stop
+        return edges
+
+    @staticmethod
+    def _fill_value(dtype, nodata):
+        # None when every value is data: an integer raster without nodata has no missing cells
+        if dtype.kind == 'f':
+            return np.nan
+        return nodata
+
+
+class CachedRaster:
+    """A raster band read back from the input cache.
+
+    The cells are a memory-mapped ``.npy`` entry and the georeferencing comes
+    from the JSON written next to it, so the view indexes like a
+    ``ChunkedRaster`` and carries the same ``transform``, ``crs``, ``nodata``
+    and ``fill_value``. Cells outside the source mask were filled when the
+    entry was written.
+    """
+
+    def __init__(self, data, transform, crs=None, nodata=None, fill_value=None, chunk_shape=None, filepath=None):
+        self._data = data
+        self.filepath = filepath
+        self.dtype = data.dtype
+        self.shape = tuple(data.shape)
+        self.transform = transform
+        self.crs = crs
+        self.nodata = nodata
+        self.fill_value = fill_value
+        self.chunk_shape = tuple(chunk_shape or (raster_chunk_size, raster_chunk_size))
+        self.mask = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.filepath}, shape={self.shape})"
+
+    @classmethod
+    def from_metadata(cls, data, metadata: dict, filepath: str = None) -> 'CachedRaster':
+        """Rebuilds the view from an entry and the dict written by ``raster_metadata``."""
+        from affine import Affine
+
+        crs = metadata.get('crs')
+        if crs is not None:
+            from rasterio.crs import CRS
+            crs = CRS.from_wkt(crs)
+        return cls(
+            data,
+            transform=Affine(*metadata['transform'][:6]),
+            crs=crs,
+            nodata=metadata.get('nodata'),
+            fill_value=metadata.get('fill_value'),
+            chunk_shape=metadata.get('chunk_shape'),
+            filepath=filepath)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return self.shape[0] * self.shape[1] * self.dtype.itemsize
+
+    def close(self):
+        pass  # the memory map is released with the view
+
+    def __array__(self, dtype=None, copy=None):
+        data = np.array(self._data)
+        return data if dtype is None else data.astype(dtype)
+
+    def __getitem__(self, key):
+        rows, cols = _normalize_key(key, self.shape, self.__class__.__name__)
+        return np.array(self._data[rows, cols])
+
+    def iter_chunks(self):
+        """Yield ``(row_slice, col_slice, data)`` for every chunk of the view."""
+        ch, cw = self.chunk_shape
+        height, width = self.shape
+        for r0 in range(0, height, ch):
+            for c0 in range(0, width, cw):
+                rows, cols = slice(r0, min(r0 + ch, height)), slice(c0, min(c0 + cw, width))
+                yield rows, cols, self[rows, cols]
+
+
+def raster_metadata(data) -> dict:
+    """The georeferencing of a raster view as a JSON-serializable dict."""
+    crs = getattr(data, 'crs', None)
+    if crs is not None:
+        from rasterio.crs import CRS
+        crs = CRS.from_user_input(crs).to_wkt()
+    return {
+        'transform': list(data.transform)[:6],
+        'crs': crs,
+        'nodata': _scalar(getattr(data, 'nodata', None)),
+        'fill_value': _scalar(getattr(data, 'fill_value', None)),
+        'chunk_shape': list(getattr(data, 'chunk_shape', None) or ()) or None,
+    }
+
+
+def _scalar(value):
+    return None if value is None else np.asarray(value).item()
+
+
+def _normalize_key(key, shape, name: str = 'raster'):
+    if not isinstance(key, tuple):
+        key = (key, slice(None))
+    if len(key) != 2:
+        raise IndexError(f"{name} is 2D, got {len(key)} indices.")
+
+    normalized = []
+    for k, size in zip(key, shape):
+        if isinstance(k, int):
+            k = slice(k, k + 1) if k >= 0 else slice(size + k, size + k + 1)
+        if not isinstance(k, slice):
+            raise TypeError(f"Only integer and slice indexing is supported, got {type(k).__name__}.")
+        start, stop, step = k.indices(size)
+        if step != 1:
+            raise IndexError("Strided indexing is not supported.")
+        normalized.append(slice(start, max(start, stop)))
+    return tuple(normalized)
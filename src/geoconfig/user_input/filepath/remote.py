@@ -0,0 +1,54 @@
+import os
+
+
+def is_remote(path) -> bool:
+    """True for fsspec URLs such as ``s3://bucket/key``; local paths and ``file://`` URLs are not remote."""
+    return isinstance(path, str) and '://' in path and not path.startswith('file://')
+
+
+def filesystem(path: str):
+    """(fsspec filesystem, path within it) for a URL. fsspec keeps one instance per protocol and options."""
+    from fsspec.core import url_to_fs
+
+    return url_to_fs(path)
+
+
+def path_exists(path: str) -> bool:
+    """
+    True if ``path`` is an existing file, locally or in an object store.
+
+    Only a missing file, or a URL whose protocol fsspec does not know, gives
+    False. A missing driver, an unreachable store or refused credentials raise,
+    so a broken store is not mistaken for a plain value.
+    """
+    if not is_remote(path):
+        return os.path.isfile(path)
+    from fsspec.registry import known_implementations, registry
+
+    if path.split('://', 1)[0] not in {*known_implementations, *registry}:
+        return False
+    fs, fs_path = filesystem(path)
+    try:
+        return fs.info(fs_path)['type'] == 'file'
+    except FileNotFoundError:
+        return False
+
+
+def file_stamp(path: str) -> tuple:
+    """(modification stamp, size) identifying the current version of a file."""
+    if not is_remote(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    fs, fs_path = filesystem(path)
+    info = fs.info(fs_path)
+    # object stores report an ETag or a last-modified time, in-memory and local stores an mtime
+    version = info.get('ETag') or info.get('LastModified') or info.get('mtime') or info.get('created')
+    return str(version), info.get('size')
+
+
+def open_file(path: str, mode: str = 'rb'):
+    """Opens a local path or a URL."""
+    if not is_remote(path):
+        return open(path, mode)
+    fs, fs_path = filesystem(path)
+    return fs.open(fs_path, mode)
@@ -0,0 +1,88 @@
+from ...settings.config import vector_batch_size
+
+
+class VectorBatchReader:
+    """Streams the features of a vector file as Arrow record batches.
+
+    The bounding box and mask filters are pushed down to OGR, which uses the
+    file's spatial index where there is one. Only the requested attribute columns
+    are read. Each iteration reads the file again, so peak memory follows
+    ``batch_size`` rather than the size of the file.
+    """
+
+    def __init__(
+            self,
+            filepath: str,
+            columns: list = None,
+            bounds: tuple = None,
+            mask=None,
+            batch_size: int = None,
+            layer=None,
+            where: str = None):
+        """
+        Args:
+            filepath (str): Path to an OGR readable vector file.
+            columns (list): Attribute columns to read. None reads all of them and
+                an empty list reads geometry only.
+            bounds (tuple): (xmin, ymin, xmax, ymax) filter in the layer CRS.
+            mask: Shapely geometry; only intersecting features are read.
+            batch_size (int): Features per record batch.
+            layer: Layer name or index for multi-layer sources.
+            where (str): OGR SQL attribute filter.
+        """
+        if bounds is not None and mask is not None:
+            raise ValueError("Use either bounds or mask, not both.")
+        self.filepath = filepath
+        self.columns = list(columns) if columns is not None else None
+        self.bounds = tuple(bounds) if bounds is not None else None
+        self.mask = mask
+        self.batch_size = batch_size or vector_batch_size
+        self.layer = layer
+        self.where = where
+        self.geometry_column = None  # set once a read has started
+        self._info = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.filepath}, columns={self.columns}, bounds={self.bounds})"
+
+    @property
+    def info(self) -> dict:
+        if self._info is None:
+            from pyogrio import read_info
+            self._info = read_info(self.filepath, layer=self.layer)
+        return self._info
+
+    @property
+    def crs(self):
+        return self.info['crs']
+
+    @property
+    def total_bounds(self):
+        return self.info['total_bounds']
+
+    def __iter__(self):
+        """Yields ``pyarrow.RecordBatch`` objects with a WKB geometry column."""
+        from pyogrio.raw import open_arrow
+
+        with open_arrow(
+                self.filepath,
+                layer=self.layer,
+                columns=self.columns,
+                bbox=self.bounds,
+                mask=self.mask,
+                where=self.where,
+                batch_size=self.batch_size,
+                use_pyarrow=True) as (meta, reader):
+            self.geometry_column = meta['geometry_name'] or 'wkb_geometry'
+            for batch in reader:
+                if batch.num_rows:
+                    yield batch
+
+    def iter_geometries(self, column: str = None):
+        """Yields ``(geometries, values)`` numpy arrays per batch, geometries as shapely objects."""
+        import shapely
+
+        for batch in self:
+            geometries = shapely.from_wkb(batch.column(self.geometry_column).to_numpy(zero_copy_only=False))
+            values = batch.column(column).to_numpy(zero_copy_only=False) if column else None
+            yield geometries, values
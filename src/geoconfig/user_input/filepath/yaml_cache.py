@@ -0,0 +1,118 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from ...profiling import count, span
+from ...settings.config import yaml_cache_size, yaml_disk_cache_dir, yaml_remote_ttl
+from .remote import file_stamp, is_remote, open_file
+
+
+class YamlDocumentCache:
+    """Process-wide cache of parsed YAML documents keyed on path, mtime and size.
+
+    Documents are parsed with libyaml's ``CBaseLoader`` when PyYAML was built
+    with it, which gives the same all-string output as ``BaseLoader``. With
+    ``disk_cache_dir`` set, parsed documents are also pickled to disk so later
+    processes skip parsing entirely. Cached documents are shared between callers
+    and must not be modified.
+
+    Documents in an object store (fsspec URLs) are keyed on their ETag or
+    modification time and size; that stamp is trusted for ``yaml_remote_ttl``
+    seconds, so loading the same document twice in a row is one round trip.
+    """
+
+    def __init__(self, maxsize: int = None, disk_cache_dir: str = None):
+        self.maxsize = yaml_cache_size if maxsize is None else maxsize
+        self.disk_cache_dir = yaml_disk_cache_dir if disk_cache_dir is None else disk_cache_dir
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, filepath: str):
+        remote = is_remote(filepath)
+        if remote:
+            with self._lock:
+                cached = self._documents.get(filepath)
+                if cached is not None and time.monotonic() - cached[2] < yaml_remote_ttl:
+                    self._documents.move_to_end(filepath)
+                    count('yaml.cache_hits')
+                    return cached[1]
+        else:
+            filepath = os.path.abspath(filepath)
+        stamp = file_stamp(filepath)
+
+        with self._lock:
+            cached = self._documents.get(filepath)
+            if cached is not None and cached[0] == stamp:
+                self._documents[filepath] = (stamp, cached[1], time.monotonic())
+                self._documents.move_to_end(filepath)
+                count('yaml.cache_hits')
+                return cached[1]
+
+        count('yaml.cache_misses')
+        document = self._load_from_disk(filepath, stamp)
+        if document is None:
+            with span('yaml.parse', filepath=filepath):
+                document = self._parse(filepath)
+            count('yaml.bytes_read', stamp[1] or 0)
+            self._write_to_disk(filepath, stamp, document)
+
+        with self._lock:
+            self._documents[filepath] = (stamp, document, time.monotonic())
+            self._documents.move_to_end(filepath)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+    @staticmethod
+    def _parse(filepath: str):
+        from yaml import load
+        try:
+            from yaml import CBaseLoader as Loader
+        except ImportError:
+            from yaml import BaseLoader as Loader
+
+        with open_file(filepath, "r") as file:
+            return load(file, Loader=Loader)
+
+    def _disk_path(self, filepath: str) -> str:
+        name = hashlib.sha1(filepath.encode()).hexdigest()
+        return os.path.join(self.disk_cache_dir, f"{name}.pickle")
+
+    def _load_from_disk(self, filepath: str, stamp: tuple):
+        if not self.disk_cache_dir:
+            return None
+        try:
+            with open(self._disk_path(filepath), 'rb') as file:
+                cached_path, cached_stamp, document = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if cached_path != filepath or cached_stamp != stamp:
+            return None
+        return document
+
+    def _write_to_disk(self, filepath: str, stamp: tuple, document):
+        if not self.disk_cache_dir:
+            return
+        os.makedirs(self.disk_cache_dir, exist_ok=True)
+        disk_path = self._disk_path(filepath)
+        # a unique temp file per writer, so threads caching the same document never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump((filepath, stamp, document), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, disk_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+yaml_document_cache = YamlDocumentCache()
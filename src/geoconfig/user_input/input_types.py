@@ -1,21 +1,32 @@
-import os  # Import for file existence checks
 from dataclasses import dataclass, field
-from typing import Any, List
+from typing import Any, Tuple
 
 # import abstract class ABC
 from abc import ABC, abstractmethod
 
 # import FileTypeFactory
 from .filepath.filetype_factory import filetype_factory
+from .filepath.input_cache import input_cache
+from .filepath.io_pool import io_pool
+from .filepath.remote import path_exists
+from .expression import CompiledExpression, compile_expression
 
 # --- InputValueSpec Classes ---
-@dataclass
+# Specs are slotted and frozen: they carry no per-instance __dict__, and since
+# they never change after creation the factory can share one instance between
+# every leaf with the same raw value.
+@dataclass(slots=True, frozen=True)
 class InputValueSpec(ABC):
     """Base class for YAML input specifications."""
 
     type: str  # e.g., "value", "filepath", "existing", "transformation"
     value: Any = None  # Value of the input
 
+    # dispatch hints used by UserInputFactory before falling back to is_type
+    prefixes = ()  # string prefixes that make this type a candidate
+    python_types = ()  # non-string python types that map to this type
+    checks_filesystem = False  # is_type needs a stat, so it is tried last
+
     @abstractmethod
     def is_type(value: Any) -> bool:
         """Check if the value is an instance of this class."""
@@ -26,7 +37,7 @@ class InputValueSpec(ABC):
         """Create an instance of this class."""
         pass
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ValueInput(InputValueSpec):
     """Represents a simple value input (string, boolean, integer, float)."""
     type: str = "value"
@@ -40,43 +51,56 @@ class ValueInput(InputValueSpec):
         return cls(value=value)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FilepathInput(InputValueSpec):
     """Represents a filepath input (raster, csv, shapefile)."""
 
     type: str = "filepath"
     value: str = None
-        
-    def __post_init__(self):
-        self.filepath = self.value
-        self.file_ext = self.value.split(".")[-1]
+    checks_filesystem = True
+
+    @property
+    def filepath(self) -> str:
+        return self.value
+
+    @property
+    def file_ext(self) -> str:
+        return self.value.split(".")[-1]
 
     @staticmethod
     def is_type(value: Any) -> bool:
-        return os.path.isfile(value)
+        return path_exists(value)
     
     @classmethod
     def create(cls, value):
         return cls(value=value)
     
-    def open(self):
-        return filetype_factory.open(self.filepath)
+    def open(self, opener_kwargs=None):
+        return input_cache.open(
+            self.filepath,
+            lambda: filetype_factory.open(self.filepath, opener_kwargs),
+            opener_kwargs=opener_kwargs)
 
+    async def open_async(self, opener_kwargs=None):
+        """``open`` run on the shared ``io_pool``, so many files can be opened concurrently."""
+        return await io_pool.run(self.open, opener_kwargs)
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class CachedInput(InputValueSpec):
     """Represents a reference to an existing input defined elsewhere."""
 
     type: str = "cached"
     source: str = None  # Key of the existing input
+    field_key: str = None  # Field of the existing input, from a 'source.field' reference
+    prefixes = ("$:",)
 
     def __post_init__(self):
-        # if source has a '.' then add a field attribute to store the key
+        # if source has a '.' then split off the field key
         if "." in self.source:
-            self.field_key = self.source.split(".")[1]
-            self.source = self.source.split(".")[0]
-        else:
-            self.field_key = None
+            source, field_key = self.source.split(".")[:2]
+            object.__setattr__(self, 'source', source)
+            object.__setattr__(self, 'field_key', field_key)
     
     @staticmethod
     def is_type(value: Any) -> bool:
@@ -88,26 +112,34 @@ class CachedInput(InputValueSpec):
 
 
 # recursive classes ----------------------------------------
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RecursiveType(InputValueSpec):
     """Base class for recursive types."""
 
-    arg_values: List[Any] = None
-    args: List[InputValueSpec] = field(default_factory=list)
+    args: Tuple[InputValueSpec, ...] = ()  # classified arg_values, set by ``create``
 
-    def __post_init__(self):
-        if self.arg_values is not None:
-            self.args = [self.create(arg) for arg in self.arg_values]
+    @property
+    def arg_values(self) -> list:
+        """Raw values of the recursive args, classified into ``args``."""
+        return self.value
+
+    @staticmethod
+    def _classify_args(values) -> tuple:
+        # the factory imports this module, so it is looked up when a spec is created
+        from .user_input_factory import user_input_factory
 
+        return tuple(user_input_factory.classify_user_input(value) for value in values)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PythonModuleInput(RecursiveType):
     """Represents a transformation to be applied."""
 
     type: str = "python_module"
-    module: str = None
+    module: Tuple[str, ...] = None
     function: str = None
+    expression: CompiledExpression = field(default=None, repr=False)
+    prefixes = ("$py:",)
 
     @staticmethod
     def is_type(value: Any) -> bool:
@@ -115,18 +147,34 @@ class PythonModuleInput(RecursiveType):
     
     @classmethod
     def create(cls, value):
-        arg_values = value.split("(")[1].split(")")[0].replace(" ", "").split(",")
-        module = value.split(":")[1].split("(")[0].split(".")[:-1]
-        function = value.split(":")[1].split("(")[0].split(".")[-1]
-        return cls(value=value, module=module, function=function, arg_values=arg_values)
-
-
-@dataclass
+        expression = compile_expression(value)
+        if expression.call is None:
+            raise ValueError(f"Expected a $py:module.function(...) call, got {value}")
+        *module, function = expression.call.split(".")
+        return cls(
+            value=value,
+            module=tuple(module),
+            function=function,
+            expression=expression,
+            args=cls._classify_args(expression.references.values()))
+
+    @property
+    def arg_values(self) -> list:
+        return list(self.expression.references.values())
+
+    def evaluate(self, values: dict):
+        """Calls the function with ``values`` keyed by reference string (e.g. ``'$:dem'``)."""
+        return self.expression.evaluate(values)
+
+
+@dataclass(slots=True, frozen=True)
 class MathInput(RecursiveType):
     """Represents a mathematical operation."""
 
     type: str = "math"
     operation: str = None
+    expression: CompiledExpression = field(default=None, repr=False)
+    prefixes = ("(",)
 
     @staticmethod
     def is_type(value: Any) -> bool:
@@ -134,13 +182,21 @@ class MathInput(RecursiveType):
     
     @classmethod
     def create(cls, value):
-        # find the math symbols and split the string
-        for char in ["+", "-", "*", "/"]:
-            if char in value:
-                arg_values = value.replace(" ", "").replace("(", "").replace(")", "").split(char)
-                break
-        # recursive for each item in the list
-        return cls(value=value, operation=char, arg_values=arg_values)
+        # parsed once per distinct string, the references become the recursive args
+        expression = compile_expression(value)
+        return cls(
+            value=value,
+            operation=expression.operation,
+            expression=expression,
+            args=cls._classify_args(expression.references.values()))
+
+    @property
+    def arg_values(self) -> list:
+        return list(self.expression.references.values())
+
+    def evaluate(self, values: dict):
+        """Evaluates the expression with ``values`` keyed by reference string (e.g. ``'$:dem'``)."""
+        return self.expression.evaluate(values)
     
     # old method
     def _determine_python_module(self, values):
@@ -175,11 +231,17 @@ class MathInput(RecursiveType):
             }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MultiInput(RecursiveType):
     """Represents a list of inputs."""
 
     type: str = "multi"
+    python_types = (list,)
+
+    def __post_init__(self):
+        # tuples keep the spec hashable like every other frozen spec
+        if self.value is not None:
+            object.__setattr__(self, 'value', _as_tuple(self.value))
 
     @staticmethod
     def is_type(value: Any) -> bool:
@@ -187,6 +249,9 @@ class MultiInput(RecursiveType):
     
     @classmethod
     def create(cls, value):
-        arg_values = value
-        # recursive for each item in the list
-        return cls(value=value, arg_values=arg_values)
\ No newline at end of file
+        # recursive for each item in the list, see arg_values
+        return cls(value=value, args=cls._classify_args(value))
+
+
+def _as_tuple(value):
+    return tuple(_as_tuple(item) if isinstance(item, list) else item for item in value)
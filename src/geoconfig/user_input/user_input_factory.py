@@ -1,7 +1,11 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
+
+from ..profiling import count, span
+from ..settings.config import classify_cache_size, classify_stat_workers
 from .input_types import (
-    YamlInputSpec,
-    RecursiveType,
+    InputValueSpec,
     ValueInput,
     FilepathInput,
     CachedInput,
@@ -10,16 +14,29 @@ from .input_types import (
     MathInput,
 )
 
+# plain scalars that are never worth a stat
+_scalar_pattern = re.compile(r"^\s*([+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|true|false|yes|no|null|none|~)?\s*$", re.IGNORECASE)
+
+# below this many distinct candidate paths a thread pool costs more than it saves
+_stat_batch_min = 64
+
+
 class UserInputFactory:
     def __init__(self):
-        self._registery: Dict[str, YamlInputSpec] = {}
+        self._registery: Dict[str, InputValueSpec] = {}
         self._default: ValueInput = None
+        self._dispatch = None
+        self._type_memo: Dict[str, type] = {}
+        self._spec_memo: Dict[str, InputValueSpec] = {}  # specs are frozen, so equal values share one
     
-    def register(self, name: str, definition: YamlInputSpec):
+    def register(self, name: str, definition: InputValueSpec):
         # TODO: error checking
         self._registery[name] = definition
+        self._dispatch = None
+        self._type_memo.clear()
+        self._spec_memo.clear()
 
-    def register_default(self, name: str, definition: YamlInputSpec):
+    def register_default(self, name: str, definition: InputValueSpec):
         if self._default:
             raise ValueError("Default already set.")
         self._default = definition
@@ -30,29 +47,124 @@ class UserInputFactory:
         else:
             return self._default
    
-    def classify_user_input(self, value: str) -> YamlInputSpec:
+    def classify_user_input(self, value: str) -> InputValueSpec:
+        if isinstance(value, str):
+            spec = self._spec_memo.get(value)
+            if spec is not None:
+                count('classify.memo_hits')
+                return spec
+            count('classify.memo_misses')
+
         usertype = self._get_type(value)
 
-        if isinstance(usertype, RecursiveType):
-            return self._resolve_if_recursive(usertype)
-        else:
-            return usertype
+        # only memoized types are stable, a path that is missing now may be created later
+        if isinstance(value, str) and value in self._type_memo:
+            if len(self._spec_memo) >= classify_cache_size:
+                self._spec_memo.clear()
+            self._spec_memo[value] = usertype
+        return usertype
     
+    def prefetch(self, values):
+        """
+        Classifies the distinct string values ahead of time, running the stats
+        for candidate paths concurrently. Values found not to be paths are not
+        memoized, so a file created later is still picked up.
+
+        Args:
+            values (iterable): Raw leaf values about to be classified.
+        """
+        candidates = {v for v in values if isinstance(v, str) and v not in self._type_memo}
+        with span('classify.prefetch', candidates=len(candidates)):
+            if len(candidates) < _stat_batch_min:
+                for value in candidates:
+                    self._type_of(value)
+                return
+            with ThreadPoolExecutor(max_workers=classify_stat_workers) as executor:
+                for _ in executor.map(self._type_of, candidates):
+                    pass
+
+    async def prefetch_async(self, values):
+        """
+        ``prefetch`` for the async pipeline: every candidate path is checked at
+        once on the shared ``io_pool``, so a config costs about one round trip
+        of existence checks however many filepaths it lists.
+        """
+        from .filepath.io_pool import io_pool
+
+        candidates = {v for v in values if isinstance(v, str) and v not in self._type_memo}
+        with span('classify.prefetch_async', candidates=len(candidates)):
+            await io_pool.map(self._type_of, candidates)
+
+    def clear_cache(self):
+        """Forgets memoized classifications, e.g. after files were created or removed."""
+        self._type_memo.clear()
+        self._spec_memo.clear()
+
     def _get_type(self, value: str):
-        for input_type in self._registery.values():
+        return self._type_of(value).create(value)
+
+    def _type_of(self, value) -> type:
+        if not isinstance(value, str):
+            return self._type_of_object(value)
+
+        input_type = self._type_memo.get(value)
+        if input_type is None:
+            input_type, stable = self._type_of_string(value)
+            if stable:
+                if len(self._type_memo) >= classify_cache_size:
+                    self._type_memo.clear()
+                self._type_memo[value] = input_type
+        return input_type
+
+    def _type_of_string(self, value: str):
+        """(type, stable) of a string; not stable when it rests on a file being missing."""
+        by_prefix, by_python_type, by_stat, unhinted = self._get_dispatch()
+
+        # cheap prefix checks first, then unhinted types, and a stat only as a last resort
+        for prefix, input_type in by_prefix.get(value[:1], ()):
+            if value.startswith(prefix) and input_type.is_type(value):
+                return input_type, True
+        for input_type in unhinted:
             if input_type.is_type(value):
-                return input_type.create(value)
+                return input_type, True
+        if _scalar_pattern.match(value) or not by_stat:
+            return self._default, True
+        for input_type in by_stat:
+            if input_type.is_type(value):
+                return input_type, True
+        return self._default, False
 
-        return self._default.create(value)
-    
-    def _resolve_if_recursive(self, input_spec: YamlInputSpec):
-        if isinstance(input_spec, RecursiveType):
-            for arg in input_spec.arg_values:
-                arg = self.classify_user_input(arg)
-                input_spec.update_args(arg)
-            return input_spec
-        else:
-            return input_spec
+    def _type_of_object(self, value) -> type:
+        by_prefix, by_python_type, by_stat, unhinted = self._get_dispatch()
+
+        for python_type in type(value).__mro__:
+            if python_type in by_python_type:
+                return by_python_type[python_type]
+        for input_type in unhinted:
+            try:
+                if input_type.is_type(value):
+                    return input_type
+            except (TypeError, AttributeError):
+                continue
+        return self._default
+
+    def _get_dispatch(self):
+        if self._dispatch is None:
+            by_prefix, by_python_type, by_stat, unhinted = {}, {}, [], []
+            for input_type in self._registery.values():
+                for prefix in input_type.prefixes:
+                    by_prefix.setdefault(prefix[:1], []).append((prefix, input_type))
+                for python_type in input_type.python_types:
+                    by_python_type.setdefault(python_type, input_type)
+                if input_type.checks_filesystem:
+                    by_stat.append(input_type)
+                elif not (input_type.prefixes or input_type.python_types):
+                    unhinted.append(input_type)
+            # longest prefix wins when several share a first character
+            for entries in by_prefix.values():
+                entries.sort(key=lambda entry: -len(entry[0]))
+            self._dispatch = (by_prefix, by_python_type, by_stat, unhinted)
+        return self._dispatch
 
 user_input_factory = UserInputFactory()  
 
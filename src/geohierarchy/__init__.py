@@ -1 +1,28 @@
-from .io.geohierarchy_from_mask import geohierarchy_from_mask
\ No newline at end of file
+from importlib import import_module
+
+# names are imported on first access, so `import geohierarchy` does not load numpy or the GIS readers
+_exports = {
+    'geohierarchy_from_mask': '.io.geohierarchy_from_mask',
+    'HierarchyGrid': '.io.geohierarchy_from_mask',
+    'combine': '.io.combine',
+    'HierarchyStore': '.io.combine',
+    'LevelIndex': '.level_index',
+    'reproject': '.io.reproject',
+    'ReprojectedLayer': '.io.reproject',
+    'MaskIndex': '.io.mask_index',
+    'mask_index': '.io.mask_index',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
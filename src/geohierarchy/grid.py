@@ -0,0 +1,110 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Grid:
+    """A regular, north-up target grid.
+
+    ``transform`` holds the first six affine coefficients in rasterio/GDAL order
+    (a, b, c, d, e, f), so x = a * col + c and y = e * row + f at cell corners.
+    Grids are hashable so they can key caches.
+    """
+
+    shape: tuple  # (nrows, ncols)
+    transform: tuple
+    crs: str = None
+
+    def __post_init__(self):
+        object.__setattr__(self, 'shape', tuple(int(n) for n in self.shape))
+        object.__setattr__(self, 'transform', tuple(float(t) for t in tuple(self.transform)[:6]))
+        if self.transform[1] != 0 or self.transform[3] != 0:
+            raise ValueError("Rotated grids are not supported.")
+
+    @classmethod
+    def from_raster(cls, raster):
+        """Grid of a ``ChunkedRaster`` (or any object with shape, transform and crs)."""
+        crs = getattr(raster, 'crs', None)
+        return cls(shape=raster.shape, transform=raster.transform, crs=crs.to_string() if crs else None)
+
+    @classmethod
+    def from_bounds(cls, bounds: tuple, resolution: float, crs: str = None):
+        xmin, ymin, xmax, ymax = bounds
+        ncols = math.ceil((xmax - xmin) / resolution)
+        nrows = math.ceil((ymax - ymin) / resolution)
+        return cls(shape=(nrows, ncols), transform=(resolution, 0, xmin, 0, -resolution, ymax), crs=crs)
+
+    @property
+    def nrows(self):
+        return self.shape[0]
+
+    @property
+    def ncols(self):
+        return self.shape[1]
+
+    @property
+    def resolution(self):
+        return self.transform[0], -self.transform[4]
+
+    @property
+    def bounds(self):
+        a, _, c, _, e, f = self.transform
+        x0, x1 = c, c + a * self.ncols
+        y0, y1 = f, f + e * self.nrows
+        return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+    @property
+    def affine(self):
+        from affine import Affine
+        return Affine(*self.transform)
+
+    def band(self, row_start: int, row_stop: int) -> 'Grid':
+        """Sub-grid covering rows [row_start, row_stop)."""
+        a, b, c, d, e, f = self.transform
+        return Grid(shape=(row_stop - row_start, self.ncols), transform=(a, b, c, d, e, f + e * row_start), crs=self.crs)
+
+    def rowcol(self, x, y):
+        """Row and column indices (may fall outside the grid) of points."""
+        a, _, c, _, e, f = self.transform
+        rows = np.floor((np.asarray(y) - f) / e).astype(np.int64)
+        cols = np.floor((np.asarray(x) - c) / a).astype(np.int64)
+        return rows, cols
+
+    def xy(self, rows, cols):
+        """Cell centre coordinates."""
+        a, _, c, _, e, f = self.transform
+        return c + a * (np.asarray(cols) + 0.5), f + e * (np.asarray(rows) + 0.5)
+
+    def contains(self, rows, cols):
+        return (rows >= 0) & (rows < self.nrows) & (cols >= 0) & (cols < self.ncols)
+
+
+def _as_slice(key, size: int) -> slice:
+    """An integer or contiguous slice index along an axis of ``size`` as ``slice(start, stop, 1)``."""
+    if isinstance(key, slice):
+        start, stop, step = key.indices(size)
+        if step != 1:
+            raise IndexError("Only contiguous slices are supported.")
+        return slice(start, max(start, stop), 1)
+    index = int(key) + size if int(key) < 0 else int(key)
+    if not 0 <= index < size:
+        raise IndexError(f"Index {key} is out of bounds for size {size}.")
+    return slice(index, index + 1, 1)
+
+
+def _crs_key(crs):
+    if crs is None:
+        return None
+    return crs if isinstance(crs, str) else crs.to_string()
+
+
+def _same_crs(a, b) -> bool:
+    """True if two CRSs (strings, rasterio or pyproj objects) are equal; an unset CRS matches any."""
+    if a is None or b is None:
+        return True
+    if _crs_key(a) == _crs_key(b):
+        return True
+    from pyproj import CRS
+    return CRS.from_user_input(a) == CRS.from_user_input(b)
@@ -1,4 +1,5 @@
-from geohierarchy.io.opener_registry import OpenerRegistry
+from geoconfig.user_input.filepath.input_cache import input_cache
+from geohierarchy.io.opener_registry import opener_registry
 
 class HierInput:
     def __init__(
@@ -6,13 +7,14 @@ class HierInput:
                 filepath: str,
                 column: str = None,
                 value: int | float = None,
-                z: int | float = None,
-                layer: int = None,
+                z: int | float | str = None,
+                layer: int | str = None,
                 mask: str = None,
                 global_mask: str = None,
                 clip: str = None,
                 global_clip: str = None,
                 opener_kwargs: dict = None,
+                resampling: str = None,
                 ):
         #TODO: check all valid inputs
         self.filepath = filepath
@@ -25,10 +27,27 @@ class HierInput:
         self.clip = clip
         self.global_clip = global_clip
         self.opener_kwargs = opener_kwargs
+        self.resampling = resampling  # 'nearest', 'bilinear' or 'mode' when the input is not on the target grid
+
+    @property
+    def columns(self) -> list:
+        """Attribute columns named by ``column``, ``z`` and ``layer``."""
+        return [c for c in (self.column, self.z, self.layer) if isinstance(c, str)]
+
+    @property
+    def cpu_bound(self) -> bool:
+        opener = opener_registry.get(self.filepath) if self.filepath else None
+        return bool(getattr(opener, 'cpu_bound', False))
 
     def open(self):
-        print('accessing open')
-        opener = OpenerRegistry.get(self.filepath)
-        data = opener(self.filepath, **self.opener_kwargs)
+        opener = opener_registry.get(self.filepath)
+        if opener is None:
+            raise ValueError(f"No opener registered for {self.filepath}")
+        opener_kwargs = dict(self.opener_kwargs or {})
+        if getattr(opener, 'selects_columns', False) and self.columns:
+            opener_kwargs.setdefault('columns', self.columns)
+        return input_cache.open(
+            self.filepath,
+            lambda: opener().open(self.filepath, **opener_kwargs),
+            opener_kwargs=opener_kwargs)
 
-        pass
\ No newline at end of file
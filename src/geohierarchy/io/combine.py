@@ -0,0 +1,392 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from geoconfig.profiling import count, span
+from geoconfig.settings.config import combine_chunk_size
+from geohierarchy.grid import Grid, _as_slice
+from geohierarchy.input import HierInput
+from geohierarchy.io.geohierarchy_from_mask import _is_points, _is_vector
+from geohierarchy.io.mask_index import input_mask_index
+from geohierarchy.io.reproject import ReprojectedLayer, aligned_to
+
+manifest_name = 'manifest.json'
+
+
+class HierarchyStore:
+    """Chunked on-disk stack of hierarchy levels aligned to one grid.
+
+    The store is a directory with a JSON manifest and one ``.npy`` file per
+    (level, row chunk, column chunk). Chunks are written atomically, so a chunk
+    file that exists is complete; an interrupted combine picks up from the chunks
+    already on disk. Reads are lazy and only touch the chunks they overlap.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, manifest_name)) as file:
+            self.manifest = json.load(file)
+        self.shape = tuple(self.manifest['shape'])  # (nlevels, nrows, ncols)
+        self.chunks = tuple(self.manifest['chunks'])  # (rows, cols)
+        self.dtype = np.dtype(self.manifest['dtype'])
+        self.levels = self.manifest['levels']
+        grid = self.manifest['grid']
+        self.grid = Grid(shape=grid['shape'], transform=grid['transform'], crs=grid['crs'])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path}, shape={self.shape}, chunks={self.chunks})"
+
+    @classmethod
+    def create(cls, path: str, grid: Grid, levels: list, dtype='float64', chunks: tuple = None, fingerprint=None):
+        """
+        Creates a store, or reopens an existing one written for the same inputs.
+
+        Raises:
+            ValueError: If ``path`` holds a store with a different layout or fingerprint.
+        """
+        chunks = tuple(chunks or (combine_chunk_size, combine_chunk_size))
+        manifest = {
+            'shape': [len(levels), grid.nrows, grid.ncols],
+            'chunks': list(chunks),
+            'dtype': np.dtype(dtype).str,
+            'levels': [str(level) for level in levels],
+            'grid': {'shape': list(grid.shape), 'transform': list(grid.transform), 'crs': grid.crs},
+            'fingerprint': fingerprint,
+            'complete': False,
+        }
+        manifest_path = os.path.join(path, manifest_name)
+        if os.path.exists(manifest_path):
+            store = cls(path)
+            existing = {k: v for k, v in store.manifest.items() if k != 'complete'}
+            expected = json.loads(json.dumps({k: v for k, v in manifest.items() if k != 'complete'}))
+            if existing != expected:
+                raise ValueError(f"{path} holds a store for different inputs; remove it or pick another path.")
+            return store
+
+        os.makedirs(path, exist_ok=True)
+        _write_json(manifest_path, manifest)
+        return cls(path)
+
+    @property
+    def complete(self) -> bool:
+        return self.manifest['complete']
+
+    def mark_complete(self):
+        self.manifest['complete'] = True
+        _write_json(os.path.join(self.path, manifest_name), self.manifest)
+
+    @property
+    def chunk_grid(self) -> tuple:
+        _, nrows, ncols = self.shape
+        return -(-nrows // self.chunks[0]), -(-ncols // self.chunks[1])
+
+    def chunk_slices(self, i: int, j: int) -> tuple:
+        _, nrows, ncols = self.shape
+        r0, c0 = i * self.chunks[0], j * self.chunks[1]
+        return slice(r0, min(r0 + self.chunks[0], nrows)), slice(c0, min(c0 + self.chunks[1], ncols))
+
+    def has_chunk(self, level: int, i: int, j: int) -> bool:
+        return os.path.exists(self._chunk_path(level, i, j))
+
+    def write_chunk(self, level: int, i: int, j: int, data: np.ndarray):
+        rows, cols = self.chunk_slices(i, j)
+        expected = (rows.stop - rows.start, cols.stop - cols.start)
+        if data.shape != expected:
+            raise ValueError(f"Chunk ({level}, {i}, {j}) has shape {data.shape}, expected {expected}.")
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, np.ascontiguousarray(data, dtype=self.dtype), allow_pickle=False)
+            os.replace(tmp_path, self._chunk_path(level, i, j))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read_chunk(self, level: int, i: int, j: int) -> np.ndarray:
+        try:
+            return np.load(self._chunk_path(level, i, j), mmap_mode='r')
+        except FileNotFoundError:
+            rows, cols = self.chunk_slices(i, j)
+            return np.full((rows.stop - rows.start, cols.stop - cols.start), np.nan, dtype=self.dtype)
+
+    def level(self, level) -> 'StoreLevel':
+        """Lazy 2D view of one level, by index or name."""
+        if isinstance(level, str):
+            level = self.levels.index(level)
+        return StoreLevel(self, level)
+
+    def __getitem__(self, key):
+        level, rows, cols = key
+        return self.level(level)[rows, cols]
+
+    def _chunk_path(self, level: int, i: int, j: int) -> str:
+        return os.path.join(self.path, f"{level}.{i}.{j}.npy")
+
+
+class StoreLevel:
+    """Lazy 2D view of one level in a ``HierarchyStore``."""
+
+    def __init__(self, store: HierarchyStore, level: int):
+        self.store = store
+        self.index = level
+        self.shape = store.shape[1:]
+        self.dtype = store.dtype
+        self.chunk_shape = store.chunks
+        self.ndim = 2
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.store.path}, level={self.index})"
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype)
+
+    def __getitem__(self, key):
+        rows, cols = (key, slice(None)) if not isinstance(key, tuple) else key
+        squeeze = tuple(axis for axis, k in enumerate((rows, cols)) if not isinstance(k, slice))
+        rows, cols = (_as_slice(k, size) for k, size in zip((rows, cols), self.shape))
+        if rows.step != 1 or cols.step != 1:
+            raise IndexError("Only contiguous slices are supported.")
+
+        chunk_rows, chunk_cols = self.store.chunks
+        out = np.empty((max(rows.stop - rows.start, 0), max(cols.stop - cols.start, 0)), dtype=self.dtype)
+        for i in range(rows.start // chunk_rows, -(-rows.stop // chunk_rows)):
+            for j in range(cols.start // chunk_cols, -(-cols.stop // chunk_cols)):
+                chunk = self.store.read_chunk(self.index, i, j)
+                r0, c0 = i * chunk_rows, j * chunk_cols
+                rs = slice(max(rows.start, r0), min(rows.stop, r0 + chunk.shape[0]))
+                cs = slice(max(cols.start, c0), min(cols.stop, c0 + chunk.shape[1]))
+                out[rs.start - rows.start:rs.stop - rows.start, cs.start - cols.start:cs.stop - cols.start] = \
+                    chunk[rs.start - r0:rs.stop - r0, cs.start - c0:cs.stop - c0]
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+
+def combine(
+        inputs: list,
+        data_list: list,
+        path: str,
+        grid: Grid,
+        levels: list = None,
+        chunks: tuple = None,
+        dtype='float64') -> HierarchyStore:
+    """
+    Aligns opened inputs to ``grid`` and writes them, level by level, into a chunked store.
+
+    Every chunk is read, aligned and written on its own, so memory follows the
+    chunk size rather than the grid. Vector and point inputs are burned one row
+    band at a time. Masks and clips go through a shared ``MaskIndex``: chunks
+    entirely outside them are written empty without reading the input. Chunks already in the store are skipped, so rerunning after
+    a crash resumes where the last run stopped.
+
+    Args:
+        inputs (list): ``HierInput`` per level, in hierarchy order.
+        data_list (list): Opened data per input (None for constant inputs).
+        path (str): Store directory.
+        grid (Grid): Common grid. Rasters in another CRS or resolution are
+            resampled onto it with the input's ``resampling`` method.
+        levels (list): Level names, defaulting to the input filepaths.
+        chunks (tuple): (rows, cols) per chunk.
+        dtype: Store dtype; cells without data are nan.
+
+    Returns:
+        HierarchyStore
+    """
+    if levels is None:
+        levels = [hier_input.filepath or f"level_{i}" for i, hier_input in enumerate(inputs)]
+    store = HierarchyStore.create(
+        path, grid, levels, dtype=dtype, chunks=chunks, fingerprint=_fingerprint(inputs))
+    if store.complete:
+        count('combine.stores_reused')
+        return store
+
+    readers = [_masked_reader(_aligned_reader(hier_input, data, grid), input_mask_index(hier_input, grid))
+               for hier_input, data in zip(inputs, data_list)]
+    n_row_chunks, n_col_chunks = store.chunk_grid
+    for i in range(n_row_chunks):
+        for level, reader in enumerate(readers):
+            missing = [j for j in range(n_col_chunks) if not store.has_chunk(level, i, j)]
+            count('combine.chunks_resumed', n_col_chunks - len(missing))
+            for j in missing:
+                rows, cols = store.chunk_slices(i, j)
+                with span('combine.read', level=level, chunk=(i, j)):
+                    block = reader(rows, cols)
+                with span('combine.write', level=level, chunk=(i, j)):
+                    store.write_chunk(level, i, j, block)
+                count('combine.cells', block.size)
+                count('combine.bytes_written', block.nbytes)
+            if hasattr(reader, 'release'):
+                reader.release()
+    store.mark_complete()
+    return store
+
+
+def _aligned_reader(hier_input: HierInput, data, grid: Grid):
+    """Returns ``read(rows, cols)`` giving the input on ``grid``, nan where it has no data."""
+    value = hier_input.value
+    if data is None:
+        return lambda rows, cols: np.full(_block_shape(rows, cols), np.nan if value is None else value, dtype=np.float64)
+    if hier_input.filepath and _is_vector(hier_input):
+        return _VectorBandReader(hier_input, grid)
+    if hier_input.filepath and _is_points(hier_input):
+        return _PointBandReader(hier_input, data, grid)
+    if hasattr(data, 'dims') and hasattr(data, 'coords'):
+        data, transform = _dataarray_transform(data)
+    else:
+        transform = getattr(data, 'transform', None)
+        if transform is not None and not aligned_to(data, grid):
+            data = ReprojectedLayer(data, grid, method=hier_input.resampling or 'nearest')
+            transform = data.transform
+
+    row_off, col_off = _offsets(transform, grid) if transform is not None else (0, 0)
+    if transform is None and tuple(data.shape) != grid.shape:
+        raise ValueError(f"Input shape {tuple(data.shape)} does not match grid shape {grid.shape}.")
+    fill_value = getattr(data, 'fill_value', None)
+
+    def read(rows, cols):
+        out = np.full(_block_shape(rows, cols), np.nan, dtype=np.float64)
+        src_rows = slice(max(rows.start - row_off, 0), min(rows.stop - row_off, data.shape[0]))
+        src_cols = slice(max(cols.start - col_off, 0), min(cols.stop - col_off, data.shape[1]))
+        if src_rows.stop <= src_rows.start or src_cols.stop <= src_cols.start:
+            return out
+        block = np.asarray(data[src_rows, src_cols])
+        valid = ~np.isnan(block) if block.dtype.kind == 'f' else np.ones(block.shape, dtype=bool)
+        if fill_value is not None and not np.isnan(fill_value):
+            valid &= block != fill_value
+        target = out[src_rows.start + row_off - rows.start:src_rows.stop + row_off - rows.start,
+                     src_cols.start + col_off - cols.start:src_cols.stop + col_off - cols.start]
+        target[valid] = block[valid] if value is None else value
+        return out
+
+    return read
+
+
+def _masked_reader(reader, index):
+    if index is None:
+        return reader
+    return _MaskedReader(reader, index)
+
+
+class _MaskedReader:
+    """Reads a chunk through a ``MaskIndex``, skipping chunks outside it."""
+
+    def __init__(self, reader, index):
+        self.reader = reader
+        self.index = index
+
+    def __call__(self, rows, cols):
+        return self.index.read(self.reader, rows, cols)
+
+    def release(self):
+        if hasattr(self.reader, 'release'):
+            self.reader.release()
+
+
+class _VectorBandReader:
+    """Rasterizes a vector input one row band at a time, reading only the features in the band."""
+
+    def __init__(self, hier_input: HierInput, grid: Grid):
+        self.hier_input = hier_input
+        self.grid = grid
+        self._band = None
+        self._rows = None
+
+    def __call__(self, rows, cols):
+        if self._rows != (rows.start, rows.stop):
+            from geohierarchy.io.rasterize import rasterize_input
+
+            self._band = rasterize_input(self.hier_input, self.grid.band(rows.start, rows.stop))['value']
+            self._rows = (rows.start, rows.stop)
+        return self._band[:, cols]
+
+    def release(self):
+        self._band = None
+        self._rows = None
+
+
+class _PointBandReader(_VectorBandReader):
+    """Snaps an opened ``PointTable`` one row band at a time.
+
+    Points are sorted by grid row once, so each band takes its points with a
+    binary search instead of scanning the table.
+    """
+
+    def __init__(self, hier_input: HierInput, points, grid: Grid):
+        super().__init__(hier_input, grid)
+        from geohierarchy.io.snap import _fields
+
+        self.fields = {'value': _fields(hier_input).get('value', np.nan)}
+        rows, _ = grid.rowcol(points.x, points.y)
+        self.order = np.argsort(rows, kind='stable')
+        self.sorted_rows = rows[self.order]
+        self.points = points
+
+    def __call__(self, rows, cols):
+        if self._rows != (rows.start, rows.stop):
+            from geohierarchy.io.snap import snap_points
+
+            lo, hi = np.searchsorted(self.sorted_rows, [rows.start, rows.stop])
+            band_points = self.points.take(self.order[lo:hi])
+            self._band = snap_points(band_points, self.grid.band(rows.start, rows.stop), self.fields)['value']
+            self._rows = (rows.start, rows.stop)
+        return self._band[:, cols]
+
+
+def _offsets(transform, grid: Grid) -> tuple:
+    a, _, c, _, e, f = tuple(transform)[:6]
+    ga, _, gc, _, ge, gf = grid.transform
+    if not (np.isclose(a, ga) and np.isclose(e, ge)):
+        raise ValueError(f"Input resolution {(a, -e)} does not match grid resolution {grid.resolution}; reproject it first.")
+    col_off, row_off = (c - gc) / ga, (f - gf) / ge
+    if not (np.isclose(col_off, round(col_off)) and np.isclose(row_off, round(row_off))):
+        raise ValueError("Input is not aligned to whole grid cells; reproject it first.")
+    return int(round(row_off)), int(round(col_off))
+
+
+def _dataarray_transform(data):
+    """North-up view of a 2D ``DataArray`` and its affine coefficients, from regular coordinates."""
+    if data.ndim != 2:
+        raise ValueError(f"Expected a 2D DataArray, got dims {data.dims}; select a single time or variable.")
+    y_dim, x_dim = data.dims
+    x, y = data[x_dim].values, data[y_dim].values
+    if len(y) > 1 and y[1] > y[0]:
+        data = data.isel({y_dim: slice(None, None, -1)})
+        y = y[::-1]
+    dx = float(x[1] - x[0]) if len(x) > 1 else 1.0
+    dy = float(y[1] - y[0]) if len(y) > 1 else -1.0
+    return data, (dx, 0.0, float(x[0]) - dx / 2, 0.0, dy, float(y[0]) - dy / 2)
+
+
+def _block_shape(rows, cols) -> tuple:
+    return rows.stop - rows.start, cols.stop - cols.start
+
+
+def _fingerprint(inputs: list) -> str:
+    """Hash of the inputs and the files behind them, so a store is only resumed for the same inputs."""
+    token = []
+    for i in inputs:
+        stat = os.stat(i.filepath) if i.filepath and os.path.isfile(i.filepath) else None
+        token.append({
+            'filepath': os.path.abspath(i.filepath) if i.filepath else None,
+            'file': [stat.st_mtime_ns, stat.st_size] if stat else None,
+            'column': i.column, 'value': i.value, 'z': i.z, 'layer': i.layer,
+            'mask': i.mask, 'global_mask': i.global_mask, 'clip': i.clip, 'global_clip': i.global_clip,
+            'opener_kwargs': i.opener_kwargs,
+            'resampling': i.resampling,
+        })
+    return hashlib.sha256(json.dumps(token, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def _write_json(path: str, obj):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(obj, file, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
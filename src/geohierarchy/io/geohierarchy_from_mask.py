@@ -1,3 +1,211 @@
-def geohierarchy_from_mask():
-    print('accessing geohierarchy_from_mask')
-    pass
\ No newline at end of file
+from dataclasses import dataclass
+
+import numpy as np
+
+from geoconfig.profiling import count, span
+from geoconfig.settings.config import raster_memory_limit
+from geohierarchy.grid import Grid, _same_crs
+from geohierarchy.input import HierInput
+from geohierarchy.io.openers import GeotiffOpener
+
+
+@dataclass
+class HierarchyGrid:
+    """Per-cell result of a hierarchy build on the mask grid."""
+
+    label: np.ndarray  # mask label, 0 where inactive
+    level: np.ndarray  # controlling hierarchy level, -1 where no level applies
+    value: np.ndarray  # value of the controlling level, nan where no level applies
+    z: np.ndarray  # z of the controlling level, nan where not set
+
+    @property
+    def shape(self):
+        return self.level.shape
+
+
+def geohierarchy_from_mask(mask, inputs: list, block_rows: int = None, grid: Grid = None) -> HierarchyGrid:
+    """
+    Assigns every active mask cell its controlling hierarchy level and value.
+
+    Levels follow the order of ``inputs``; where several levels cover a cell the
+    highest one controls. Cells are processed in row blocks, each block in a
+    single vectorized pass over the stacked levels.
+
+    Args:
+        mask: Path to a labelled mask raster or a 2D array. Cells with a label
+            greater than 0 are active.
+        inputs (list): One entry per level, either a ``HierInput`` or an array
+            aligned with the mask. A ``HierInput`` without a filepath covers every
+            cell with its constant ``value``. Vector inputs are rasterized onto
+            the mask grid, giving per-cell value and z; point inputs are snapped
+            onto it, averaging the points that share a cell. Rasters in another
+            CRS, resolution or extent are resampled onto the mask grid. Cells
+            outside an input's mask or clip are left to the levels below.
+        block_rows (int): Rows processed per pass. Defaults to the largest block
+            that keeps the stacked levels within ``raster_memory_limit``.
+        grid (Grid): Grid of the mask, needed for vector and point inputs when the mask
+            is a plain array. Defaults to the grid of a mask raster.
+
+    Returns:
+        HierarchyGrid: label, level, value and z grids.
+    """
+    mask = _open_layer(mask)
+    if grid is None and hasattr(mask, 'transform'):
+        grid = Grid.from_raster(mask)
+    with span('hierarchy.resolve_levels', levels=len(inputs)):
+        layers = [_resolve_level(i, grid) for i in inputs]
+
+    nrows, ncols = mask.shape
+    for data, _, _ in layers:
+        if data is not None and tuple(data.shape) != (nrows, ncols):
+            raise ValueError(f"Input shape {tuple(data.shape)} does not match mask shape {(nrows, ncols)}.")
+
+    value_dtype = np.result_type(np.float32, *(_layer_dtype(data, value) for data, value, _ in layers))
+    if block_rows is None:
+        block_rows = _default_block_rows(len(layers), ncols, value_dtype)
+
+    label = np.zeros((nrows, ncols), dtype=np.int32)
+    level = np.full((nrows, ncols), -1, dtype=np.int16 if len(layers) < 2**15 else np.int32)
+    value = np.full((nrows, ncols), np.nan, dtype=value_dtype)
+    z = np.full((nrows, ncols), np.nan, dtype=np.float64)
+    if not layers:
+        return HierarchyGrid(label=label, level=level, value=value, z=z)
+
+    z_grids = [lz if hasattr(lz, 'shape') else None for _, _, lz in layers]
+    level_z = np.array([np.nan if lz is None or g is not None else lz
+                        for (_, _, lz), g in zip(layers, z_grids)], dtype=np.float64)
+    for r0 in range(0, nrows, block_rows):
+        rows = slice(r0, min(r0 + block_rows, nrows))
+        block_label = np.nan_to_num(np.asarray(mask[rows, :], dtype=np.float64), nan=0).astype(np.int32)
+        active = block_label > 0
+
+        stack = np.empty((len(layers), rows.stop - rows.start, ncols), dtype=value_dtype)
+        with span('hierarchy.read_block', rows=rows.stop - rows.start):
+            for out, (data, v, _) in zip(stack, layers):
+                _fill_level_block(out, data, v, rows)
+        count('hierarchy.cells', stack.size)
+        valid = ~np.isnan(stack) & active
+
+        block_level = _top_level(valid)
+        controlled = block_level >= 0
+        safe_level = np.where(controlled, block_level, 0)
+
+        label[rows] = block_label
+        level[rows] = block_level
+        value[rows] = np.where(
+            controlled, np.take_along_axis(stack, safe_level[None], axis=0)[0], np.nan)
+        block_z = level_z[safe_level]
+        for i, z_grid in enumerate(z_grids):
+            if z_grid is not None:
+                from_grid = controlled & (block_level == i)
+                block_z[from_grid] = np.asarray(z_grid[rows])[from_grid]
+        z[rows] = np.where(controlled, block_z, np.nan)
+
+    return HierarchyGrid(label=label, level=level, value=value, z=z)
+
+
+def _top_level(valid: np.ndarray) -> np.ndarray:
+    """Index of the highest True entry along axis 0, -1 where there is none."""
+    # a max over level numbers reduces contiguously, unlike argmax on a reversed view
+    dtype = np.int16 if valid.shape[0] < 2**15 else np.int32
+    levels = np.arange(1, valid.shape[0] + 1, dtype=dtype).reshape((-1,) + (1,) * (valid.ndim - 1))
+    return (valid * levels).max(axis=0) - 1
+
+
+def _resolve_level(hier_input, grid):
+    """Returns (data, constant value, z) for one level."""
+    if isinstance(hier_input, HierInput):
+        data, value, z = _resolve_input(hier_input, grid)
+        if any(m is not None for m in (hier_input.mask, hier_input.global_mask, hier_input.clip, hier_input.global_clip)):
+            if grid is None:
+                raise ValueError(f"A grid is needed to mask {hier_input.filepath or 'a constant level'}.")
+            from geohierarchy.io.mask_index import MaskedLayer, input_mask_index
+            if data is None:
+                data = np.broadcast_to(np.float64(value), grid.shape)
+            data = MaskedLayer(data, input_mask_index(hier_input, grid))
+        return data, value, z
+    return _open_layer(hier_input), None, None
+
+
+def _resolve_input(hier_input, grid):
+    if hier_input.filepath and _is_vector(hier_input):
+        if grid is None:
+            raise ValueError(f"A grid is needed to rasterize {hier_input.filepath}.")
+        from geohierarchy.io.rasterize import rasterize_input
+        burned = rasterize_input(hier_input, grid)
+        return burned['value'], None, burned.get('z')
+    if hier_input.filepath and _is_points(hier_input):
+        if grid is None:
+            raise ValueError(f"A grid is needed to snap {hier_input.filepath}.")
+        from geohierarchy.io.snap import snap_input
+        snapped = snap_input(hier_input, grid)
+        return snapped['value'], None, snapped.get('z')
+    data = _open_layer(hier_input.open()) if hier_input.filepath else None
+    if data is None and hier_input.value is None:
+        raise ValueError("A HierInput without a filepath needs a constant value.")
+    if data is not None and grid is not None and _off_grid(data, grid):
+        from geohierarchy.io.reproject import ReprojectedLayer
+        data = ReprojectedLayer(data, grid, method=hier_input.resampling or 'nearest')
+    return data, hier_input.value, hier_input.z
+
+
+def _is_vector(hier_input) -> bool:
+    from geohierarchy.io.opener_registry import opener_registry
+    return getattr(opener_registry.get(hier_input.filepath), 'vector', False)
+
+
+def _is_points(hier_input) -> bool:
+    from geohierarchy.io.opener_registry import opener_registry
+    return getattr(opener_registry.get(hier_input.filepath), 'points', False)
+
+
+def _off_grid(data, grid) -> bool:
+    if getattr(data, 'transform', None) is None:
+        return False
+    src_grid = Grid.from_raster(data)
+    return (src_grid.shape != grid.shape or not np.allclose(src_grid.transform, grid.transform)
+            or not _same_crs(src_grid.crs, grid.crs))
+
+
+def _open_layer(data):
+    if isinstance(data, str):
+        return GeotiffOpener().open(data)
+    if hasattr(data, 'shape') and hasattr(data, '__getitem__'):
+        return data
+    return np.asarray(data)
+
+
+def _layer_dtype(data, value):
+    if value is not None:
+        return np.asarray(value).dtype
+    return np.dtype(data.dtype)
+
+
+def _fill_level_block(out, data, value, rows):
+    """Reads one row block of a level into ``out``, nan where the level has no data."""
+    if data is None:
+        out.fill(value)
+        return
+
+    block = np.asarray(data[rows, :])
+    if value is None:
+        out[...] = block
+    else:
+        out.fill(value)
+    fill_value = getattr(data, 'fill_value', None)
+    has_fill = fill_value is not None and not np.isnan(fill_value)
+    if value is not None or block.dtype.kind != 'f' or has_fill:
+        out[~_valid_cells(block, fill_value)] = np.nan
+
+
+def _valid_cells(block, fill_value):
+    valid = ~np.isnan(block) if block.dtype.kind == 'f' else np.ones(block.shape, dtype=bool)
+    if fill_value is not None and not np.isnan(fill_value):
+        valid &= block != fill_value
+    return valid
+
+
+def _default_block_rows(nlevels, ncols, dtype):
+    # the stacked block, its validity mask and the gathered result dominate
+    bytes_per_row = max(1, nlevels) * ncols * (np.dtype(dtype).itemsize + 2) + ncols * 32
+    return max(1, raster_memory_limit // bytes_per_row)
@@ -0,0 +1,352 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from geoconfig.profiling import count
+from geoconfig.settings.config import mask_index_cache_size, mask_tile_cache_size, mask_tile_size
+from geohierarchy.grid import Grid, _as_slice, _same_crs
+
+OUTSIDE, BOUNDARY, INSIDE = 0, 1, 2
+
+
+class MaskIndex:
+    """Mask and clip geometries compiled once into a tiled index over a grid.
+
+    Every tile of the grid is classified as outside, inside or on the boundary
+    of the kept region, and the cell masks of boundary tiles are cached. A block
+    that only covers outside tiles needs no read at all, and one that only
+    covers inside tiles needs no per-cell test.
+
+    A mask keeps the cells whose centre lies inside its polygons, or that a mask
+    raster covers with a value above 0. A clip keeps the cells inside the
+    bounding box of its geometry or raster. Several masks and clips intersect.
+    """
+
+    def __init__(self, grid: Grid, masks=(), clips=(), tile_size: int = None):
+        """
+        Args:
+            grid (Grid): Grid the index is built on.
+            masks: Vector or raster filepaths, shapely geometries or boolean arrays
+                shaped like the grid.
+            clips: Vector or raster filepaths, shapely geometries or
+                (xmin, ymin, xmax, ymax) tuples.
+            tile_size (int): Tile edge in cells.
+        """
+        self.grid = grid
+        self.tile_size = tile_size or mask_tile_size
+        self.sources = [_source(mask, grid) for mask in masks] + [_clip_source(clip, grid) for clip in clips]
+        self.tile_shape = (-(-grid.nrows // self.tile_size), -(-grid.ncols // self.tile_size))
+        self.tiles = np.full(self.tile_shape, INSIDE, dtype=np.int8)
+        for source in self.sources:
+            np.minimum(self.tiles, source.classify(self), out=self.tiles)
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        counts = np.bincount(self.tiles.ravel(), minlength=3)
+        return (f"{self.__class__.__name__}(tiles={self.tile_shape}, outside={counts[OUTSIDE]}, "
+                f"boundary={counts[BOUNDARY]}, inside={counts[INSIDE]})")
+
+    def tile_slices(self, i: int, j: int) -> tuple:
+        size = self.tile_size
+        return (slice(i * size, min((i + 1) * size, self.grid.nrows)),
+                slice(j * size, min((j + 1) * size, self.grid.ncols)))
+
+    def status(self, rows: slice, cols: slice) -> int:
+        """OUTSIDE, INSIDE or BOUNDARY for a block, from the tiles it covers."""
+        covered = self.tiles[self._tile_range(rows, self.grid.nrows), self._tile_range(cols, self.grid.ncols)]
+        if not covered.size or (covered == OUTSIDE).all():
+            return OUTSIDE
+        if (covered == INSIDE).all():
+            return INSIDE
+        return BOUNDARY
+
+    def tile_mask(self, i: int, j: int) -> np.ndarray:
+        """Cells kept in one tile, cached for boundary tiles."""
+        status = self.tiles[i, j]
+        if status != BOUNDARY:
+            rows, cols = self.tile_slices(i, j)
+            return np.full((rows.stop - rows.start, cols.stop - cols.start), status == INSIDE)
+        with self._lock:
+            cached = self._masks.get((i, j))
+            if cached is not None:
+                self._masks.move_to_end((i, j))
+                return cached
+
+        rows, cols = self.tile_slices(i, j)
+        mask = np.ones((rows.stop - rows.start, cols.stop - cols.start), dtype=bool)
+        for source in self.sources:
+            mask &= source.cells(self.grid, rows, cols)
+        mask.setflags(write=False)
+        with self._lock:
+            if not mask.any():
+                self.tiles[i, j] = OUTSIDE  # overlapping boundaries that turn out not to meet
+            elif mask.all():
+                self.tiles[i, j] = INSIDE
+            else:
+                self._masks[(i, j)] = mask
+                while len(self._masks) > mask_tile_cache_size:
+                    self._masks.popitem(last=False)
+        return mask
+
+    def block_mask(self, rows: slice, cols: slice) -> np.ndarray:
+        """Cells kept in any block, assembled from the tile masks."""
+        out = np.empty((rows.stop - rows.start, cols.stop - cols.start), dtype=bool)
+        for i in range(*self._tile_range(rows, self.grid.nrows).indices(self.tile_shape[0])):
+            for j in range(*self._tile_range(cols, self.grid.ncols).indices(self.tile_shape[1])):
+                tile_rows, tile_cols = self.tile_slices(i, j)
+                r0, r1 = max(rows.start, tile_rows.start), min(rows.stop, tile_rows.stop)
+                c0, c1 = max(cols.start, tile_cols.start), min(cols.stop, tile_cols.stop)
+                out[r0 - rows.start:r1 - rows.start, c0 - cols.start:c1 - cols.start] = self.tile_mask(i, j)[
+                    r0 - tile_rows.start:r1 - tile_rows.start, c0 - tile_cols.start:c1 - tile_cols.start]
+        return out
+
+    def read(self, read, rows: slice, cols: slice) -> np.ndarray:
+        """
+        Calls ``read(rows, cols)`` for a block and blanks the cells outside the index.
+
+        Returns:
+            np.ndarray: float64 block, nan outside. ``read`` is not called for
+            blocks that are entirely outside.
+        """
+        status = self.status(rows, cols)
+        count(f"mask.{('outside', 'boundary', 'inside')[status]}_blocks")
+        if status == OUTSIDE:
+            return np.full((rows.stop - rows.start, cols.stop - cols.start), np.nan)
+        block = np.array(read(rows, cols), dtype=np.float64)
+        if status == BOUNDARY:
+            block[~self.block_mask(rows, cols)] = np.nan
+        return block
+
+    def _tile_range(self, span: slice, size: int) -> slice:
+        start, stop = max(span.start, 0), min(span.stop, size)
+        if stop <= start:
+            return slice(0, 0)
+        return slice(start // self.tile_size, -(-stop // self.tile_size))
+
+
+class MaskedLayer:
+    """Lazy view of a 2D layer with the cells outside a ``MaskIndex`` set to nan."""
+
+    def __init__(self, data, index: MaskIndex):
+        self.data = data
+        self.index = index
+        self.shape = index.grid.shape
+        self.dtype = np.dtype(np.float64)
+        self.transform = index.grid.transform
+        self.crs = index.grid.crs
+        self.fill_value = None
+        self.ndim = 2
+        self._source_fill = getattr(data, 'fill_value', None)
+        if tuple(data.shape) != self.shape:
+            raise ValueError(f"Layer shape {tuple(data.shape)} does not match mask grid shape {self.shape}.")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.data!r}, {self.index!r})"
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:, :]
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, key):
+        rows, cols = (key, slice(None)) if not isinstance(key, tuple) else key
+        squeeze = tuple(axis for axis, k in enumerate((rows, cols)) if not isinstance(k, slice))
+        rows, cols = (_as_slice(k, size) for k, size in zip((rows, cols), self.shape))
+        out = self.index.read(self._read, rows, cols)
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+    def _read(self, rows, cols):
+        block = np.array(self.data[rows, cols], dtype=np.float64)
+        if self._source_fill is not None and not np.isnan(self._source_fill):
+            block[block == self._source_fill] = np.nan
+        return block
+
+
+# indexes are shared by every input with the same grid, masks and clips;
+# each entry is (index, masks + clips), holding the objects keyed by identity
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def mask_index(grid: Grid, masks=(), clips=(), tile_size: int = None):
+    """
+    Returns the shared ``MaskIndex`` for a grid and set of masks and clips.
+
+    The index is built on first use and reused while the mask and clip files
+    are unchanged. None entries are ignored; with nothing left, returns None.
+    """
+    masks = tuple(m for m in masks if m is not None)
+    clips = tuple(c for c in clips if c is not None)
+    if not masks and not clips:
+        return None
+    key = (grid, _key(masks), _key(clips), tile_size or mask_tile_size)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None:
+            _indexes.move_to_end(key)
+            return entry[0]
+    index = MaskIndex(grid, masks=masks, clips=clips, tile_size=tile_size)
+    with _indexes_lock:
+        index = _indexes.setdefault(key, (index, masks + clips))[0]
+        while len(_indexes) > mask_index_cache_size:
+            _indexes.popitem(last=False)
+    return index
+
+
+def input_mask_index(hier_input, grid: Grid, tile_size: int = None):
+    """Shared ``MaskIndex`` of a ``HierInput``'s mask, global_mask, clip and global_clip, or None."""
+    return mask_index(
+        grid,
+        masks=(hier_input.mask, hier_input.global_mask),
+        clips=(hier_input.clip, hier_input.global_clip),
+        tile_size=tile_size)
+
+
+class _GeometrySource:
+    """Polygons tested against tile boxes and cell centres."""
+
+    def __init__(self, geometry):
+        import shapely
+
+        self.geometry = geometry
+        shapely.prepare(self.geometry)
+
+    def classify(self, index: MaskIndex) -> np.ndarray:
+        import shapely
+
+        grid = index.grid
+        a, _, c, _, e, f = grid.transform
+        size = index.tile_size
+        # boxes around the cell centres of each tile, padded a quarter cell so
+        # single-row tiles are not degenerate; the padding only widens the boundary class
+        row0 = np.arange(index.tile_shape[0]) * size
+        col0 = np.arange(index.tile_shape[1]) * size
+        row1 = np.minimum(row0 + size, grid.nrows) - 1
+        col1 = np.minimum(col0 + size, grid.ncols) - 1
+        x0, x1 = c + a * (col0 + 0.25), c + a * (col1 + 0.75)
+        y0, y1 = f + e * (row0 + 0.25), f + e * (row1 + 0.75)
+        boxes = shapely.box(
+            np.minimum(x0, x1)[None, :], np.minimum(y0, y1)[:, None],
+            np.maximum(x0, x1)[None, :], np.maximum(y0, y1)[:, None])
+
+        tiles = np.full(index.tile_shape, BOUNDARY, dtype=np.int8)
+        tiles[~shapely.intersects(self.geometry, boxes)] = OUTSIDE
+        tiles[shapely.contains_properly(self.geometry, boxes)] = INSIDE
+        return tiles
+
+    def cells(self, grid: Grid, rows: slice, cols: slice) -> np.ndarray:
+        import shapely
+
+        a, _, c, _, e, f = grid.transform
+        xs, ys = np.meshgrid(c + a * (np.arange(cols.start, cols.stop) + 0.5),
+                             f + e * (np.arange(rows.start, rows.stop) + 0.5))
+        return shapely.intersects_xy(self.geometry, xs, ys)
+
+
+class _RasterSource:
+    """A mask raster or boolean array, read once tile by tile to classify."""
+
+    def __init__(self, data, grid: Grid):
+        if getattr(data, 'transform', None) is not None:
+            from geohierarchy.io.geohierarchy_from_mask import _off_grid
+            from geohierarchy.io.reproject import ReprojectedLayer
+
+            if _off_grid(data, grid):
+                data = ReprojectedLayer(data, grid, method='nearest')
+        elif tuple(np.shape(data)) != grid.shape:
+            raise ValueError(f"Mask shape {tuple(np.shape(data))} does not match grid shape {grid.shape}.")
+        self.data = data
+        self.fill_value = getattr(data, 'fill_value', None)
+
+    def classify(self, index: MaskIndex) -> np.ndarray:
+        tiles = np.empty(index.tile_shape, dtype=np.int8)
+        for i in range(index.tile_shape[0]):
+            for j in range(index.tile_shape[1]):
+                kept = self.cells(index.grid, *index.tile_slices(i, j))
+                tiles[i, j] = INSIDE if kept.all() else OUTSIDE if not kept.any() else BOUNDARY
+        return tiles
+
+    def cells(self, grid: Grid, rows: slice, cols: slice) -> np.ndarray:
+        block = np.asarray(self.data[rows, cols])
+        if block.dtype == bool:
+            return block
+        kept = block > 0  # nan compares False
+        if self.fill_value is not None and not np.isnan(self.fill_value):
+            kept &= block != self.fill_value
+        return kept
+
+
+def _source(mask, grid: Grid):
+    if isinstance(mask, str):
+        opener = _opener(mask)
+        if getattr(opener, 'vector', False):
+            return _GeometrySource(_read_geometry(mask, grid))
+        return _RasterSource(opener().open(mask), grid)
+    if hasattr(mask, 'geom_type'):
+        return _GeometrySource(mask)
+    return _RasterSource(mask, grid)
+
+
+def _clip_source(clip, grid: Grid):
+    import shapely
+
+    if isinstance(clip, str):
+        opener = _opener(clip)
+        if getattr(opener, 'vector', False):
+            bounds = shapely.bounds(_read_geometry(clip, grid))
+        else:
+            bounds = Grid.from_raster(opener().open(clip)).bounds
+    elif hasattr(clip, 'geom_type'):
+        bounds = clip.bounds
+    else:
+        bounds = tuple(clip)
+    return _GeometrySource(shapely.box(*bounds))
+
+
+def _read_geometry(filepath: str, grid: Grid):
+    import shapely
+    from geoconfig.user_input.filepath.vector import VectorBatchReader
+
+    reader = VectorBatchReader(filepath, columns=[], bounds=grid.bounds)
+    if grid.crs and reader.crs and not _same_crs(grid.crs, reader.crs):
+        raise ValueError(f"Mask CRS {reader.crs} does not match grid CRS {grid.crs}; reproject {filepath} first.")
+    parts = [geometries for geometries, _ in reader.iter_geometries()]
+    return shapely.union_all(np.concatenate(parts)) if parts else shapely.Polygon()
+
+
+def _opener(filepath: str):
+    from geohierarchy.io.opener_registry import opener_registry
+
+    opener = opener_registry.get(filepath)
+    if opener is None:
+        raise ValueError(f"No opener registered for mask {filepath}")
+    return opener
+
+
+def _key(specs: tuple) -> tuple:
+    # keyed by content, so a changed array or a new object reusing an id never hits a stale index
+    key = []
+    for spec in specs:
+        if isinstance(spec, str):
+            key.append(('file', _file_key(spec)))
+        elif isinstance(spec, (tuple, list)):
+            key.append(('bounds', tuple(float(v) for v in spec)))
+        elif hasattr(spec, 'geom_type'):
+            import shapely
+            key.append(('geometry', hashlib.sha256(shapely.to_wkb(spec)).hexdigest()))
+        elif isinstance(spec, np.ndarray):
+            digest = hashlib.sha256(np.ascontiguousarray(spec).tobytes()).hexdigest()
+            key.append(('array', spec.dtype.str, spec.shape, digest))
+        elif isinstance(getattr(spec, 'filepath', None), str) and getattr(spec, 'transform', None) is not None:
+            key.append(('raster', _file_key(spec.filepath), tuple(spec.shape), tuple(spec.transform)[:6]))
+        else:
+            key.append(('object', id(spec)))  # kept alive by its cache entry, so the id is not reused
+    return tuple(key)
+
+
+def _file_key(filepath: str) -> tuple:
+    stat = os.stat(filepath) if os.path.isfile(filepath) else None
+    return os.path.abspath(filepath), (stat.st_mtime_ns, stat.st_size) if stat else None
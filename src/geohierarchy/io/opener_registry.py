@@ -1,12 +1,2 @@
-from geohierarchy.io.openers import GeotiffOpener, ShapefileOpener, CSVOpener
-
-class OpenerRegistry:
-    registry = {
-        'geotiff': GeotiffOpener,
-        'shapefile': ShapefileOpener,
-        'csv': CSVOpener,
-    }
-
-    def get(self, filepath):
-        ext = filepath.split('.')[-1]
-        return self.registry.get(ext)
\ No newline at end of file
+# one registry serves geoconfig and geohierarchy
+from geoconfig.user_input.filepath.opener_registry import OpenerRegistry, opener_registry
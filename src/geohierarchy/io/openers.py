@@ -1,30 +1,8 @@
-from abc import ABC, abstractmethod
-
-class Opener(ABC):
-    @abstractmethod
-    def open(self):
-        pass
-
-class GeotiffOpener(Opener):
-    def __init__(self):
-        self.type = 'geotiff'
-
-    def open(self, filepath, **kwargs):
-        print('accessing geotiff opener')
-        pass
-
-class ShapefileOpener(Opener):
-    def __init__(self):
-        self.type = 'shapefile'
-
-    def open(self, filepath, **kwargs):
-        print('accessing shapefile opener')
-        pass
-
-class CSVOpener(Opener):
-    def __init__(self):
-        self.type = 'csv'
-
-    def open(self, filepath, **kwargs):
-        print('accessing csv opener')
-        pass
\ No newline at end of file
+# the openers live in geoconfig's shared registry; these names are kept for existing imports
+from geoconfig.user_input.filepath.file_openers import (
+    FileOpener as Opener,
+    RasterOpener as GeotiffOpener,
+    ShapefileOpener,
+    NetCDFOpener,
+    CSVOpener,
+    )
@@ -1,20 +1,156 @@
-from geohierarchy.input import InputObject
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from os import path
 
+from geoconfig.profiling import span
+from geoconfig.settings.config import read_max_workers
+from geoconfig.user_input.filepath.io_pool import io_pool
+from geoconfig.user_input.filepath.remote import path_exists
+from geohierarchy.grid import Grid
+from geohierarchy.input import HierInput
+from geohierarchy.io.combine import combine
+
+read_modes = ('serial', 'thread', 'process', 'auto')
+
+
 class ReadParser:
-    def __init__(self, path):
+    def __init__(self, path=None, mode: str = 'serial', max_workers: int = None):
+        """
+        Args:
+            path (str): Root path of the inputs.
+            mode (str): 'serial', 'thread' (I/O bound opens), 'process' or 'auto'.
+                'process' sends inputs whose opener is CPU bound (only CSV today)
+                to a process pool. Rasters, vectors and netCDF open lazily and
+                would come back from a worker without their data, so they always
+                go to the thread pool. 'auto' does the same, but keeps a single
+                CPU bound input in the thread pool rather than spawn a process for it.
+            max_workers (int): Upper bound on workers per pool.
+        """
+        if mode not in read_modes:
+            raise ValueError(f"Invalid read mode: {mode}. Expected one of {read_modes}")
         self.path = path
+        self.mode = mode
+        self.max_workers = max_workers if max_workers is not None else read_max_workers
+
+    def read(self, input_list, mask=None, clip=None, store: str = None, grid: Grid = None, levels: list = None,
+             chunks: tuple = None):
+        """
+        Opens the inputs and, with ``store`` set, combines them into one chunked dataset.
+
+        Args:
+            input_list (list): Filepaths, dicts of ``HierInput`` kwargs or ``HierInput``s,
+                in hierarchy order.
+            mask (str): Mask applied to inputs built here.
+            clip (str): Clip applied to inputs built here.
+            store (str): Directory of a ``HierarchyStore`` to combine into. An
+                interrupted combine into the same directory resumes.
+            grid (Grid): Common grid for the combine, defaulting to the grid of the
+                first raster input.
+            levels (list): Level names for the store.
+            chunks (tuple): (rows, cols) per store chunk.
+
+        Returns:
+            The opened data per input, or the ``HierarchyStore`` when ``store`` is set.
+        """
+        inputs = [self._to_input(f, mask, clip) for f in input_list]
+        data_list = self._open_all(inputs)
+        if store is None:
+            return data_list
+
+        grid = grid or _first_grid(data_list)
+        return combine(inputs, data_list, store, grid, levels=levels, chunks=chunks)
+
+    async def read_async(self, input_list, mask=None, clip=None, store: str = None, grid: Grid = None,
+                         levels: list = None, chunks: tuple = None, max_concurrency: int = None):
+        """
+        ``read`` for the async pipeline.
+
+        The existence checks and opens (headers and first range reads) of every
+        input are issued at once on the shared ``io_pool``, so a hierarchy on an
+        object store costs about one round trip per stage rather than one per
+        input. ``mode`` is not used; the combine, if any, runs on the pool too.
+
+        Args:
+            max_concurrency (int): Opens in flight at once, on top of the pool's
+                own bound. Other arguments are as for ``read``.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or io_pool.max_concurrency)
+
+        async def bounded(fn, *args):
+            async with semaphore:
+                return await io_pool.run(fn, *args)
+
+        inputs = await asyncio.gather(*(bounded(self._to_input, f, mask, clip) for f in input_list))
+        data_list = await asyncio.gather(*(bounded(_open_input, i) for i in inputs))
+        if store is None:
+            return list(data_list)
+
+        grid = grid or _first_grid(data_list)
+        return await io_pool.run(combine, inputs, list(data_list), store, grid, levels=levels, chunks=chunks)
+
+    def _to_input(self, f, mask, clip) -> HierInput:
+        if isinstance(f, HierInput):
+            return f
+        if isinstance(f, str):
+            if not path_exists(f):
+                raise FileNotFoundError(f"File not found: {f}")
+            return HierInput(f, mask=mask, clip=clip)
+        if isinstance(f, dict):
+            return HierInput(**{'mask': mask, 'clip': clip, **f})
+        raise TypeError(f"Invalid input: {f!r}. Expected a filepath, dict or HierInput.")
+
+    def _open_all(self, inputs: list) -> list:
+        if self.mode == 'serial' or len(inputs) < 2:
+            return [_open_input(i) for i in inputs]
+
+        if self.mode == 'thread':
+            pools = {'thread': list(range(len(inputs)))}
+        else:
+            pools = {'thread': [], 'process': []}
+            for idx, hier_input in enumerate(inputs):
+                pools['process' if hier_input.cpu_bound else 'thread'].append(idx)
+            if self.mode == 'auto' and len(pools['process']) < 2:
+                pools['thread'] += pools.pop('process')
+
+        # results are slotted back by input index so the order never depends on completion
+        data_list = [None] * len(inputs)
+        executors = []
+        try:
+            futures = {}
+            for kind, indices in pools.items():
+                if not indices:
+                    continue
+                executor = self._executor(kind, len(indices))
+                executors.append(executor)
+                for idx in indices:
+                    futures[idx] = executor.submit(_open_input, inputs[idx])
+            for idx, future in futures.items():
+                data_list[idx] = future.result()
+        finally:
+            for executor in executors:
+                executor.shutdown(cancel_futures=True)
+        return data_list
+
+    def _executor(self, kind: str, n_inputs: int):
+        if kind == 'thread':
+            default = min(32, (os.cpu_count() or 1) + 4)
+            return ThreadPoolExecutor(max_workers=min(n_inputs, self.max_workers or default))
+        default = os.cpu_count() or 1
+        return ProcessPoolExecutor(max_workers=min(n_inputs, self.max_workers or default))
 
-    def read(input_list, mask, clip):
-        # TODO: check list
 
-        data_list = []
-        for f in input_list:
-            if isinstance(f, str) and path.isfile(f):
-                input = InputObject(f, mask, clip)
-            elif isinstance(f, dict):
-                input = InputObject(dict)
+def _open_input(hier_input: HierInput):
+    # module level so it can be sent to worker processes
+    if hier_input.filepath is None:
+        return None  # constant level, nothing to read
+    with span('read.open', filepath=hier_input.filepath):
+        return hier_input.open()
 
-            data = input.open()
 
-        ## combine xr array
\ No newline at end of file
+def _first_grid(data_list: list) -> Grid:
+    grid = next((Grid.from_raster(data) for data in data_list
+                 if hasattr(data, 'transform') and hasattr(data, 'shape')), None)
+    if grid is None:
+        raise ValueError("No raster input to take the grid from; pass grid explicitly.")
+    return grid
@@ -0,0 +1,367 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from geoconfig.profiling import count, span
+from geoconfig.settings.config import (
+    reproject_cache_bytes,
+    reproject_control_step,
+    reproject_max_error,
+    reproject_tile_size,
+    )
+from geohierarchy.grid import Grid, _as_slice, _crs_key, _same_crs
+
+resampling_methods = ('nearest', 'bilinear', 'mode')
+
+
+class MappingCache:
+    """LRU cache of target cell centres expressed in a source CRS.
+
+    Entries are keyed by (source CRS, target grid, tile, supersampling) so the
+    pyproj transform for a CRS/grid pair is done once and reused by every layer
+    in that CRS, whatever its resolution or extent. Size is bounded in bytes.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = reproject_cache_bytes if max_bytes is None else max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # pyproj transformers are not thread safe
+        self.hits = 0
+        self.misses = 0
+
+    def coords(self, src_crs, grid: Grid, rows: slice, cols: slice, factor: int = 1):
+        """
+        Source CRS coordinates of the target cell centres (or sub-cell centres) in a tile.
+
+        Returns:
+            tuple: (xs, ys) arrays shaped (rows * factor, cols * factor).
+        """
+        key = (_crs_key(src_crs), grid, rows.start, rows.stop, cols.start, cols.stop, factor)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                count('reproject.mapping_hits')
+                return cached
+            self.misses += 1
+            count('reproject.mapping_misses')
+
+        row_pos, col_pos = _subcell_positions(rows, cols, factor)
+        if _same_crs(src_crs, grid.crs):
+            xs, ys = _world(grid, row_pos, col_pos)
+        else:
+            xs, ys = _approx_transform(self._transformer(grid.crs, src_crs), grid, row_pos, col_pos)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (xs, ys)
+                self._bytes += xs.nbytes + ys.nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, (old_x, old_y) = self._entries.popitem(last=False)
+                    self._bytes -= old_x.nbytes + old_y.nbytes
+        return xs, ys
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _transformer(self, target_crs, src_crs):
+        from pyproj import Transformer
+
+        transformers = getattr(self._local, 'transformers', None)
+        if transformers is None:
+            transformers = self._local.transformers = {}
+        key = (_crs_key(target_crs), _crs_key(src_crs))
+        if key not in transformers:
+            transformers[key] = Transformer.from_crs(target_crs, src_crs, always_xy=True)
+        return transformers[key]
+
+
+mapping_cache = MappingCache()
+
+
+class ReprojectedLayer:
+    """Lazy view of a raster layer resampled onto a target grid.
+
+    Indexing returns float64 blocks of the target grid, nan where the source has
+    no data. Only the source window under each requested block is read.
+    """
+
+    def __init__(self, data, grid: Grid, method: str = 'nearest', src_grid: Grid = None, cache: MappingCache = None):
+        """
+        Args:
+            data: Source layer, a ``ChunkedRaster`` or any 2D array-like; plain
+                arrays need ``src_grid``.
+            grid (Grid): Target grid.
+            method (str): 'nearest', 'bilinear' or 'mode' (majority of the source
+                cells under each target cell, for categorical layers).
+            src_grid (Grid): Grid of ``data``, defaults to ``Grid.from_raster(data)``.
+            cache (MappingCache): Coordinate cache, defaults to the shared one.
+        """
+        if method not in resampling_methods:
+            raise ValueError(f"Invalid resampling method: {method}. Expected one of {resampling_methods}")
+        self.data = data
+        self.grid = grid
+        self.method = method
+        self.src_grid = src_grid or Grid.from_raster(data)
+        self.cache = cache or mapping_cache
+        self.shape = grid.shape
+        self.dtype = np.dtype(np.float64)
+        self.transform = grid.transform
+        self.crs = grid.crs
+        self.fill_value = None
+        self.ndim = 2
+        # mode looks at every source cell under a target cell, through a grid of sub-cell samples
+        self.factor = _supersample_factor(self.src_grid, grid) if method == 'mode' else 1
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.data!r}, method={self.method}, shape={self.shape})"
+
+    def __array__(self, dtype=None, copy=None):
+        out = reproject(self.data, self.grid, method=self.method, src_grid=self.src_grid, cache=self.cache)
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, key):
+        rows, cols = (key, slice(None)) if not isinstance(key, tuple) else key
+        squeeze = tuple(axis for axis, k in enumerate((rows, cols)) if not isinstance(k, slice))
+        rows, cols = (_as_slice(k, size) for k, size in zip((rows, cols), self.shape))
+        out = self.read(rows, cols)
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+    def read(self, rows: slice, cols: slice) -> np.ndarray:
+        """Resamples one block of the target grid."""
+        xs, ys = self.cache.coords(self.src_grid.crs, self.grid, rows, cols, self.factor)
+        a, _, c, _, e, f = self.src_grid.transform
+        u = (xs - c) / a - 0.5  # fractional source column, cell centres on integers
+        v = (ys - f) / e - 0.5
+
+        finite = np.isfinite(u) & np.isfinite(v)
+        shape = (rows.stop - rows.start, cols.stop - cols.start)
+        if not finite.any():
+            return np.full(shape, np.nan)
+        nrows, ncols = self.src_grid.shape
+        r0 = int(np.clip(np.floor(v[finite].min()), 0, nrows))
+        r1 = int(np.clip(np.floor(v[finite].max()) + 2, 0, nrows))
+        c0 = int(np.clip(np.floor(u[finite].min()), 0, ncols))
+        c1 = int(np.clip(np.floor(u[finite].max()) + 2, 0, ncols))
+        if r1 <= r0 or c1 <= c0:
+            return np.full(shape, np.nan)
+
+        window = _as_float(np.asarray(self.data[r0:r1, c0:c1]), getattr(self.data, 'fill_value', None))
+        u, v = u - c0, v - r0
+        if self.method == 'bilinear':
+            return _bilinear(window, u, v)
+        samples = _nearest(window, u, v)
+        if self.method == 'mode':
+            return _block_mode(samples, shape, self.factor)
+        return samples
+
+
+def reproject(
+        data,
+        grid: Grid,
+        method: str = 'nearest',
+        src_grid: Grid = None,
+        tile_size: int = None,
+        max_workers: int = None,
+        cache: MappingCache = None) -> np.ndarray:
+    """
+    Resamples a raster layer onto ``grid``, tile by tile on a thread pool.
+
+    Target cell centres are transformed to the source CRS once per (CRS, grid,
+    tile) and cached, so further layers in the same CRS only pay for the
+    affine step and the kernel.
+
+    Args:
+        data: ``ChunkedRaster`` or 2D array-like.
+        grid (Grid): Target grid.
+        method (str): 'nearest', 'bilinear' or 'mode'.
+        src_grid (Grid): Grid of ``data`` when it has no transform of its own.
+        tile_size (int): Tile edge in target cells.
+        max_workers (int): Threads used for the tiles.
+        cache (MappingCache): Coordinate cache, defaults to the shared one.
+
+    Returns:
+        np.ndarray: float64 grid, nan where the source has no data.
+    """
+    layer = ReprojectedLayer(data, grid, method=method, src_grid=src_grid, cache=cache)
+    tile_size = tile_size or reproject_tile_size
+    out = np.empty(grid.shape, dtype=np.float64)
+    tiles = [(slice(r, min(r + tile_size, grid.nrows)), slice(c, min(c + tile_size, grid.ncols)))
+             for r in range(0, grid.nrows, tile_size) for c in range(0, grid.ncols, tile_size)]
+
+    def fill(tile):
+        rows, cols = tile
+        with span('reproject.tile', method=method):
+            out[rows, cols] = layer.read(rows, cols)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tiles) == 1:
+        for tile in tiles:
+            fill(tile)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(fill, tiles))
+    return out
+
+
+def aligned_to(data, grid: Grid, src_grid: Grid = None) -> bool:
+    """True if ``data`` already sits on ``grid``'s CRS and resolution at whole-cell offsets."""
+    src_grid = src_grid or Grid.from_raster(data)
+    if not _same_crs(src_grid.crs, grid.crs):
+        return False
+    a, _, c, _, e, f = src_grid.transform
+    ga, _, gc, _, ge, gf = grid.transform
+    if not (np.isclose(a, ga) and np.isclose(e, ge)):
+        return False
+    col_off, row_off = (c - gc) / ga, (f - gf) / ge
+    return bool(np.isclose(col_off, round(col_off)) and np.isclose(row_off, round(row_off)))
+
+
+def _nearest(window, u, v):
+    rows, cols = np.floor(v + 0.5).astype(np.int64), np.floor(u + 0.5).astype(np.int64)
+    inside = (rows >= 0) & (rows < window.shape[0]) & (cols >= 0) & (cols < window.shape[1])
+    out = np.full(u.shape, np.nan)
+    out[inside] = window[rows[inside], cols[inside]]
+    return out
+
+
+def _bilinear(window, u, v):
+    """Bilinear interpolation; nan neighbours are dropped and the remaining weights renormalized."""
+    row0, col0 = np.floor(v).astype(np.int64), np.floor(u).astype(np.int64)
+    dv, du = v - row0, u - col0
+    total = np.zeros(u.shape)
+    weight = np.zeros(u.shape)
+    for dr, dc, w in ((0, 0, (1 - dv) * (1 - du)), (0, 1, (1 - dv) * du), (1, 0, dv * (1 - du)), (1, 1, dv * du)):
+        r, c = row0 + dr, col0 + dc
+        inside = (r >= 0) & (r < window.shape[0]) & (c >= 0) & (c < window.shape[1])
+        values = np.full(u.shape, np.nan)
+        values[inside] = window[r[inside], c[inside]]
+        valid = ~np.isnan(values) & (w > 0)
+        total[valid] += values[valid] * w[valid]
+        weight[valid] += w[valid]
+    out = np.full(u.shape, np.nan)
+    has = weight > 0
+    out[has] = total[has] / weight[has]
+    return out
+
+
+def _block_mode(samples, shape, factor):
+    """Most common non-nan value in each factor x factor block of sub-cell samples (ties go to the lowest)."""
+    nrows, ncols = shape
+    blocks = samples.reshape(nrows, factor, ncols, factor).transpose(0, 2, 1, 3).reshape(nrows * ncols, factor * factor)
+    blocks = np.sort(blocks, axis=1)  # nan sorts last
+    n = blocks.shape[1]
+
+    # run lengths of equal values along each row, computed for all rows at once
+    starts = np.ones(blocks.shape, dtype=bool)
+    starts[:, 1:] = blocks[:, 1:] != blocks[:, :-1]
+    starts &= ~np.isnan(blocks)
+    run_id = np.cumsum(starts, axis=1)
+    flat_run = (run_id + np.arange(len(blocks))[:, None] * (n + 1)).ravel()
+    valid = ~np.isnan(blocks).ravel()
+    lengths = np.bincount(flat_run[valid], minlength=len(blocks) * (n + 1)).reshape(len(blocks), n + 1)
+    best = lengths.argmax(axis=1)
+    out = np.full(len(blocks), np.nan)
+    has = lengths[np.arange(len(blocks)), best] > 0
+    first_of_run = np.argmax(run_id[has] == best[has, None], axis=1)
+    out[has] = blocks[has, first_of_run]
+    return out.reshape(nrows, ncols)
+
+
+def _approx_transform(transformer, grid: Grid, row_pos, col_pos, step: int = None, max_error: float = None):
+    """
+    Transforms a lattice of points exactly and interpolates bilinearly in between.
+
+    The projection is smooth at tile scale, so only every ``step``-th position
+    is sent through pyproj. The interpolation is checked against exact values at
+    the lattice midpoints; if it is off by more than ``max_error`` target cells
+    the whole tile is transformed exactly.
+    """
+    step = step or reproject_control_step
+    max_error = reproject_max_error if max_error is None else max_error
+    row_ctrl, col_ctrl = _control(row_pos, step), _control(col_pos, step)
+    if len(row_ctrl) < 2 or len(col_ctrl) < 2:
+        return _exact_transform(transformer, grid, row_pos, col_pos)
+
+    ctrl_x, ctrl_y = _exact_transform(transformer, grid, row_ctrl, col_ctrl)
+    row_mid, col_mid = (row_ctrl[1:] + row_ctrl[:-1]) / 2, (col_ctrl[1:] + col_ctrl[:-1]) / 2
+    mid_x, mid_y = _exact_transform(transformer, grid, row_mid, col_mid)
+    if not (np.isfinite(ctrl_x).all() and np.isfinite(ctrl_y).all() and np.isfinite(mid_x).all()):
+        return _exact_transform(transformer, grid, row_pos, col_pos)
+
+    # source distance covered by one target cell, to express the error in cells
+    cell = np.hypot(ctrl_x[0, 1] - ctrl_x[0, 0], ctrl_y[0, 1] - ctrl_y[0, 0]) / (col_ctrl[1] - col_ctrl[0])
+    est_x, est_y = _interpolate(ctrl_x, row_ctrl, col_ctrl, row_mid, col_mid), _interpolate(ctrl_y, row_ctrl, col_ctrl, row_mid, col_mid)
+    if np.hypot(est_x - mid_x, est_y - mid_y).max() > max_error * cell:
+        return _exact_transform(transformer, grid, row_pos, col_pos)
+    return (_interpolate(ctrl_x, row_ctrl, col_ctrl, row_pos, col_pos),
+            _interpolate(ctrl_y, row_ctrl, col_ctrl, row_pos, col_pos))
+
+
+def _exact_transform(transformer, grid: Grid, row_pos, col_pos):
+    xs, ys = transformer.transform(*_world(grid, row_pos, col_pos))
+    return np.asarray(xs), np.asarray(ys)
+
+
+def _control(positions, step: int):
+    # anchored to the grid rather than the tile, so neighbouring tiles and blocks interpolate identically
+    lo = np.floor((positions[0] - 0.5) / step) * step + 0.5
+    hi = np.ceil((positions[-1] - 0.5) / step) * step + 0.5
+    return np.arange(lo, hi + step / 2, step)
+
+
+def _interpolate(values, row_ctrl, col_ctrl, row_pos, col_pos):
+    """Bilinear interpolation of a lattice of values at (row, col) positions, separable per axis."""
+    i = np.clip(np.searchsorted(row_ctrl, row_pos, side='right') - 1, 0, len(row_ctrl) - 2)
+    j = np.clip(np.searchsorted(col_ctrl, col_pos, side='right') - 1, 0, len(col_ctrl) - 2)
+    wr = ((row_pos - row_ctrl[i]) / (row_ctrl[i + 1] - row_ctrl[i]))[:, None]
+    wc = (col_pos - col_ctrl[j]) / (col_ctrl[j + 1] - col_ctrl[j])
+    # along columns on the few control rows first, then along rows at full size
+    across = values[:, j] * (1 - wc) + values[:, j + 1] * wc
+    return across[i] * (1 - wr) + across[i + 1] * wr
+
+
+def _subcell_positions(rows: slice, cols: slice, factor: int):
+    """Fractional row and column positions of the cell (or sub-cell) centres in a tile."""
+    offsets = (np.arange(factor) + 0.5) / factor
+    row_pos = (np.arange(rows.start, rows.stop)[:, None] + offsets).ravel()
+    col_pos = (np.arange(cols.start, cols.stop)[:, None] + offsets).ravel()
+    return row_pos, col_pos
+
+
+def _world(grid: Grid, row_pos, col_pos):
+    a, _, c, _, e, f = grid.transform
+    return np.meshgrid(c + a * col_pos, f + e * row_pos)
+
+
+def _supersample_factor(src_grid: Grid, grid: Grid, limit: int = 8) -> int:
+    """Samples per target cell edge so every source cell under a target cell is sampled about once."""
+    if _same_crs(src_grid.crs, grid.crs):
+        ratio = max(grid.resolution[0] / src_grid.resolution[0], grid.resolution[1] / src_grid.resolution[1])
+    else:
+        # size of the central target cell measured in the source CRS
+        from pyproj import Transformer
+
+        row, col = grid.nrows / 2, grid.ncols / 2
+        xs, ys = Transformer.from_crs(grid.crs, src_grid.crs, always_xy=True).transform(
+            *_world(grid, np.array([row, row + 1]), np.array([col, col + 1])))
+        ratio = max(np.hypot(xs[0, 1] - xs[0, 0], ys[0, 1] - ys[0, 0]) / src_grid.resolution[0],
+                    np.hypot(xs[1, 0] - xs[0, 0], ys[1, 0] - ys[0, 0]) / src_grid.resolution[1])
+        if not np.isfinite(ratio):
+            return limit
+    return int(np.clip(np.ceil(ratio - 1e-6), 1, limit))
+
+
+def _as_float(block, fill_value):
+    block = block.astype(np.float64, copy=block.dtype != np.float64)
+    if fill_value is not None and not np.isnan(fill_value):
+        block[block == fill_value] = np.nan
+    return block
@@ -0,0 +1,70 @@
+import copy
+
+import numpy as np
+
+from geoconfig.profiling import span
+from geohierarchy.grid import Grid
+
+
+def snap_input(hier_input, grid: Grid, how: str = 'mean') -> dict:
+    """
+    Snaps a point ``HierInput`` (e.g. borehole picks in a CSV) onto ``grid``.
+
+    The grid bounds are pushed down to the reader unless the input sets its own,
+    so points off the grid are dropped while the file is parsed.
+
+    Args:
+        hier_input (HierInput): Input pointing at a point table. ``column`` (or a
+            constant ``value``), ``z`` and ``layer`` select what is snapped;
+            strings name columns, numbers are set as constants.
+        grid (Grid): Target grid.
+        how (str): How several points in one cell are combined, see
+            ``GridBucketIndex.aggregate``.
+
+    Returns:
+        dict: 'value', 'z' and 'layer' grids for the fields that are set, nan
+        where no point fell.
+    """
+    opener_kwargs = hier_input.opener_kwargs or {}
+    if opener_kwargs.get('bounds') is None:
+        hier_input = copy.copy(hier_input)
+        hier_input.opener_kwargs = {**opener_kwargs, 'bounds': grid.bounds}
+    with span('snap', filepath=hier_input.filepath):
+        return snap_points(hier_input.open(), grid, _fields(hier_input), how=how)
+
+
+def snap_points(points, grid: Grid, fields: dict, how: str = 'mean') -> dict:
+    """
+    Snaps a ``PointTable`` onto ``grid``.
+
+    Args:
+        points (PointTable): Points to snap.
+        grid (Grid): Target grid.
+        fields (dict): Output name -> column name or constant.
+        how (str): How several points in one cell are combined.
+
+    Returns:
+        dict: Output name -> float grid, nan where no point fell.
+    """
+    from geoconfig.user_input.filepath.points import GridBucketIndex
+
+    index = GridBucketIndex(points, grid)
+    covered = None
+    out = {}
+    for name, spec in fields.items():
+        if isinstance(spec, str):
+            out[name] = index.aggregate(spec, how=how)
+        else:
+            if covered is None:
+                covered = index.aggregate(1.0, how='count') > 0
+            out[name] = np.where(covered, np.float64(spec), np.nan)
+    return out
+
+
+def _fields(hier_input) -> dict:
+    fields = {
+        'value': hier_input.column if hier_input.column is not None else hier_input.value,
+        'z': hier_input.z,
+        'layer': hier_input.layer,
+    }
+    return {name: spec for name, spec in fields.items() if spec is not None}
@@ -0,0 +1,177 @@
+import numpy as np
+
+from geohierarchy.io.geohierarchy_from_mask import _default_block_rows, _top_level, _valid_cells
+
+
+class LevelIndex:
+    """Per-cell index of the controlling (highest valid) hierarchy level.
+
+    The index is built once from the level stack in row blocks. After that,
+    ``update`` applies a change to one level by touching only the cells that
+    level can control: inactive cells and cells already held by a higher level
+    are never read again, and levels below are read only where the changed
+    level gave up control. Lazy levels are read chunk by chunk, and only the
+    chunks holding such cells are read.
+    """
+
+    def __init__(self, levels: list, active=None, block_rows: int = None):
+        """
+        Args:
+            levels (list): 2D array-likes in hierarchy order (e.g. ``HierarchyStore``
+                levels), nan or their ``fill_value`` where a level has no data.
+            active: Boolean grid of cells taking part, defaults to every cell.
+            block_rows (int): Rows reduced per pass while building.
+        """
+        if not levels:
+            raise ValueError("A LevelIndex needs at least one level.")
+        self.levels = list(levels)
+        self.shape = tuple(self.levels[0].shape)
+        for data in self.levels:
+            if tuple(data.shape) != self.shape:
+                raise ValueError(f"Level shape {tuple(data.shape)} does not match {self.shape}.")
+        self.active = None if active is None else np.asarray(active, dtype=bool)
+        self.top = np.full(self.shape, -1, dtype=np.int16 if len(self.levels) < 2**15 else np.int32)
+        self._cells_by_level = None
+
+        nrows, ncols = self.shape
+        block_rows = block_rows or _default_block_rows(len(self.levels), ncols, np.float64)
+        for r0 in range(0, nrows, block_rows):
+            rows = slice(r0, min(r0 + block_rows, nrows))
+            valid = np.stack([self._valid(data, rows) for data in self.levels])
+            self.top[rows] = _top_level(valid)
+
+    @classmethod
+    def from_store(cls, store, active=None, block_rows: int = None) -> 'LevelIndex':
+        """Index over the levels of a ``HierarchyStore``."""
+        return cls([store.level(i) for i in range(store.shape[0])], active=active, block_rows=block_rows)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(levels={len(self.levels)}, shape={self.shape})"
+
+    def cells(self, level: int) -> np.ndarray:
+        """Flat indices of the cells controlled by ``level``."""
+        if self._cells_by_level is None:
+            # one sort groups cells by level, so every later lookup is a slice
+            flat = self.top.reshape(-1)
+            order = np.argsort(flat, kind='stable')
+            bounds = np.searchsorted(flat[order], np.arange(-1, len(self.levels) + 1))
+            self._cells_by_level = (order, bounds)
+        order, bounds = self._cells_by_level
+        return order[bounds[level + 1]:bounds[level + 2]]
+
+    def update(self, level: int, data) -> np.ndarray:
+        """
+        Replaces one level and updates the index in place.
+
+        Args:
+            level (int): Index of the changed level.
+            data: New 2D data for the level.
+
+        Returns:
+            np.ndarray: Flat indices of the cells whose controlling level changed.
+        """
+        if tuple(data.shape) != self.shape:
+            raise ValueError(f"Level shape {tuple(data.shape)} does not match {self.shape}.")
+        self.levels[level] = data
+        flat_top = self.top.reshape(-1)
+
+        # only active cells not held by a higher level can change
+        can_change = flat_top <= level
+        if self.active is not None:
+            can_change &= self.active.reshape(-1)
+        candidates = np.flatnonzero(can_change)
+        if not len(candidates):
+            return candidates
+        valid = self._valid_at(data, candidates)
+
+        gained = candidates[valid & (flat_top[candidates] < level)]
+        lost = candidates[~valid & (flat_top[candidates] == level)]
+        flat_top[gained] = level
+
+        # cells the level gave up fall back to the highest valid level below it
+        unresolved = lost
+        flat_top[lost] = -1
+        for lower in range(level - 1, -1, -1):
+            if not len(unresolved):
+                break
+            found = self._valid_at(self.levels[lower], unresolved)
+            flat_top[unresolved[found]] = lower
+            unresolved = unresolved[~found]
+
+        changed = np.concatenate([gained, lost])
+        if len(changed):
+            self._cells_by_level = None
+        return changed
+
+    def gather(self, values: list, fill=np.nan) -> np.ndarray:
+        """
+        Picks, for every cell, the entry of its controlling level.
+
+        Args:
+            values (list): Per level, a constant or a grid (e.g. the levels
+                themselves, or z grids). None leaves that level's cells at ``fill``.
+            fill: Value for cells with no controlling level.
+
+        Returns:
+            np.ndarray: Grid of gathered values.
+        """
+        if len(values) != len(self.levels):
+            raise ValueError(f"Expected {len(self.levels)} values, got {len(values)}.")
+        out = np.full(self.top.size, fill, dtype=np.float64)
+        for level, source in enumerate(values):
+            cells = self.cells(level)
+            if source is None or not len(cells):
+                continue
+            if hasattr(source, 'shape') and tuple(source.shape) == self.shape:
+                out[cells] = self._take(source, cells)
+            else:
+                out[cells] = source
+        return out.reshape(self.shape)
+
+    def z(self, level_z: list) -> np.ndarray:
+        """z of the controlling level per cell, from per-level constants or grids."""
+        return self.gather(level_z)
+
+    def _valid(self, data, rows) -> np.ndarray:
+        block = np.asarray(data[rows, :])
+        valid = _valid_cells(block, getattr(data, 'fill_value', None))
+        if self.active is not None:
+            valid &= self.active[rows]
+        return valid
+
+    def _valid_at(self, data, cells) -> np.ndarray:
+        values = self._take(data, cells)
+        valid = _valid_cells(values, getattr(data, 'fill_value', None))
+        if self.active is not None:
+            valid &= self.active.reshape(-1)[cells]
+        return valid
+
+    def _take(self, data, cells) -> np.ndarray:
+        """Values of ``data`` at flat ``cells``, reading only the chunks that hold them."""
+        if isinstance(data, np.ndarray) or not len(cells):
+            return np.asarray(data).reshape(-1)[cells] if len(cells) else np.empty(0)
+        nrows, ncols = self.shape
+        chunk_rows, chunk_cols = self._chunk_shape(data)
+        rows, cols = np.divmod(cells, ncols)
+        n_chunk_cols = -(-ncols // chunk_cols)
+        chunk_ids = (rows // chunk_rows) * n_chunk_cols + cols // chunk_cols
+
+        # one sort groups the cells by chunk, so each chunk is read once
+        order = np.argsort(chunk_ids, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(chunk_ids[order]) != 0])
+        out = np.empty(len(cells), dtype=getattr(data, 'dtype', np.float64))
+        for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+            idx = order[start:stop]
+            i, j = divmod(int(chunk_ids[idx[0]]), n_chunk_cols)
+            r0, c0 = i * chunk_rows, j * chunk_cols
+            block = np.asarray(data[r0:min(r0 + chunk_rows, nrows), c0:min(c0 + chunk_cols, ncols)])
+            out[idx] = block[rows[idx] - r0, cols[idx] - c0]
+        return out
+
+    def _chunk_shape(self, data) -> tuple:
+        chunks = getattr(data, 'chunk_shape', None)
+        if chunks is not None:
+            return tuple(chunks)
+        # no native chunks: row blocks sized like the build passes
+        ncols = self.shape[1]
+        return _default_block_rows(1, ncols, np.float64), ncols
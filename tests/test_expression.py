@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from geoconfig.user_input.expression import compile_expression
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('($:a * 2) / $:b', lambda a, b: (a * 2) / b),
+    ('($:a * 2) // $:b', lambda a, b: (a * 2) // b),
+    ('($:a * 2) ** $:b', lambda a, b: (a * 2) ** b),
+    ('($:a - $:b) * 3 / 2', lambda a, b: (a - b) * 3 / 2),
+])
+def test_integer_operands_take_the_ufunc_output_dtype(source, expected):
+    a = np.arange(1, 13, dtype='int64').reshape(3, 4)
+    b = np.full((3, 4), 2, dtype='int64')
+
+    result = compile_expression(source).evaluate({'$:a': a, '$:b': b}, chunk_cells=4)
+
+    reference = expected(a, b)
+    assert result.dtype == reference.dtype
+    np.testing.assert_array_equal(result, reference)
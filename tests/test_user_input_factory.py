@@ -0,0 +1,20 @@
+from geoconfig.user_input.input_types import FilepathInput, ValueInput
+from geoconfig.user_input.user_input_factory import user_input_factory
+
+
+def test_path_created_after_classification_becomes_a_filepath(tmp_path):
+    path = str(tmp_path / 'model.yaml')
+
+    assert isinstance(user_input_factory.classify_user_input(path), ValueInput)
+    user_input_factory.prefetch([path])
+
+    (tmp_path / 'model.yaml').write_text('model_config: {}\n')
+
+    assert isinstance(user_input_factory.classify_user_input(path), FilepathInput)
+
+
+def test_specs_are_hashable():
+    spec = user_input_factory.classify_user_input([1, 'a', [2, '($:x + 1)'], '$py:numpy.sqrt($:x)'])
+
+    assert spec.value == (1, 'a', (2, '($:x + 1)'), '$py:numpy.sqrt($:x)')
+    assert hash(spec) == hash(user_input_factory.classify_user_input([1, 'a', [2, '($:x + 1)'], '$py:numpy.sqrt($:x)']))